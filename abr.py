@@ -0,0 +1,226 @@
+"""Bitrate adaptif: tangga bitrate/resolusi per stream yang diatur per node.
+
+Bitrate setiap stream tetap (-b:v/-maxrate), jadi saat uplink host penuh
+semua stream tertahan bersamaan dan semuanya drop frame. Controller ini
+melihat throughput output setiap stream (dari -progress) dan antrean kirim
+TCP proses ffmpeg-nya (byte RTMP yang belum terkirim, dari /proc/net/tcp).
+Saat uplink padat, satu stream per langkah diturunkan satu tingkat di
+tangganya: prioritas terendah lebih dulu. Saat kapasitas kembali, stream
+dengan prioritas tertinggi dinaikkan lebih dulu. Turun dan naik memakai
+hysteresis (padat/lega harus bertahan beberapa detik) dan cooldown per stream,
+karena setiap perubahan tingkat berarti restart ffmpeg (dengan resume).
+"""
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from mezzanine import SCALES
+
+CHECK_INTERVAL = 5.0  # detik antar keputusan controller
+THROUGHPUT_WINDOW = 10  # sampel -progress untuk rata-rata throughput
+BACKLOG_SECONDS = 1.0  # antrean kirim lebih dari sekian detik bitrate target = padat
+UNDERRUN_RATIO = 0.85  # throughput di bawah rasio target (sambil di bawah realtime) = padat
+DOWN_AFTER = 10.0  # padat terus-menerus selama ini sebelum turun satu tingkat
+UP_AFTER = 60.0  # lega terus-menerus selama ini sebelum naik satu tingkat
+UP_AFTER_MAX = 1800.0  # batas jeda naik setelah naik berulang kali gagal
+PROBE_WINDOW = 120.0  # padat lagi dalam jendela ini setelah naik = tingkat itu belum muat
+CHANGE_COOLDOWN = 30.0  # stream yang baru berubah tingkat tidak disentuh selama ini
+
+# Kapasitas uplink node (Mbps); 0 = tidak diketahui, hanya sinyal antrean/throughput yang dipakai
+UPLINK_KBPS = float(os.environ.get('STREAMFLOW_UPLINK_MBPS', '0')) * 1000
+UPLINK_HIGH = 0.9  # total output di atas rasio kapasitas ini = padat
+UPLINK_LOW = 0.8  # naik hanya bila total setelah naik masih di bawah rasio ini
+
+STEP_RATIO = 0.75  # setiap tingkat ±25% lebih rendah
+BITRATE_ROUND = 100
+# Di bawah bitrate ini resolusi diturunkan: lebih sedikit piksel per bit lebih tajam
+RESOLUTION_FLOOR = {'1080p': 3000, '720p': 1500, '480p': 0}
+MIN_BITRATE = 500
+
+Rung = Tuple[int, str]  # (bitrate kbps, resolusi)
+
+TCP_TABLES = ('/proc/net/tcp', '/proc/net/tcp6')
+TCP_ESTABLISHED = '01'
+
+
+def ladder(stream: Dict) -> List[Rung]:
+    """Tingkat yang boleh dipakai stream: dari konfigurasi (tingkat 0) turun sampai batas bawah"""
+    resolutions = list(SCALES)
+    bitrate, resolution = int(stream['bitrate']), stream['resolution']
+    floor_bitrate = max(int(stream.get('abr_min_bitrate') or MIN_BITRATE), MIN_BITRATE)
+    floor_resolution = stream.get('abr_min_resolution') or resolutions[0]
+    floor_index = resolutions.index(floor_resolution) if floor_resolution in resolutions else 0
+
+    rungs = [(bitrate, resolution)]
+    while True:
+        next_bitrate = int(bitrate * STEP_RATIO) // BITRATE_ROUND * BITRATE_ROUND
+        if next_bitrate < floor_bitrate or next_bitrate == bitrate:
+            break
+        bitrate = next_bitrate
+        index = resolutions.index(resolution) if resolution in resolutions else len(resolutions) - 1
+        while index > floor_index and bitrate < RESOLUTION_FLOOR.get(resolutions[index], 0):
+            index -= 1
+        resolution = resolutions[index]
+        rungs.append((bitrate, resolution))
+    return rungs
+
+
+def current_rung(stream: Dict) -> Rung:
+    """Tingkat yang sedang dipakai stream (abr_level dibatasi panjang tangganya)"""
+    rungs = ladder(stream)
+    return rungs[min(int(stream.get('abr_level') or 0), len(rungs) - 1)]
+
+
+def effective_stream(stream: Dict) -> Dict:
+    """Salinan stream dengan bitrate/resolusi tingkat aktif, untuk menyusun perintah ffmpeg"""
+    if not stream.get('abr_level'):
+        return stream
+    bitrate, resolution = current_rung(stream)
+    return {**stream, 'bitrate': bitrate, 'resolution': resolution}
+
+
+def socket_inodes(pid: int) -> Set[str]:
+    """Inode socket yang dibuka proses (Linux)"""
+    inodes = set()
+    fd_dir = f'/proc/{pid}/fd'
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return inodes
+    for fd in fds:
+        try:
+            target = os.readlink(os.path.join(fd_dir, fd))
+        except OSError:
+            continue
+        if target.startswith('socket:['):
+            inodes.add(target[8:-1])
+    return inodes
+
+
+def send_backlog(pids: Iterable[int]) -> Dict[int, Optional[int]]:
+    """Byte yang masih antre di socket TCP tersambung setiap proses; None bila tidak bisa dibaca"""
+    inodes = {pid: socket_inodes(pid) for pid in pids}
+    if not inodes:
+        return {}
+    queues: Dict[str, int] = {}
+    readable = False
+    for table in TCP_TABLES:
+        try:
+            with open(table) as f:
+                next(f)  # header
+                for line in f:
+                    fields = line.split()
+                    # sl local rem st tx_queue:rx_queue tr tm->when retrnsmt uid timeout inode
+                    if len(fields) < 10 or fields[3] != TCP_ESTABLISHED:
+                        continue
+                    queues[fields[9]] = int(fields[4].partition(':')[0], 16)
+            readable = True
+        except (OSError, StopIteration, ValueError):
+            continue
+    if not readable:
+        return {pid: None for pid in inodes}
+    return {pid: sum(queues.get(inode, 0) for inode in owned) for pid, owned in inodes.items()}
+
+
+def throughput_kbps(samples: List) -> Optional[float]:
+    """Rata-rata kbps yang benar-benar ditulis ke output selama jendela sampel -progress"""
+    if len(samples) < 2:
+        return None
+    first, last = samples[0], samples[-1]
+    elapsed = last.timestamp - first.timestamp
+    if elapsed <= 0 or last.total_size < first.total_size:
+        return None
+    return (last.total_size - first.total_size) * 8 / 1000 / elapsed
+
+
+@dataclass
+class StreamLoad:
+    """Keadaan satu stream aktif yang dilihat controller"""
+    stream_id: str
+    enabled: bool  # abr aktif untuk stream ini
+    priority: int
+    level: int
+    max_level: int
+    target_kbps: int  # bitrate tingkat aktif
+    up_kbps: Optional[int]  # bitrate satu tingkat di atas, None bila sudah di tingkat 0
+    throughput_kbps: Optional[float]
+    backlog_bytes: Optional[int]
+    below_realtime: bool
+    can_step_down: bool = True  # mis. passthrough yang tidak punya CPU untuk re-encode
+
+    @property
+    def congested(self) -> bool:
+        """Output tertahan: antrean kirim menumpuk, atau throughput kurang sambil di bawah realtime"""
+        if self.backlog_bytes is not None and self.backlog_bytes > self.target_kbps * 1000 / 8 * BACKLOG_SECONDS:
+            return True
+        return (self.below_realtime and self.throughput_kbps is not None
+                and self.throughput_kbps < self.target_kbps * UNDERRUN_RATIO)
+
+
+class BitrateController:
+    """Keputusan naik/turun tingkat untuk semua stream satu node, satu langkah per keputusan"""
+
+    def __init__(self, uplink_kbps: float = UPLINK_KBPS):
+        self.uplink_kbps = uplink_kbps
+        self.congested_since: Optional[float] = None
+        self.clear_since: Optional[float] = None
+        self.changed_at: Dict[str, float] = {}
+        self.raised_at: Dict[str, float] = {}
+        # Jeda naik per stream, digandakan setiap kali tingkat yang dicoba ternyata padat lagi
+        self.up_after: Dict[str, float] = {}
+
+    def decide(self, loads: List[StreamLoad], now: Optional[float] = None) -> Optional[Tuple[str, int, str]]:
+        """(stream_id, tingkat baru, alasan), atau None bila tidak ada yang perlu diubah"""
+        now = now or time.monotonic()
+        total = sum(load.throughput_kbps or 0.0 for load in loads)
+        congested = [load for load in loads if load.congested]
+        saturated = bool(self.uplink_kbps) and total > self.uplink_kbps * UPLINK_HIGH
+        settled = [load for load in loads
+                   if load.enabled and now - self.changed_at.get(load.stream_id, 0.0) >= CHANGE_COOLDOWN]
+
+        if congested or saturated:
+            self.clear_since = None
+            self.congested_since = self.congested_since or now
+            if now - self.congested_since < DOWN_AFTER:
+                return None
+            candidates = [load for load in settled if load.level < load.max_level and load.can_step_down]
+            if len(congested) == 1 and not saturated and congested[0] in candidates:
+                # Hanya satu stream tertahan: jalurnya ke ingest itu yang sempit, bukan uplink node
+                victim = congested[0]
+                reason = "antrean kirim menumpuk"
+            else:
+                # Uplink bersama penuh: korbankan prioritas terendah, bitrate terbesar lebih dulu
+                candidates.sort(key=lambda load: (load.priority, -load.target_kbps))
+                victim = candidates[0] if candidates else None
+                reason = (f"uplink {total / 1000:.1f}/{self.uplink_kbps / 1000:.0f} Mbps" if saturated
+                          else f"uplink padat ({len(congested)} stream tertahan)")
+            if victim is None:
+                return None
+            self.congested_since = now  # langkah berikutnya menunggu DOWN_AFTER lagi
+            self.changed_at[victim.stream_id] = now
+            if now - self.raised_at.get(victim.stream_id, float('-inf')) < PROBE_WINDOW:
+                # Tanpa kapasitas uplink yang diketahui, naik adalah percobaan; jangan berosilasi
+                self.up_after[victim.stream_id] = min(self.up_after.get(victim.stream_id, UP_AFTER) * 2,
+                                                      UP_AFTER_MAX)
+            return victim.stream_id, victim.level + 1, reason
+
+        self.congested_since = None
+        self.clear_since = self.clear_since or now
+        candidates = [load for load in settled if load.level > 0
+                      and now - self.clear_since >= self.up_after.get(load.stream_id, UP_AFTER) and (
+            not self.uplink_kbps
+            or total + (load.up_kbps or 0) - load.target_kbps <= self.uplink_kbps * UPLINK_LOW)]
+        if not candidates:
+            return None
+        # Prioritas tertinggi dipulihkan lebih dulu
+        victim = max(candidates, key=lambda load: (load.priority, load.level))
+        self.clear_since = now
+        self.changed_at[victim.stream_id] = now
+        self.raised_at[victim.stream_id] = now
+        return victim.stream_id, victim.level - 1, "uplink lega"
+
+    def forget(self, stream_id: str):
+        """Lupakan riwayat stream yang berhenti; start berikutnya mulai dari tingkat 0"""
+        for history in (self.changed_at, self.raised_at, self.up_after):
+            history.pop(stream_id, None)
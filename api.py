@@ -0,0 +1,8 @@
+"""Alamat default API supervisor.
+
+Dipisah dari supervisor.py agar UI Streamlit dan CLI (client tipis) tidak
+ikut mengimpor seluruh daemon: engine asyncio, psutil, cgroup, library media.
+"""
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
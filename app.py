@@ -1,13 +1,29 @@
 import sys
 import subprocess
-import threading
+import functools
 import os
 import time
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+import requests
 import streamlit as st
 from streamlit.components.v1 import html
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from api import DEFAULT_HOST, DEFAULT_PORT
+from engine import STOP_WAIT
+from logbuffer import LOG_DIR
+from media import safe_filename, store_upload
+from mezzanine import SCALES as RESOLUTIONS
+from profiles import AUTO, ENCODER_PROFILES, preview_enabled
+from playlist import format_schedule, parse_schedule
+from health import ACTIVE_STATUSES, RUNNING_STATUSES
+from progress import format_time
+
+try:
+    from streamlit_autorefresh import st_autorefresh
+except ImportError:
+    st_autorefresh = None
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -241,6 +257,10 @@ st.markdown("""
         animation: blink 1.5s infinite;
     }
     
+    .live-badge.degraded {
+        background: var(--warning);
+    }
+    
     @keyframes blink {
         0%, 100% { opacity: 1; }
         50% { opacity: 0.3; }
@@ -269,176 +289,742 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Pilihan profil encode di UI; setiap kombinasi punya file mezzanine sendiri
+BITRATE_OPTIONS = [1500, 2500, 3000, 4000, 5000]
+FPS_OPTIONS = [30]
+
+# Card yang sedang live di-refresh tiap LIVE_REFRESH detik (st.fragment, Streamlit >= 1.37)
+LIVE_REFRESH = 2.0
+HAS_FRAGMENT = hasattr(st, 'fragment')
+
+SETTINGS_TABLE = """
+<table class="settings-table">
+    <thead>
+        <tr>
+            <th>Bitrate (kbps)</th>
+            <th>Resolusi</th>
+            <th>FPS</th>
+        </tr>
+    </thead>
+    <tbody>
+        <tr>
+            <td>{bitrate}</td>
+            <td>{resolution}</td>
+            <td>{fps}</td>
+        </tr>
+    </tbody>
+</table>
+"""
+
+# Alamat supervisor yang memiliki proses ffmpeg (lihat supervisor.py)
+SUPERVISOR_URL = os.environ.get('STREAMFLOW_SUPERVISOR', f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+REQUEST_TIMEOUT = 10
+# Stop menunggu ffmpeg keluar di supervisor (dan scheduler di depannya); jangan putus lebih dulu
+STOP_REQUEST_TIMEOUT = STOP_WAIT + 5
+
+def ui_profiles() -> List[Tuple[int, str, int]]:
+    """Semua kombinasi (bitrate, resolusi, fps) yang bisa dipilih di UI"""
+    return [(b, r, f) for b in BITRATE_OPTIONS for r in RESOLUTIONS for f in FPS_OPTIONS]
+
+def describe_probe(probe: Optional[Dict]) -> str:
+    """Teks singkat hasil probe untuk ditampilkan di card"""
+    if probe is None:
+        return "Belum ada info video"
+    return (f"{(probe['vcodec'] or '?').upper()} {probe['width']}x{probe['height']} "
+            f"{probe['fps']:g}fps {probe['bitrate'] or '?'}k · {(probe['acodec'] or 'no audio').upper()} "
+            f"· GOP {probe['keyframe_interval']:g}s")
+
+def parse_destinations(text: str) -> List[Dict]:
+    """Parse tujuan tambahan, satu per baris: '<rtmp_url> <stream_key>'"""
+    destinations = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            destinations.append({'rtmp_url': parts[0], 'stream_key': parts[1]})
+    return destinations
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Koneksi HTTP keep-alive ke supervisor, dipakai bersama semua sesi"""
+    return requests.Session()
+
+@st.cache_resource
+def get_preview_cache() -> Dict[str, Tuple[str, bytes]]:
+    """Frame preview terakhir per stream beserta ETag-nya, dipakai bersama semua sesi"""
+    return {}
+
+def spawn_supervisor():
+    """Jalankan supervisor lokal di background bila belum berjalan"""
+    url = urlparse(SUPERVISOR_URL)
+    if url.hostname not in ('127.0.0.1', 'localhost'):
+        return
+    
+    supervisor_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'supervisor.py')
+    with open('supervisor.log', 'ab') as log_file:
+        subprocess.Popen(
+            [sys.executable, supervisor_path, '--host', url.hostname, '--port', str(url.port or DEFAULT_PORT)],
+            stdin=subprocess.DEVNULL,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            start_new_session=True  # tetap hidup walau Streamlit berhenti
+        )
+    
+    session = get_http_session()
+    for _ in range(50):
+        try:
+            session.get(f"{SUPERVISOR_URL}/health", timeout=0.5)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+
+class SupervisorError(Exception):
+    """Supervisor menolak permintaan (mis. video/stream key belum diisi)"""
+
 class StreamManager:
-    """Mengelola multi streaming"""
+    """Client tipis ke supervisor yang memiliki proses streaming"""
     
     def __init__(self):
-        if 'streams' not in st.session_state:
-            st.session_state.streams = {}
-        if 'processes' not in st.session_state:
-            st.session_state.processes = {}
-        if 'stream_logs' not in st.session_state:
-            st.session_state.stream_logs = {}
-    
-    def add_stream(self, stream_id: str, title: str, video_path: str = None):
+        self.session = get_http_session()
+        self.streams: Dict[str, Dict] = self._request('GET', '/streams')
+        # Stream yang datanya masih segar dari GET /streams di rerun ini
+        self.prefetched = set(self.streams)
+    
+    def _request(self, method: str, path: str, timeout: float = REQUEST_TIMEOUT, **kwargs):
+        """Panggil API supervisor; jalankan supervisor dulu bila belum hidup"""
+        try:
+            response = self.session.request(method, f"{SUPERVISOR_URL}{path}", timeout=timeout, **kwargs)
+        except requests.ConnectionError:
+            spawn_supervisor()
+            response = self.session.request(method, f"{SUPERVISOR_URL}{path}", timeout=timeout, **kwargs)
+        
+        body = response.json()
+        if response.status_code >= 400:
+            raise SupervisorError(body.get('error', response.reason))
+        return body
+    
+    def add_stream(self, stream_id: str, title: str, video_path: str = None, updates: Dict = None):
         """Menambahkan stream baru"""
-        st.session_state.streams[stream_id] = {
+        self.streams[stream_id] = self._request('POST', '/streams', json={
             'id': stream_id,
             'title': title,
             'video_path': video_path,
-            'stream_key': '',
-            'status': 'stopped',  # 'stopped', 'starting', 'live', 'error'
-            'duration': '0:00',
-            'current_time': '0:00',
-            'bitrate': 3000,
-            'resolution': '1080p',
-            'fps': 30,
-            'loop_video': True,
-            'rtmp_url': 'rtmp://a.rtmp.youtube.com/live2',
-            'created_at': datetime.now().isoformat()
-        }
-        
-        st.session_state.stream_logs[stream_id] = []
+            'updates': updates or {}
+        })
+        self.streams[stream_id].update(updates or {})
+    
+    def refresh_stream(self, stream_id: str):
+        """Ambil ulang status satu stream (untuk refresh per card)"""
+        try:
+            self.streams[stream_id] = self._request('GET', f'/streams/{stream_id}')
+        except SupervisorError:
+            self.streams.pop(stream_id, None)
     
     def update_stream(self, stream_id: str, updates: Dict):
         """Update stream configuration"""
-        if stream_id in st.session_state.streams:
-            st.session_state.streams[stream_id].update(updates)
+        self._request('PATCH', f'/streams/{stream_id}', json=updates)
+        if stream_id in self.streams:
+            self.streams[stream_id].update(updates)
     
     def start_stream(self, stream_id: str):
         """Memulai streaming untuk stream tertentu"""
-        if stream_id not in st.session_state.streams:
-            return False
-        
-        stream = st.session_state.streams[stream_id]
-        
-        if not stream['video_path'] or not os.path.exists(stream['video_path']):
-            st.error(f"Video untuk {stream['title']} tidak ditemukan!")
+        try:
+            self._request('POST', f'/streams/{stream_id}/start')
+        except SupervisorError as e:
+            st.error(str(e))
             return False
-        
-        if not stream['stream_key']:
-            st.error(f"Stream key untuk {stream['title']} belum diisi!")
+        return True
+    
+    def arm_stream(self, stream_id: str, go_live_at: Optional[float] = None):
+        """Siapkan stream (warm standby) agar go-live nanti hampir instan"""
+        try:
+            self._request('POST', f'/streams/{stream_id}/arm', json={'go_live_at': go_live_at})
+        except SupervisorError as e:
+            st.error(str(e))
             return False
-        
-        # Update status
-        self.update_stream(stream_id, {'status': 'starting'})
-        
-        # Start streaming in thread
-        thread = threading.Thread(
-            target=self._run_stream,
-            args=(stream_id,),
-            daemon=True
-        )
-        thread.start()
-        
         return True
     
-    def _run_stream(self, stream_id: str):
-        """Jalankan ffmpeg untuk streaming"""
-        stream = st.session_state.streams[stream_id]
-        
-        output_url = f"{stream['rtmp_url']}/{stream['stream_key']}"
-        
-        cmd = [
-            "ffmpeg",
-            "-stream_loop", "-1",
-            "-re",
-            "-i", stream['video_path'],
-            "-c:v", "libx264",
-            "-preset", "veryfast",
-            "-b:v", f"{stream['bitrate']}k",
-            "-maxrate", f"{stream['bitrate']}k",
-            "-bufsize", f"{stream['bitrate'] * 2}k",
-            "-pix_fmt", "yuv420p",
-            "-g", str(stream['fps'] * 2),
-            "-c:a", "aac",
-            "-b:a", "128k",
-            "-ar", "44100",
-            "-f", "flv",
-            output_url
-        ]
+    def stop_stream(self, stream_id: str):
+        """Menghentikan streaming"""
+        self._request('POST', f'/streams/{stream_id}/stop', timeout=STOP_REQUEST_TIMEOUT)
+    
+    def delete_stream(self, stream_id: str):
+        """Menghapus stream"""
+        self._request('DELETE', f'/streams/{stream_id}')
+        self.streams.pop(stream_id, None)
+    
+    def release_video(self, stream_id: str) -> str:
+        """Lepas video dari stream; supervisor menghapus filenya bila tidak dipakai stream lain"""
+        message = self._request('DELETE', f'/streams/{stream_id}/video')['message']
+        if stream_id in self.streams:
+            self.streams[stream_id]['video_path'] = None
+        return message
+    
+    def fetch_source(self, stream_id: str):
+        """Ulangi unduhan source_url (mis. setelah gagal)"""
+        self._request('POST', f'/streams/{stream_id}/source')
+    
+    def get_preview(self, stream_id: str) -> Optional[bytes]:
+        """JPEG preview terbaru; frame yang belum berganti tidak diunduh ulang (ETag)"""
+        cache = get_preview_cache()
+        etag, data = cache.get(stream_id, ('', b''))
+        try:
+            response = self.session.get(f"{SUPERVISOR_URL}/streams/{stream_id}/preview.jpg",
+                                        headers={'If-None-Match': etag}, timeout=5)
+        except requests.RequestException:
+            return None
+        if response.status_code == 304:
+            return data
+        if response.status_code != 200:
+            cache.pop(stream_id, None)
+            return None
+        cache[stream_id] = (response.headers.get('ETag', ''), response.content)
+        return response.content
+    
+    def get_logs(self, stream_id: str, limit: int = 20) -> List[str]:
+        """Log terakhir stream dari supervisor"""
+        return self._request('GET', f'/streams/{stream_id}/logs', params={'limit': limit})['logs']
+    
+    def list_media(self) -> List[Dict]:
+        """Isi media library (metadata ffprobe) dari indeks supervisor"""
+        return self._request('GET', '/media')['media']
+    
+    def rescan_media(self):
+        """Minta supervisor segera mengindeks file baru"""
+        self._request('POST', '/media/rescan')
+    
+    def request_mezzanine(self, path: str, profiles: List[Tuple[int, str, int]], priority: int = 10,
+                          content_hash: Optional[str] = None):
+        """Minta supervisor membuat file mezzanine di background (content_hash: hash upload yang sudah dihitung)"""
+        self._request('POST', '/mezzanine', json={
+            'path': os.path.abspath(path),
+            'profiles': profiles,
+            'priority': priority,
+            'content_hash': content_hash,
+        })
+
+@functools.lru_cache(maxsize=64)
+def settings_table_html(bitrate: int, resolution: str, fps: int) -> str:
+    """Markup tabel setting card (di-cache per kombinasi nilai)"""
+    return SETTINGS_TABLE.format(bitrate=bitrate, resolution=resolution, fps=fps)
+
+def next_clock_time(text: str) -> float:
+    """Epoch jam 'HH:MM[:SS]' berikutnya (hari ini, atau besok bila sudah lewat)"""
+    parts = [int(part) for part in text.strip().split(':')]
+    if not 2 <= len(parts) <= 3:
+        raise ValueError(text)
+    now = datetime.now()
+    target = now.replace(hour=parts[0], minute=parts[1], second=parts[2] if len(parts) == 3 else 0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return target.timestamp()
+
+def rerun_card():
+    """Gambar ulang card ini saja bila fragment tersedia, selain itu seluruh halaman"""
+    if HAS_FRAGMENT:
+        st.rerun(scope="fragment")
+    st.rerun()
+
+def render_card(manager: StreamManager, stream_id: str, stream_num: int, media_names: Dict[str, str]):
+    """Satu card stream; dijalankan sebagai fragment agar bisa di-refresh sendiri"""
+    # Render penuh memakai data GET /streams; rerun fragment mengambil ulang stream ini saja
+    if stream_id in manager.prefetched:
+        manager.prefetched.discard(stream_id)
+    else:
+        manager.refresh_stream(stream_id)
+    stream = manager.streams.get(stream_id)
+    if stream is None:
+        return
+    
+    # Determine card class
+    card_class = "stream-card"
+    if stream['status'] in ACTIVE_STATUSES:
+        card_class += " live"
+    
+    st.markdown(f'<div class="{card_class}">', unsafe_allow_html=True)
+    
+    # Stream number
+    st.markdown(f'<div class="stream-number">{stream_num}</div>', unsafe_allow_html=True)
+    
+    # Stream title
+    st.markdown(f'<div class="stream-title">{stream["title"]}</div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="stream-subtitle">{stream.get("subtitle", "")}</div>', unsafe_allow_html=True)
+    if stream.get('tags'):
+        st.caption(" ".join(f"🏷️ {tag}" for tag in stream['tags']))
+    
+    # Live badge if streaming
+    if stream['status'] == 'live':
+        st.markdown('<div class="live-badge">LIVE</div>', unsafe_allow_html=True)
+    elif stream['status'] == 'degraded':
+        st.markdown('<div class="live-badge degraded">LIVE &lt; 1.0x</div>', unsafe_allow_html=True)
+    elif stream['status'] == 'reconnecting':
+        st.markdown('<div class="live-badge degraded">RECONNECT</div>', unsafe_allow_html=True)
+    elif stream['status'] == 'armed':
+        st.markdown('<div class="live-badge degraded">SIAGA</div>', unsafe_allow_html=True)
+    elif stream['status'] == 'waiting':
+        st.markdown('<div class="live-badge degraded">MENUNGGU SLOT</div>', unsafe_allow_html=True)
+    
+    # Video info section
+    col1, col2 = st.columns([1, 3])
+    
+    with col1:
+        if stream['status'] in ACTIVE_STATUSES:
+            st.markdown(f'<div class="duration">{stream["current_time"]} / {stream["duration"]}</div>', unsafe_allow_html=True)
+        else:
+            st.markdown(f'<div class="duration">{stream["duration"]}</div>', unsafe_allow_html=True)
+    
+    with col2:
+        if stream.get('loop_video', True):
+            st.markdown('<div class="loop-badge">Loop Video</div>', unsafe_allow_html=True)
+    
+    # Preview dari output kedua ffmpeg (tidak men-decode file lagi)
+    if stream['status'] in ACTIVE_STATUSES and preview_enabled(stream, stream.get('passthrough', False)):
+        preview = manager.get_preview(stream_id)
+        if preview:
+            st.image(preview, width=320)
+    
+    # Telemetri -progress terakhir
+    progress = stream.get('progress')
+    if stream['status'] in ACTIVE_STATUSES and progress:
+        speed = stream.get('speed')
+        # Mode -c copy tidak melaporkan frame/fps, hanya waktu dan ukuran output
+        fps_text = f"{progress['fps']:.0f} fps · " if progress['fps'] else ""
+        st.caption(
+            f"📈 speed {speed:.2f}x · {fps_text}"
+            f"{progress['bitrate_kbps'] or 0:.0f} kbps · "
+            f"drop {progress['drop_frames']} · dup {progress['dup_frames']}"
+            if speed is not None else "📈 Menunggu data progress..."
+        )
+        # Bitrate adaptif: tingkat aktif dan sinyal uplink yang dipakai controller
+        if stream.get('abr'):
+            bitrate_now, resolution_now = stream.get('abr_rung') or (stream['bitrate'], stream['resolution'])
+            level = stream.get('abr_level') or 0
+            backlog = stream.get('send_backlog')
+            st.caption(
+                f"📶 Adaptif {bitrate_now}k {resolution_now}"
+                f"{f' (turun {level} tingkat)' if level else ''} · "
+                f"keluar {stream.get('output_kbps') or 0} kbps"
+                f"{f' · antrean {backlog / 1024:.0f} KB' if backlog is not None else ''}"
+            )
+    
+    # Riwayat restart watchdog
+    if stream.get('restart_count'):
+        last = stream['restart_history'][-1] if stream.get('restart_history') else {}
+        st.caption(f"🔁 {stream['restart_count']}x restart · terakhir {last.get('at', '-')}: {last.get('reason', '-')}")
+    
+    # Mode playlist/jadwal menggantikan loop satu file
+    if stream.get('playlist') or stream.get('schedule'):
+        st.caption(f"🎞️ Playlist {len(stream.get('playlist', []))} file · {len(stream.get('schedule', []))} slot jadwal"
+                   f"{' · acak' if stream.get('shuffle') else ''}")
+    
+    # Hasil probe file + mode encode
+    can_copy = stream.get('can_passthrough', False)
+    mode = "⚡ Passthrough (-c copy)" if can_copy else f"🔄 Re-encode ({stream.get('passthrough_reason')})"
+    if stream.get('ambient_image'):
+        audio_count = len(stream.get('ambient_audio') or [])
+        st.caption(f"🖼️ Ambient {os.path.basename(stream['ambient_image'])} + {audio_count} audio — "
+                   f"remux tanpa encode per frame")
+        if stream.get('mezzanine_status') == 'pending':
+            st.caption("⏳ Visual loop sedang disiapkan")
+    elif stream.get('relay_url'):
+        st.caption(f"📡 Relay {stream['relay_url']} · buffer {stream.get('relay_buffer_ms', 0)} ms — {mode}")
+        if stream['status'] in RUNNING_STATUSES and stream.get('input_status'):
+            # Input dan output dipantau terpisah: sumber putus tidak sama dengan ingest menolak
+            input_icon = {'ok': '✅', 'connecting': '⏳', 'reconnecting': '🔄'}.get(stream['input_status'], '⚠️')
+            failed = stream.get('destination_status', []).count('error')
+            output_text = f"❌ {failed} tujuan gagal" if failed else "✅ ok"
+            st.caption(f"📥 Input {input_icon} {stream['input_status']} · 📤 Output {output_text}")
+    else:
+        st.caption(f"🔍 {describe_probe(stream.get('probe'))} — {mode}")
+    if stream.get('node'):
+        st.caption(f"🖥️ Node {stream['node']}")
+    if stream.get('start_latency') is not None:
+        st.caption(f"⏱️ Start {stream['start_latency']:.2f} detik (klik LIVE sampai output terbuka)")
+    if stream['status'] == 'armed' and stream.get('go_live_at'):
+        st.caption(f"🔥 Go-live terjadwal {datetime.fromtimestamp(stream['go_live_at']).strftime('%H:%M:%S')}")
+    if stream.get('cpus'):
+        st.caption(f"📌 Core {', '.join(map(str, stream['cpus']))}")
+    if stream.get('active_profile') and not can_copy:
+        st.caption(f"🎛️ Preset {stream['active_profile']} · ±{stream.get('estimated_cost', 0):.1f} core")
+    source = stream.get('source')
+    if source and source['status'] == 'downloading':
+        st.caption(f"📥 Mengunduh sumber {source['progress']:.0f}%")
+    elif source and source['status'] == 'error':
+        st.caption(f"❌ Unduhan sumber gagal: {source['error']}")
+    cache_status = stream.get('mezzanine_status')
+    if cache_status and not can_copy:
+        st.caption({
+            'ready': "🗄️ Mezzanine siap — LIVE berikutnya cukup remux",
+            'pending': "⏳ Mezzanine sedang dibuat di background",
+            'missing': "🗄️ Mezzanine belum ada (dibuat saat LIVE)",
+        }[cache_status])
+    
+    # RTMP URL (utama + tujuan tambahan). destination_status urut sama dengan output_targets():
+    # hanya tujuan yang URL dan stream key-nya terisi, termasuk tujuan utama
+    dest_status = stream.get('destination_status', [])
+    index = 0
+    primary = {'rtmp_url': stream['rtmp_url'], 'stream_key': stream['stream_key']}
+    for dest in [primary] + stream.get('destinations', []):
+        if dest.get('rtmp_url') and dest.get('stream_key'):
+            icon = '❌' if index < len(dest_status) and dest_status[index] == 'error' else '📡'
+            index += 1
+        else:
+            icon = '⚪'  # stream key belum diisi, tidak ikut dikirim
+        st.markdown(f'<div class="rtmp-box">{icon} {dest["rtmp_url"]}</div>', unsafe_allow_html=True)
+    
+    # Stream settings table
+    st.markdown(settings_table_html(stream['bitrate'], stream['resolution'], stream['fps']), unsafe_allow_html=True)
+    
+    # Stream configuration
+    with st.expander("⚙️ Konfigurasi Stream", expanded=False):
+        config_col1, config_col2 = st.columns(2)
         
-        # Add resolution scaling if needed
-        if stream['resolution'] == '720p':
-            cmd.insert(-1, "-vf")
-            cmd.insert(-1, "scale=1280:720")
-        elif stream['resolution'] == '480p':
-            cmd.insert(-1, "-vf")
-            cmd.insert(-1, "scale=854:480")
+        with config_col1:
+            # Video selection
+            video_files = list(media_names)
+            if stream['video_path'] and stream['video_path'] not in media_names:
+                # Baru diupload dan belum terindeks
+                video_files.insert(0, stream['video_path'])
+            
+            if video_files:
+                selected_video = st.selectbox(
+                    "Pilih Video",
+                    video_files,
+                    index=video_files.index(stream['video_path']) if stream['video_path'] in video_files else 0,
+                    format_func=lambda path: media_names.get(path, path),
+                    key=f"video_select_{stream_id}"
+                )
+                if selected_video != stream['video_path']:
+                    manager.update_stream(stream_id, {'video_path': selected_video})
+            
+            # Upload new video
+            uploaded_file = st.file_uploader(
+                "Upload Video Baru",
+                type=['mp4', 'mov', 'avi', 'mkv', 'flv'],
+                key=f"upload_{stream_id}"
+            )
+            
+            # Widget uploader tetap memegang file di setiap rerun; simpan sekali per file
+            upload_id = getattr(uploaded_file, 'file_id', None) or (uploaded_file and (uploaded_file.name, uploaded_file.size))
+            if uploaded_file and st.session_state.get(f"stored_{stream_id}") != upload_id:
+                # Ditulis per chunk ke media dir, isi yang sama dipakai bersama
+                video_path, duplicate, content_hash = store_upload(uploaded_file, uploaded_file.name)
+                st.session_state[f"stored_{stream_id}"] = upload_id
+                manager.update_stream(stream_id, {'video_path': video_path})
+                manager.rescan_media()
+                # Transcode sekali untuk semua profil, profil stream ini duluan
+                profile = (stream['bitrate'], stream['resolution'], stream['fps'])
+                manager.request_mezzanine(video_path, [profile], priority=0, content_hash=content_hash)
+                manager.request_mezzanine(video_path, ui_profiles(), content_hash=content_hash)
+                st.success("✅ Video sudah ada, memakai file yang sama" if duplicate else "✅ Video berhasil diupload!")
+            
+            # File besar lebih cepat diunduh supervisor langsung daripada lewat browser
+            source_url = st.text_input(
+                "Atau URL Video (YouTube, link file, HLS)",
+                value=stream.get('source_url') or '',
+                key=f"source_{stream_id}"
+            ).strip()
+            if source_url and source_url != stream.get('source_url'):
+                manager.update_stream(stream_id, {'source_url': source_url})
+                st.info("📥 Video diunduh di background, dipakai otomatis setelah selesai")
+            source = stream.get('source')
+            if source and source['status'] == 'error' and st.button("🔁 Unduh ulang", key=f"refetch_{stream_id}"):
+                manager.fetch_source(stream_id)
+            
+            # Relay: teruskan input live dari encoder lain, menggantikan video/playlist
+            relay_url = st.text_input(
+                "Relay Input Live (HLS/RTMP/SRT, kosongkan untuk memutar video)",
+                value=stream.get('relay_url') or '',
+                key=f"relay_{stream_id}"
+            ).strip()
+            if relay_url != (stream.get('relay_url') or ''):
+                manager.update_stream(stream_id, {'relay_url': relay_url or None})
+            if relay_url:
+                relay_buffer = st.number_input(
+                    "Buffer input relay (ms)",
+                    min_value=0, max_value=20000, step=500,
+                    value=int(stream.get('relay_buffer_ms') or 2000),
+                    key=f"relay_buffer_{stream_id}"
+                )
+                if relay_buffer != stream.get('relay_buffer_ms'):
+                    manager.update_stream(stream_id, {'relay_buffer_ms': int(relay_buffer)})
+            
+            # Ambient: gambar (atau klip pendek) di atas audio, video di-encode sekali saja
+            visual_file = st.file_uploader(
+                "Ambient: Gambar / Klip Loop Pendek",
+                type=['jpg', 'jpeg', 'png', 'webp', 'mp4', 'mov'],
+                key=f"ambient_image_{stream_id}"
+            )
+            visual_id = getattr(visual_file, 'file_id', None) or (visual_file and (visual_file.name, visual_file.size))
+            if visual_file and st.session_state.get(f"stored_visual_{stream_id}") != visual_id:
+                visual_path, _, _ = store_upload(visual_file, visual_file.name)
+                st.session_state[f"stored_visual_{stream_id}"] = visual_id
+                manager.update_stream(stream_id, {'ambient_image': visual_path})
+            audio_files = st.file_uploader(
+                "Ambient: Audio (boleh lebih dari satu)",
+                type=['mp3', 'm4a', 'aac', 'wav', 'flac', 'ogg', 'opus'],
+                accept_multiple_files=True,
+                key=f"ambient_audio_upload_{stream_id}"
+            )
+            audio_paths = list(stream.get('ambient_audio') or [])
+            for audio_file in audio_files or []:
+                audio_id = getattr(audio_file, 'file_id', None) or (audio_file.name, audio_file.size)
+                if st.session_state.get(f"stored_audio_{stream_id}_{audio_id}"):
+                    continue
+                audio_path, _, _ = store_upload(audio_file, audio_file.name)
+                st.session_state[f"stored_audio_{stream_id}_{audio_id}"] = True
+                if audio_path not in audio_paths:
+                    audio_paths.append(audio_path)
+                    # Isi text area mengikuti upload baru, bukan state widget sebelumnya
+                    st.session_state[f"ambient_audio_{stream_id}"] = "\n".join(audio_paths)
+            if stream.get('ambient_image') or audio_paths:
+                st.session_state.setdefault(f"ambient_audio_{stream_id}", "\n".join(audio_paths))
+                audio_text = st.text_area("Urutan audio ambient (satu path per baris)", key=f"ambient_audio_{stream_id}")
+                audio_paths = [line.strip() for line in audio_text.splitlines() if line.strip()]
+                if st.button("🚫 Matikan mode ambient", key=f"ambient_off_{stream_id}"):
+                    manager.update_stream(stream_id, {'ambient_image': None})
+            if audio_paths != list(stream.get('ambient_audio') or []):
+                manager.update_stream(stream_id, {'ambient_audio': audio_paths})
         
-        try:
-            # Update status
-            self.update_stream(stream_id, {'status': 'live'})
+        with config_col2:
+            # Stream key input
+            stream_key = st.text_input(
+                "YouTube Stream Key",
+                value=stream['stream_key'],
+                type="password",
+                key=f"key_{stream_id}"
+            )
+            if stream_key != stream['stream_key']:
+                manager.update_stream(stream_id, {'stream_key': stream_key})
             
-            # Log command
-            self._add_log(stream_id, f"🚀 Memulai streaming: {' '.join(cmd[:10])}...")
+            # Tag untuk operasi massal lewat cli.py / POST /bulk
+            tags_text = st.text_input(
+                "Tag (pisahkan dengan koma)",
+                value=", ".join(stream.get('tags') or []),
+                key=f"tags_{stream_id}",
+                help="Mis. news, rak-2; dipakai untuk start/stop massal: python cli.py start --tag news"
+            )
+            tags = [tag.strip() for tag in tags_text.split(',') if tag.strip()]
+            if tags != list(stream.get('tags') or []):
+                manager.update_stream(stream_id, {'tags': tags})
             
-            # Run process
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
+            # Tujuan tambahan (YouTube cadangan, platform lain) - di-encode sekali
+            dest_text = st.text_area(
+                "Tujuan Tambahan (satu per baris: rtmp_url stream_key)",
+                value="\n".join(f"{d['rtmp_url']} {d['stream_key']}" for d in stream.get('destinations', [])),
+                key=f"dest_{stream_id}"
             )
+            destinations = parse_destinations(dest_text)
+            if destinations != stream.get('destinations', []):
+                manager.update_stream(stream_id, {'destinations': destinations})
             
-            # Store process
-            st.session_state.processes[stream_id] = process
+            # Playlist: file diputar berurutan lewat satu koneksi RTMP
+            playlist_text = st.text_area(
+                "Playlist (satu file per baris, kosong = loop video di atas)",
+                value="\n".join(stream.get('playlist', [])),
+                key=f"playlist_{stream_id}"
+            )
+            playlist = [line.strip() for line in playlist_text.splitlines() if line.strip()]
+            if playlist != stream.get('playlist', []):
+                manager.update_stream(stream_id, {'playlist': playlist})
             
-            # Read output
-            for line in process.stdout:
-                self._add_log(stream_id, line.strip())
-                if process.poll() is not None:
-                    break
-                    
-        except Exception as e:
-            self._add_log(stream_id, f"❌ Error: {e}")
-            self.update_stream(stream_id, {'status': 'error'})
-        finally:
-            if stream_id in st.session_state.processes:
-                del st.session_state.processes[stream_id]
-            self.update_stream(stream_id, {'status': 'stopped'})
-            self._add_log(stream_id, "⏹️ Streaming dihentikan")
-    
-    def stop_stream(self, stream_id: str):
-        """Menghentikan streaming"""
-        if stream_id in st.session_state.processes:
+            shuffle = st.checkbox("Acak urutan playlist", value=stream.get('shuffle', False), key=f"shuffle_{stream_id}")
+            if shuffle != stream.get('shuffle', False):
+                manager.update_stream(stream_id, {'shuffle': shuffle})
+            
+            schedule_text = st.text_area(
+                "Jadwal (per baris: 07:00-12:00 file1.mp4, file2.mp4)",
+                value=format_schedule(stream.get('schedule', [])),
+                key=f"schedule_{stream_id}"
+            )
             try:
-                st.session_state.processes[stream_id].terminate()
-                time.sleep(1)
-                if st.session_state.processes[stream_id].poll() is None:
-                    st.session_state.processes[stream_id].kill()
-            except:
-                pass
+                schedule = parse_schedule(schedule_text)
+                if schedule != stream.get('schedule', []):
+                    manager.update_stream(stream_id, {'schedule': schedule})
+            except ValueError as e:
+                st.error(str(e))
             
-            del st.session_state.processes[stream_id]
-        
-        self.update_stream(stream_id, {'status': 'stopped'})
-        self._add_log(stream_id, "🛑 Streaming dihentikan oleh pengguna")
+            # Streaming settings
+            bitrate = st.selectbox(
+                "Bitrate",
+                BITRATE_OPTIONS,
+                index=BITRATE_OPTIONS.index(stream['bitrate']) if stream['bitrate'] in BITRATE_OPTIONS else 2,
+                key=f"bitrate_{stream_id}"
+            )
+            if bitrate != stream['bitrate']:
+                manager.update_stream(stream_id, {'bitrate': bitrate})
+            
+            resolution = st.selectbox(
+                "Resolusi",
+                ['480p', '720p', '1080p'],
+                index=['480p', '720p', '1080p'].index(stream['resolution']) if stream['resolution'] in ['480p', '720p', '1080p'] else 2,
+                key=f"res_{stream_id}"
+            )
+            if resolution != stream['resolution']:
+                manager.update_stream(stream_id, {'resolution': resolution})
+            
+            # Profil encoder; 'auto' dipilih supervisor sesuai sisa CPU
+            profile_options = [AUTO] + list(ENCODER_PROFILES)
+            current_profile = stream.get('encoder_profile', AUTO)
+            encoder_profile = st.selectbox(
+                "Profil Encoder",
+                profile_options,
+                index=profile_options.index(current_profile) if current_profile in profile_options else 0,
+                key=f"profile_{stream_id}"
+            )
+            if encoder_profile != current_profile:
+                manager.update_stream(stream_id, {'encoder_profile': encoder_profile})
+            
+            # Bitrate adaptif: bitrate/resolusi di atas menjadi tingkat tertinggi
+            st.markdown("**Bitrate adaptif**")
+            abr_enabled = st.checkbox(
+                "Turunkan bitrate saat uplink padat, naikkan lagi saat lega",
+                value=stream.get('abr', False),
+                key=f"abr_{stream_id}"
+            )
+            abr_col1, abr_col2, abr_col3 = st.columns(3)
+            with abr_col1:
+                abr_min_bitrate = st.number_input("Bitrate minimum (kbps)", 500, 10000,
+                                                  int(stream.get('abr_min_bitrate') or 1500), step=100,
+                                                  key=f"abr_min_bitrate_{stream_id}")
+            with abr_col2:
+                resolution_options = ['480p', '720p', '1080p']
+                abr_min_resolution = st.selectbox(
+                    "Resolusi minimum", resolution_options,
+                    index=resolution_options.index(stream.get('abr_min_resolution') or '480p'),
+                    key=f"abr_min_resolution_{stream_id}"
+                )
+            with abr_col3:
+                abr_priority = st.number_input("Prioritas", -10, 10, int(stream.get('abr_priority') or 0),
+                                               key=f"abr_priority_{stream_id}",
+                                               help="Lebih tinggi = diturunkan paling akhir, dinaikkan paling dulu")
+            abr = {
+                'abr': abr_enabled,
+                'abr_min_bitrate': abr_min_bitrate,
+                'abr_min_resolution': abr_min_resolution,
+                'abr_priority': abr_priority,
+            }
+            changed = {key: value for key, value in abr.items() if stream.get(key) != value}
+            if changed:
+                manager.update_stream(stream_id, changed)
+            
+            # Batas resource; berlaku saat stream di-start berikutnya
+            st.markdown("**Resource**")
+            res_col1, res_col2, res_col3 = st.columns(3)
+            with res_col1:
+                dedicated = st.number_input("Core khusus", 0, os.cpu_count() or 1,
+                                            int(stream.get('dedicated_cores') or 0), key=f"cores_{stream_id}",
+                                            help="Core eksklusif untuk stream ini (0 = pakai pool bersama)")
+                threads = st.number_input("Thread x264", 0, 64, int(stream.get('threads') or 0),
+                                          key=f"threads_{stream_id}", help="0 = sesuai core/quota")
+            with res_col2:
+                cpu_limit = st.number_input("Quota CPU (core)", 0.0, float(os.cpu_count() or 1),
+                                            float(stream.get('cpu_limit') or 0.0), step=0.5,
+                                            key=f"cpu_limit_{stream_id}", help="cgroup v2 cpu.max (0 = tanpa batas)")
+                memory = st.number_input("Batas memori (MB)", 0, 65536, int(stream.get('memory_limit_mb') or 0),
+                                         step=256, key=f"memory_{stream_id}", help="0 = tanpa batas")
+            with res_col3:
+                nice = st.number_input("Nice", 0, 19, int(stream.get('nice') or 0), key=f"nice_{stream_id}")
+                ionice_options = ['', 'best-effort', 'idle']
+                ionice = st.selectbox("IO priority", ionice_options,
+                                      index=ionice_options.index(stream.get('ionice') or ''),
+                                      format_func=lambda value: value or 'default', key=f"ionice_{stream_id}")
+            resources = {
+                'dedicated_cores': dedicated,
+                'threads': threads or None,
+                'cpu_limit': cpu_limit or None,
+                'memory_limit_mb': memory or None,
+                'nice': nice,
+                'ionice': ionice or None,
+            }
+            changed = {key: value for key, value in resources.items() if stream.get(key) != value}
+            if changed:
+                manager.update_stream(stream_id, changed)
+            
+            # Watchdog
+            auto_restart = st.checkbox(
+                "Auto-reconnect saat ffmpeg keluar/macet",
+                value=stream.get('auto_restart', True),
+                key=f"auto_restart_{stream_id}"
+            )
+            if auto_restart != stream.get('auto_restart', True):
+                manager.update_stream(stream_id, {'auto_restart': auto_restart})
+            
+            resume = st.checkbox(
+                "Lanjutkan dari posisi loop terakhir",
+                value=stream.get('resume_on_restart', True),
+                key=f"resume_{stream_id}"
+            )
+            if resume != stream.get('resume_on_restart', True):
+                manager.update_stream(stream_id, {'resume_on_restart': resume})
+            
+            # Mode -c copy tidak men-decode video; preview di sana berarti decode penuh tambahan
+            preview_options = {None: "Otomatis (hanya saat re-encode)", True: "Selalu (copy ikut decode)",
+                               False: "Mati"}
+            preview_setting = st.selectbox(
+                "Preview di card (JPEG 1 fps dari ffmpeg yang sama)",
+                options=list(preview_options),
+                index=list(preview_options).index(stream.get('preview')),
+                format_func=preview_options.get,
+                key=f"preview_{stream_id}"
+            )
+            if preview_setting != stream.get('preview'):
+                manager.update_stream(stream_id, {'preview': preview_setting})
     
-    def delete_stream(self, stream_id: str):
-        """Menghapus stream"""
-        if stream_id in st.session_state.processes:
-            self.stop_stream(stream_id)
-        
-        if stream_id in st.session_state.streams:
-            del st.session_state.streams[stream_id]
-        
-        if stream_id in st.session_state.stream_logs:
-            del st.session_state.stream_logs[stream_id]
+    # Button group
+    col1, col2, col3 = st.columns(3)
     
-    def _add_log(self, stream_id: str, message: str):
-        """Menambahkan log untuk stream"""
-        if stream_id not in st.session_state.stream_logs:
-            st.session_state.stream_logs[stream_id] = []
-        
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        st.session_state.stream_logs[stream_id].append(f"[{timestamp}] {message}")
-        
-        # Keep only last 50 logs
-        if len(st.session_state.stream_logs[stream_id]) > 50:
-            st.session_state.stream_logs[stream_id] = st.session_state.stream_logs[stream_id][-50:]
+    with col1:
+        if st.button("⏹️ Stop", key=f"stop_{stream_id}", use_container_width=True):
+            try:
+                manager.stop_stream(stream_id)
+            except (SupervisorError, requests.Timeout) as e:
+                # Supervisor tetap menghentikan ffmpeg di background; status diperbarui di refresh berikutnya
+                st.warning(f"Stop {stream['title']} belum selesai: {e}")
+            else:
+                # Jadwal auto-refresh card berubah, jadi halaman dirender ulang (tanpa jeda)
+                st.rerun()
+    
+    with col2:
+        if st.button("🗑️ Hapus Video", key=f"delete_{stream_id}", use_container_width=True):
+            # File hasil dedup bisa dipakai stream lain (video atau playlist); supervisor yang memutuskan
+            try:
+                st.toast(manager.release_video(stream_id))
+            except SupervisorError as e:
+                st.error(str(e))
+            else:
+                rerun_card()
+    
+    with col3:
+        if stream['status'] not in RUNNING_STATUSES or stream['status'] == 'armed':
+            # Stream siaga: LIVE hanya menyambungkan relay, tanpa menjalankan ffmpeg baru
+            if st.button("▶️ LIVE", key=f"live_{stream_id}", use_container_width=True):
+                if manager.start_stream(stream_id):
+                    st.toast(f"Streaming {stream['title']} dimulai!")
+                    st.rerun()
+            if stream['status'] != 'armed':
+                premiere = st.text_input("Go-live terjadwal (HH:MM:SS)", key=f"premiere_{stream_id}",
+                                         placeholder="kosong = manual")
+                if st.button("🔥 Siaga", key=f"arm_{stream_id}", use_container_width=True,
+                             help="Jalankan ffmpeg lebih dulu agar go-live hampir instan"):
+                    try:
+                        go_live_at = next_clock_time(premiere) if premiere.strip() else None
+                    except ValueError:
+                        st.error("Format jam salah, contoh 19:30:00")
+                    else:
+                        if manager.arm_stream(stream_id, go_live_at):
+                            st.toast(f"{stream['title']} siaga")
+                            st.rerun()
+        else:
+            st.markdown('<div class="live-badge" style="position: static; margin: auto;">LIVE</div>', unsafe_allow_html=True)
+    
+    # Stream logs: hanya diambil dari supervisor saat ditampilkan
+    if st.toggle("📋 Log Streaming", key=f"show_log_{stream_id}"):
+        limit = st.select_slider("Jumlah baris", options=[20, 100, 500], key=f"log_limit_{stream_id}")
+        st.code("\n".join(manager.get_logs(stream_id, limit=limit)) or "Belum ada log", language=None)
+        st.caption(f"Log lengkap: {LOG_DIR}/{safe_filename(stream_id)}.log (rotasi .gz)")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    st.markdown("---")
 
 def main():
     # Header
@@ -453,208 +1039,62 @@ def main():
         {
             'id': 'stream1',
             'title': 'Live Musik Anime',
-            'duration': '0:14',
             'subtitle': '0:14 / 0:14',
             'video_file': 'anime_music.mp4'  # Default, bisa diganti
         },
         {
             'id': 'stream2',
             'title': 'Live Music Lofi',
-            'duration': '2:30',
             'subtitle': 'Bintang 17 di Maret',
             'video_file': 'lofi_music.mp4'
         },
         {
             'id': 'stream3',
             'title': 'Live Suara Hujan & Petir',
-            'duration': '1:23',
             'subtitle': '1:23 / 1:23',
             'video_file': 'rain_thunder.mp4'
         }
     ]
     
     for stream_data in default_streams:
-        if stream_data['id'] not in st.session_state.streams:
+        if stream_data['id'] not in manager.streams:
             manager.add_stream(
                 stream_data['id'],
                 stream_data['title'],
-                stream_data['video_file'] if os.path.exists(stream_data['video_file']) else None
+                stream_data['video_file'] if os.path.exists(stream_data['video_file']) else None,
+                updates={'subtitle': stream_data['subtitle']}
             )
-            manager.update_stream(stream_data['id'], {
-                'duration': stream_data['duration'],
-                'current_time': stream_data['duration'],
-                'subtitle': stream_data['subtitle']
-            })
+    
+    # Media library dibaca sekali per rerun untuk semua card
+    media_library = manager.list_media()
+    media_names = {
+        item['path']: f"{item['name']} ({format_time(item['duration'])})" if item['duration'] else item['name']
+        for item in media_library
+    }
     
     # Main container
     main_container = st.container()
     
     with main_container:
         # Display all streams
-        for stream_id in list(st.session_state.streams.keys()):
-            stream = st.session_state.streams[stream_id]
-            
-            # Determine card class
-            card_class = "stream-card"
-            if stream['status'] == 'live':
-                card_class += " live"
-            
-            st.markdown(f'<div class="{card_class}">', unsafe_allow_html=True)
-            
-            # Stream number
-            stream_num = list(st.session_state.streams.keys()).index(stream_id) + 1
-            st.markdown(f'<div class="stream-number">{stream_num}</div>', unsafe_allow_html=True)
-            
-            # Stream title
-            st.markdown(f'<div class="stream-title">{stream["title"]}</div>', unsafe_allow_html=True)
-            st.markdown(f'<div class="stream-subtitle">{stream.get("subtitle", "")}</div>', unsafe_allow_html=True)
-            
-            # Live badge if streaming
-            if stream['status'] == 'live':
-                st.markdown('<div class="live-badge">LIVE</div>', unsafe_allow_html=True)
-            
-            # Video info section
-            col1, col2 = st.columns([1, 3])
-            
-            with col1:
-                st.markdown(f'<div class="duration">{stream["duration"]}</div>', unsafe_allow_html=True)
-            
-            with col2:
-                if stream.get('loop_video', True):
-                    st.markdown('<div class="loop-badge">Loop Video</div>', unsafe_allow_html=True)
-            
-            # RTMP URL
-            st.markdown(f'<div class="rtmp-box">{stream["rtmp_url"]}</div>', unsafe_allow_html=True)
-            
-            # Stream settings table
-            st.markdown("""
-            <table class="settings-table">
-                <thead>
-                    <tr>
-                        <th>Bitrate (kbps)</th>
-                        <th>Resolusi</th>
-                        <th>FPS</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    <tr>
-                        <td>{bitrate}</td>
-                        <td>{resolution}</td>
-                        <td>{fps}</td>
-                    </tr>
-                </tbody>
-            </table>
-            """.format(
-                bitrate=stream['bitrate'],
-                resolution=stream['resolution'],
-                fps=stream['fps']
-            ), unsafe_allow_html=True)
-            
-            # Stream configuration
-            with st.expander("⚙️ Konfigurasi Stream", expanded=False):
-                config_col1, config_col2 = st.columns(2)
-                
-                with config_col1:
-                    # Video selection
-                    video_files = [f for f in os.listdir('.') if f.endswith(('.mp4', '.mov', '.avi', '.mkv', '.flv'))]
-                    
-                    if video_files:
-                        selected_video = st.selectbox(
-                            "Pilih Video",
-                            video_files,
-                            index=video_files.index(stream['video_path']) if stream['video_path'] in video_files else 0,
-                            key=f"video_select_{stream_id}"
-                        )
-                        if selected_video != stream['video_path']:
-                            manager.update_stream(stream_id, {'video_path': selected_video})
-                    
-                    # Upload new video
-                    uploaded_file = st.file_uploader(
-                        "Upload Video Baru",
-                        type=['mp4', 'mov', 'avi', 'mkv', 'flv'],
-                        key=f"upload_{stream_id}"
-                    )
-                    
-                    if uploaded_file:
-                        # Save uploaded file
-                        with open(uploaded_file.name, "wb") as f:
-                            f.write(uploaded_file.read())
-                        manager.update_stream(stream_id, {'video_path': uploaded_file.name})
-                        st.success("✅ Video berhasil diupload!")
-                
-                with config_col2:
-                    # Stream key input
-                    stream_key = st.text_input(
-                        "YouTube Stream Key",
-                        value=stream['stream_key'],
-                        type="password",
-                        key=f"key_{stream_id}"
-                    )
-                    if stream_key != stream['stream_key']:
-                        manager.update_stream(stream_id, {'stream_key': stream_key})
-                    
-                    # Streaming settings
-                    bitrate = st.selectbox(
-                        "Bitrate",
-                        [1500, 2500, 3000, 4000, 5000],
-                        index=[1500, 2500, 3000, 4000, 5000].index(stream['bitrate']) if stream['bitrate'] in [1500, 2500, 3000, 4000, 5000] else 2,
-                        key=f"bitrate_{stream_id}"
-                    )
-                    if bitrate != stream['bitrate']:
-                        manager.update_stream(stream_id, {'bitrate': bitrate})
-                    
-                    resolution = st.selectbox(
-                        "Resolusi",
-                        ['480p', '720p', '1080p'],
-                        index=['480p', '720p', '1080p'].index(stream['resolution']) if stream['resolution'] in ['480p', '720p', '1080p'] else 2,
-                        key=f"res_{stream_id}"
-                    )
-                    if resolution != stream['resolution']:
-                        manager.update_stream(stream_id, {'resolution': resolution})
-            
-            # Button group
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                if st.button("⏹️ Stop", key=f"stop_{stream_id}", use_container_width=True):
-                    manager.stop_stream(stream_id)
-                    st.rerun()
-            
-            with col2:
-                if st.button("🗑️ Hapus Video", key=f"delete_{stream_id}", use_container_width=True):
-                    if stream['video_path'] and os.path.exists(stream['video_path']):
-                        try:
-                            os.remove(stream['video_path'])
-                            manager.update_stream(stream_id, {'video_path': None})
-                            st.success("Video dihapus!")
-                            time.sleep(1)
-                            st.rerun()
-                        except:
-                            st.error("Gagal menghapus video!")
-            
-            with col3:
-                if stream['status'] != 'live':
-                    if st.button("▶️ LIVE", key=f"live_{stream_id}", use_container_width=True):
-                        if manager.start_stream(stream_id):
-                            st.success(f"Streaming {stream['title']} dimulai!")
-                            time.sleep(1)
-                            st.rerun()
-                else:
-                    st.markdown('<div class="live-badge" style="position: static; margin: auto;">LIVE</div>', unsafe_allow_html=True)
-            
-            # Stream logs
-            with st.expander("📋 Log Streaming", expanded=False):
-                if stream_id in st.session_state.stream_logs:
-                    log_text = "\n".join(st.session_state.stream_logs[stream_id][-20:])
-                    st.text_area("", value=log_text, height=150, key=f"log_{stream_id}", label_visibility="collapsed")
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-            st.markdown("---")
+        for stream_num, stream_id in enumerate(list(manager.streams), start=1):
+            if HAS_FRAGMENT:
+                # Card yang sedang live di-refresh sendiri; card lain hanya saat diinteraksi
+                running = manager.streams[stream_id]['status'] in RUNNING_STATUSES
+                st.fragment(render_card, run_every=LIVE_REFRESH if running else None)(
+                    manager, stream_id, stream_num, media_names)
+            else:
+                render_card(manager, stream_id, stream_num, media_names)
+    
+    if not HAS_FRAGMENT and st_autorefresh is not None:
+        # Streamlit lama tanpa fragment: refresh seluruh halaman hanya bila ada yang live
+        if any(s['status'] in RUNNING_STATUSES for s in manager.streams.values()):
+            st_autorefresh(interval=int(LIVE_REFRESH * 1000), key="live_refresh")
     
     # Add new stream button
     if st.button("➕ Tambah Stream Baru", use_container_width=True):
-        new_id = f"stream{len(st.session_state.streams) + 1}"
-        manager.add_stream(new_id, f"Stream Baru {len(st.session_state.streams) + 1}")
+        new_id = f"stream{len(manager.streams) + 1}"
+        manager.add_stream(new_id, f"Stream Baru {len(manager.streams) + 1}")
         st.rerun()
     
     # Footer
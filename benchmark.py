@@ -0,0 +1,205 @@
+"""Benchmark throughput encoder untuk menentukan kepadatan channel per node.
+
+Menjalankan perintah yang sama persis dengan yang disusun supervisor
+(pipeline.build_command + profil encoder), hanya saja input diganti sumber
+sintetis lavfi dan output dibuang ke null sink. Untuk setiap kombinasi
+resolusi/bitrate/fps/preset, jumlah stream paralel dinaikkan bertahap sampai
+ada stream yang tidak lagi realtime.
+
+    python benchmark.py --resolutions 720p,1080p --presets veryfast,faster \\
+        --concurrency 1,2,4,8 --duration 30 --output c6i.large.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import psutil
+
+from engine import ProcessEngine
+from pipeline import build_command
+from profiles import ENCODER_PROFILES, estimate_cost, get_profile
+from progress import MIN_SPEED, ProgressParser, ProgressSample
+
+NULL_SINK = os.devnull
+WARMUP = 5.0  # detik awal yang diabaikan (startup encoder, lookahead)
+
+# Video dan audio dalam satu input lavfi: label out0/out1 menjadi stream 0:v dan 0:a
+LAVFI_SOURCE = "testsrc2=size=1920x1080:rate={fps},format=yuv420p[out0];sine=frequency=440:sample_rate=44100[out1]"
+
+
+def _csv(cast):
+    return lambda value: [cast(item) for item in value.split(',') if item]
+
+
+def bench_command(resolution: str, bitrate: int, fps: int, preset: str, duration: float) -> List[str]:
+    """Perintah ffmpeg stream sungguhan dengan input lavfi dan output null sink"""
+    stream = {
+        'video_path': LAVFI_SOURCE.format(fps=fps),
+        'resolution': resolution,
+        'bitrate': bitrate,
+        'fps': fps,
+        'rtmp_url': '',
+        'stream_key': '',
+    }
+    cmd = build_command(stream, [NULL_SINK], profile=get_profile(preset))
+    cmd.insert(cmd.index('-i'), '-f')
+    cmd.insert(cmd.index('-i'), 'lavfi')
+    # Opsi output terakhir selalu "-f flv <target>"; -t dan -y diletakkan sebelumnya
+    return cmd[:1] + ['-y'] + cmd[1:-3] + ['-t', f'{duration:g}'] + cmd[-3:]
+
+
+def sustained_speed(samples: List[ProgressSample], warmup: float = WARMUP) -> Optional[float]:
+    """Speed setelah warmup, dari selisih out_time terhadap waktu dinding"""
+    if not samples:
+        return None
+    start = next((s for s in samples if s.timestamp - samples[0].timestamp >= warmup), samples[0])
+    end = samples[-1]
+    elapsed = end.timestamp - start.timestamp
+    if elapsed <= 0:
+        return end.speed
+    return (end.out_time - start.out_time) / elapsed
+
+
+async def _run_batch(engine: ProcessEngine, cmd: List[str], concurrency: int) -> List[Dict]:
+    async def run_one(index: int) -> Dict:
+        parser = ProgressParser()
+        samples: List[ProgressSample] = []
+        errors: List[str] = []
+
+        def on_progress(line: str):
+            sample = parser.feed(line)
+            if sample is not None:
+                samples.append(sample)
+
+        def on_line(line: str):
+            errors.append(line)
+            del errors[:-5]
+
+        returncode = await engine.run_process(f'bench-{index}', cmd, on_line, on_progress)
+        result = {
+            'returncode': returncode,
+            'speed': sustained_speed(samples),
+            'drop_frames': samples[-1].drop_frames if samples else 0,
+            'dup_frames': samples[-1].dup_frames if samples else 0,
+        }
+        if returncode != 0:
+            result['error'] = errors[-1] if errors else ''
+        return result
+
+    return await asyncio.gather(*(run_one(i) for i in range(concurrency)))
+
+
+def run_case(engine: ProcessEngine, cmd: List[str], concurrency: int) -> Dict:
+    """Jalankan `concurrency` proses ffmpeg identik bersamaan dan ringkas hasilnya"""
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    started = time.monotonic()
+    results = engine.call(_run_batch(engine, cmd, concurrency))
+    wall = time.monotonic() - started
+    usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    cpu_seconds = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+    speeds = [r['speed'] for r in results if r['speed'] is not None]
+    failed = [r for r in results if r['returncode'] != 0]
+    min_speed = min(speeds) if speeds else None
+    return {
+        'concurrency': concurrency,
+        'min_speed': round(min_speed, 3) if min_speed is not None else None,
+        'avg_speed': round(sum(speeds) / len(speeds), 3) if speeds else None,
+        'cpu_cores_per_stream': round(cpu_seconds / wall / concurrency, 3),
+        'drop_frames': sum(r['drop_frames'] for r in results),
+        'dup_frames': sum(r['dup_frames'] for r in results),
+        'realtime': not failed and len(speeds) == concurrency and min_speed >= MIN_SPEED,
+        'errors': [r['error'] for r in failed],
+    }
+
+
+def ffmpeg_version() -> str:
+    try:
+        output = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True).stdout
+    except OSError:
+        return 'ffmpeg tidak ditemukan'
+    return output.splitlines()[0] if output else ''
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark throughput encoder ffmpeg StreamFlow")
+    parser.add_argument('--resolutions', type=_csv(str), default=['480p', '720p', '1080p'])
+    parser.add_argument('--bitrates', type=_csv(int), default=[3000])
+    parser.add_argument('--fps', type=_csv(int), default=[30])
+    parser.add_argument('--presets', type=_csv(str), default=['veryfast'])
+    parser.add_argument('--concurrency', type=_csv(int), default=[1, 2, 4, 8])
+    parser.add_argument('--duration', type=float, default=30, help="detik per percobaan")
+    parser.add_argument('--output', help="simpan hasil JSON ke file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    unknown = [p for p in args.presets if p not in ENCODER_PROFILES]
+    if unknown:
+        parser.error(f"preset tidak dikenal: {', '.join(unknown)}")
+
+    engine = ProcessEngine()
+    cases = []
+    try:
+        for resolution, bitrate, fps, preset in itertools.product(
+                args.resolutions, args.bitrates, args.fps, args.presets):
+            cmd = bench_command(resolution, bitrate, fps, preset, args.duration)
+            runs = []
+            for concurrency in sorted(args.concurrency):
+                print(f"⏱️ {resolution} {bitrate}k {fps}fps {preset} x{concurrency}", file=sys.stderr)
+                run = run_case(engine, cmd, concurrency)
+                runs.append(run)
+                if not run['realtime']:
+                    break
+
+            realtime = [run['concurrency'] for run in runs if run['realtime']]
+            single = runs[0]['cpu_cores_per_stream'] if runs else None
+            cases.append({
+                'resolution': resolution,
+                'bitrate': bitrate,
+                'fps': fps,
+                'preset': preset,
+                'command': cmd,
+                'runs': runs,
+                'max_realtime_streams': max(realtime) if realtime else 0,
+                # Perkiraan linear dari satu stream; bandingkan dengan max_realtime_streams
+                'estimated_streams_by_cpu': int(psutil.cpu_count() / single) if single else None,
+                'model_cost_cores': round(estimate_cost(resolution, fps, preset), 3),
+            })
+    finally:
+        engine.shutdown()
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'host': {
+            'hostname': platform.node(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': psutil.cpu_count(),
+            'cpu_count_physical': psutil.cpu_count(logical=False),
+            'memory_bytes': psutil.virtual_memory().total,
+            'ffmpeg': ffmpeg_version(),
+        },
+        'duration': args.duration,
+        'warmup': WARMUP,
+        'min_speed': MIN_SPEED,
+        'cases': cases,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""Operasi massal: start/stop/restart banyak stream sekaligus, dipilih lewat tag atau pola.
+
+Menyalakan puluhan channel setelah maintenance tidak perlu lagi klik per card.
+Start dijalankan bertahap: paling banyak `concurrency` stream yang sedang dalam
+fase start (probe, handshake RTMP, ramp-up encoder) dan jeda `stagger` detik
+antar launch, sehingga lonjakan CPU saat start tidak membuat stream yang sudah
+live turun di bawah realtime. Slot launch baru dilepas setelah ffmpeg
+melaporkan sampel -progress pertama dan melewati RAMP_SECONDS, atau gagal. Stop murah dan dijalankan paralel.
+
+Job berjalan di thread supervisor/scheduler; client (cli.py, UI) cukup
+memantau GET /bulk/<id>.
+"""
+import fnmatch
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from health import ACTIVE_STATUSES, RUNNING_STATUSES
+
+ACTIONS = ('start', 'stop', 'restart')
+DEFAULT_CONCURRENCY = 4  # stream yang boleh berada di fase start bersamaan
+DEFAULT_STAGGER = 2.0  # detik minimum antar launch
+STOP_WORKERS = 16  # stop menunggu ffmpeg keluar (hingga beberapa detik); jalankan paralel
+READY_TIMEOUT = 60.0  # batas menunggu sampel -progress pertama sebelum slot dilepas
+RAMP_SECONDS = 5.0  # setelah sampel pertama, encoder belum stabil; slot ditahan selama ini
+POLL_INTERVAL = 0.5
+JOB_HISTORY = 20  # job selesai yang masih bisa dilihat
+
+# Status yang menandakan stream sudah mengirim atau memang sudah berhenti
+READY_STATUSES = ACTIVE_STATUSES
+FAILED_STATUSES = ('stopped', 'error')
+
+StartFn = Callable[[str, bool], Tuple[bool, str]]  # (stream_id, resume) -> (ok, pesan)
+StopFn = Callable[[str], None]
+StateFn = Callable[[str], Optional[Dict]]  # stream_id -> stream (minimal 'status' dan 'speed')
+
+logger = logging.getLogger(__name__)
+
+
+def select(streams: Dict[str, Dict], ids: Iterable[str] = (), tags: Iterable[str] = (),
+           pattern: Optional[str] = None, everything: bool = False) -> List[str]:
+    """ID stream yang dipilih, urut berdasarkan judul.
+
+    ids dipakai apa adanya. tags: stream harus punya salah satunya. pattern:
+    glob (mis. 'news-*') terhadap id atau judul. Tag dan pola yang diisi
+    keduanya harus cocok. Tanpa filter apa pun tidak ada yang dipilih kecuali
+    everything, agar "start semua" tidak terjadi karena argumen terlupa.
+    """
+    ids, tags = list(ids), set(tags)
+    chosen = [stream_id for stream_id in ids if stream_id in streams]
+    if tags or pattern or everything:
+        for stream_id, stream in streams.items():
+            if stream_id in chosen:
+                continue
+            if tags and not tags & set(stream.get('tags') or []):
+                continue
+            if pattern and not (fnmatch.fnmatch(stream_id, pattern)
+                                or fnmatch.fnmatch(stream.get('title') or '', pattern)):
+                continue
+            chosen.append(stream_id)
+    return sorted(chosen, key=lambda stream_id: (streams[stream_id].get('title') or stream_id, stream_id))
+
+
+class BulkJob:
+    """Satu operasi massal dan hasil per stream"""
+
+    def __init__(self, job_id: int, action: str, stream_ids: List[str], concurrency: int, stagger: float):
+        self.id = job_id
+        self.action = action
+        self.stream_ids = stream_ids
+        self.concurrency = max(1, concurrency)
+        self.stagger = max(0.0, stagger)
+        self.created_at = datetime.now().isoformat(timespec='seconds')
+        self.finished_at: Optional[str] = None
+        # stream_id -> {'state': pending/launching/live/stopped/skipped/failed/timeout/cancelled, 'message'}
+        self.results: Dict[str, Dict] = {stream_id: {'state': 'pending', 'message': ''} for stream_id in stream_ids}
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def set(self, stream_id: str, state: str, message: str = ''):
+        with self._lock:
+            self.results[stream_id] = {'state': state, 'message': message}
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            results = {stream_id: dict(result) for stream_id, result in self.results.items()}
+        counts: Dict[str, int] = {}
+        for result in results.values():
+            counts[result['state']] = counts.get(result['state'], 0) + 1
+        return {
+            'id': self.id,
+            'action': self.action,
+            'concurrency': self.concurrency,
+            'stagger': self.stagger,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'done': self.done,
+            'counts': counts,
+            'results': results,
+        }
+
+
+class BulkRunner:
+    """Menjalankan job massal di background dengan launch bertahap dan terbatas"""
+
+    def __init__(self, start: StartFn, stop: StopFn, state: StateFn):
+        self._start = start
+        self._stop = stop
+        self._state = state
+        self._ids = itertools.count(1)
+        self._jobs: Dict[int, BulkJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, action: str, stream_ids: List[str], concurrency: int = DEFAULT_CONCURRENCY,
+               stagger: float = DEFAULT_STAGGER) -> BulkJob:
+        if action not in ACTIONS:
+            raise ValueError(f"aksi {action!r} tidak dikenal (pilih {', '.join(ACTIONS)})")
+        job = BulkJob(next(self._ids), action, stream_ids, concurrency, stagger)
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [old.id for old in self._jobs.values() if old.done]
+            for old_id in finished[:max(len(finished) - JOB_HISTORY, 0)]:
+                del self._jobs[old_id]
+        threading.Thread(target=self._run, args=(job,), name=f'bulk-{job.id}', daemon=True).start()
+        return job
+
+    def get(self, job_id: int) -> Optional[BulkJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in jobs]
+
+    def cancel(self, job_id: int) -> bool:
+        """Batalkan launch yang belum berjalan; stream yang sudah di-start dibiarkan"""
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancelled.set()
+        return True
+
+    def _status(self, stream_id: str) -> Optional[str]:
+        return (self._state(stream_id) or {}).get('status')
+
+    def _run(self, job: BulkJob):
+        logger.info("Job massal #%d: %s %d stream", job.id, job.action, len(job.stream_ids))
+        try:
+            if job.action == 'stop':
+                with ThreadPoolExecutor(min(STOP_WORKERS, max(len(job.stream_ids), 1))) as pool:
+                    for stream_id in job.stream_ids:
+                        pool.submit(self._stop_one, job, stream_id)
+            else:
+                self._launch_all(job)
+        finally:
+            for stream_id, result in job.to_dict()['results'].items():
+                if result['state'] == 'pending':
+                    job.set(stream_id, 'cancelled')
+            job.finished_at = datetime.now().isoformat(timespec='seconds')
+            logger.info("Job massal #%d selesai: %s", job.id, job.to_dict()['counts'])
+
+    def _stop_one(self, job: BulkJob, stream_id: str):
+        if job.cancelled.is_set():
+            return
+        if self._status(stream_id) not in RUNNING_STATUSES:
+            job.set(stream_id, 'skipped', "sudah berhenti")
+            return
+        try:
+            self._stop(stream_id)
+            job.set(stream_id, 'stopped')
+        except Exception as e:
+            job.set(stream_id, 'failed', str(e))
+
+    def _launch_all(self, job: BulkJob):
+        """Launch satu per satu: tunggu slot kosong dan jeda stagger, lalu start di thread sendiri"""
+        slots = threading.Semaphore(job.concurrency)
+        workers = []
+        last_launch = 0.0
+        for stream_id in job.stream_ids:
+            if job.action == 'start' and self._status(stream_id) in RUNNING_STATUSES:
+                job.set(stream_id, 'skipped', "sudah berjalan")
+                continue
+            while not slots.acquire(timeout=POLL_INTERVAL):
+                if job.cancelled.is_set():
+                    break
+            if job.cancelled.is_set():
+                break
+            delay = last_launch + job.stagger - time.monotonic()
+            if delay > 0 and job.cancelled.wait(delay):
+                slots.release()
+                break
+            last_launch = time.monotonic()
+            worker = threading.Thread(target=self._launch_one, args=(job, stream_id, slots),
+                                      name=f'bulk-{job.id}-{stream_id}', daemon=True)
+            worker.start()
+            workers.append(worker)
+        for worker in workers:
+            worker.join()
+
+    def _launch_one(self, job: BulkJob, stream_id: str, slots: threading.Semaphore):
+        try:
+            job.set(stream_id, 'launching')
+            restart = job.action == 'restart'
+            if restart and self._status(stream_id) in RUNNING_STATUSES:
+                self._stop(stream_id)
+            # Restart melanjutkan dari posisi terakhir; start biasa mulai dari awal
+            ok, message = self._start(stream_id, restart)
+            if not ok:
+                job.set(stream_id, 'failed', message)
+                return
+            state, message = self._wait_ready(stream_id, message)
+            job.set(stream_id, state, message)
+        except Exception as e:
+            job.set(stream_id, 'failed', str(e))
+        finally:
+            slots.release()
+
+    def _wait_ready(self, stream_id: str, message: str) -> Tuple[str, str]:
+        """Tunggu sampel -progress pertama lalu ramp-up; slot launch ditahan selama itu.
+
+        Status 'live' sudah dipasang sebelum ffmpeg di-spawn, jadi yang menandakan
+        stream benar-benar mengirim adalah speed yang terisi dari -progress.
+        """
+        deadline = time.monotonic() + READY_TIMEOUT
+        while time.monotonic() < deadline:
+            stream = self._state(stream_id) or {}
+            status = stream.get('status')
+            if status in READY_STATUSES and stream.get('speed') is not None:
+                time.sleep(RAMP_SECONDS)
+                return 'live', message
+            if status in FAILED_STATUSES:
+                return 'failed', f"berhenti dengan status {status}"
+            time.sleep(POLL_INTERVAL)
+        return 'timeout', f"belum mengirim setelah {READY_TIMEOUT:.0f} detik"
+
+
+def submit_request(runner: BulkRunner, streams: Dict[str, Dict], body: Dict) -> Tuple[int, Dict]:
+    """POST /bulk: pilih stream dari body lalu jalankan job; dipakai supervisor dan scheduler"""
+    stream_ids = select(streams, body.get('ids') or [], body.get('tags') or [], body.get('pattern'),
+                        bool(body.get('all')))
+    if not stream_ids:
+        return 400, {'error': "Tidak ada stream yang cocok dengan ids/tags/pattern"}
+    job = runner.submit(body.get('action', ''), stream_ids,
+                        int(body.get('concurrency') or DEFAULT_CONCURRENCY),
+                        float(body['stagger']) if body.get('stagger') is not None else DEFAULT_STAGGER)
+    return 202, job.to_dict()
@@ -0,0 +1,173 @@
+"""CLI headless untuk supervisor/scheduler StreamFlow: operasi massal tanpa UI.
+
+Stream dipilih lewat id, tag (`--tag`, boleh berulang) atau pola glob terhadap
+id/judul (`--pattern`). Start dan restart dijalankan bertahap oleh supervisor
+(lihat bulk.py); CLI hanya mengirim job lalu menampilkan progresnya.
+
+    python cli.py list --tag news
+    python cli.py start --tag news --concurrency 4 --stagger 3
+    python cli.py restart --pattern 'rak2-*'
+    python cli.py stop --all
+    python cli.py tag news ch1 ch2 ch3
+    python cli.py jobs
+
+Alamat API diambil dari --url atau env STREAMFLOW_SUPERVISOR (sama dengan UI).
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+import requests
+
+from api import DEFAULT_HOST, DEFAULT_PORT
+from bulk import DEFAULT_CONCURRENCY, DEFAULT_STAGGER, select
+
+POLL_INTERVAL = 1.0
+FAILED_STATES = ('failed', 'timeout')
+
+
+class ApiError(Exception):
+    """Supervisor menolak permintaan atau tidak bisa dihubungi"""
+
+
+class Client:
+    """Client HTTP minimal untuk API supervisor/scheduler"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.session = requests.Session()
+
+    def request(self, method: str, path: str, **kwargs):
+        try:
+            response = self.session.request(method, f"{self.url}{path}", timeout=30, **kwargs)
+        except requests.RequestException as e:
+            raise ApiError(f"{self.url} tidak bisa dihubungi: {e}")
+        body = response.json()
+        if response.status_code >= 400:
+            raise ApiError(body.get('error', response.reason))
+        return body
+
+
+def _selector(args) -> Dict:
+    return {'ids': args.ids, 'tags': args.tag, 'pattern': args.pattern, 'all': args.all}
+
+
+def cmd_list(client: Client, args) -> int:
+    streams = client.request('GET', '/streams')
+    # Tanpa filter, list menampilkan semua stream (berbeda dengan start/stop yang butuh --all)
+    filtered = bool(args.ids or args.tag or args.pattern)
+    chosen = select(streams, args.ids, args.tag, args.pattern, everything=args.all or not filtered)
+    for stream_id in chosen:
+        stream = streams[stream_id]
+        tags = ','.join(stream.get('tags') or []) or '-'
+        node = f" @{stream['node']}" if stream.get('node') else ''
+        print(f"{stream_id:<20} {stream['status']:<12} {tags:<20} {stream['title']}{node}")
+    return 0
+
+
+def cmd_bulk(client: Client, args) -> int:
+    if not (args.ids or args.tag or args.pattern or args.all):
+        print("Pilih stream dengan id, --tag, --pattern atau --all", file=sys.stderr)
+        return 2
+    job = client.request('POST', '/bulk', json={
+        'action': args.command, **_selector(args),
+        'concurrency': args.concurrency, 'stagger': args.stagger,
+    })
+    print(f"Job #{job['id']}: {args.command} {len(job['results'])} stream "
+          f"(maks {job['concurrency']} bersamaan, jeda {job['stagger']:g} detik)")
+    if args.no_wait:
+        return 0
+    return _follow(client, job)
+
+
+def _follow(client: Client, job: Dict) -> int:
+    """Tampilkan perubahan status per stream sampai job selesai; Ctrl-C membatalkan launch sisanya"""
+    shown: Dict[str, str] = {}
+    try:
+        while True:
+            for stream_id, result in job['results'].items():
+                if shown.get(stream_id) != result['state'] and result['state'] != 'pending':
+                    shown[stream_id] = result['state']
+                    message = f" — {result['message']}" if result['message'] else ''
+                    print(f"  {stream_id:<20} {result['state']}{message}")
+            if job['done']:
+                break
+            time.sleep(POLL_INTERVAL)
+            job = client.request('GET', f"/bulk/{job['id']}")
+    except KeyboardInterrupt:
+        client.request('DELETE', f"/bulk/{job['id']}")
+        print(f"\nJob #{job['id']} dibatalkan; stream yang sudah di-start tetap berjalan")
+        return 130
+    counts = ', '.join(f"{state} {count}" for state, count in sorted(job['counts'].items()))
+    print(f"Selesai: {counts}")
+    return 1 if any(job['counts'].get(state) for state in FAILED_STATES) else 0
+
+
+def cmd_tag(client: Client, args) -> int:
+    streams = client.request('GET', '/streams')
+    for stream_id in args.stream_ids:
+        if stream_id not in streams:
+            print(f"Stream {stream_id} tidak ada", file=sys.stderr)
+            return 1
+        tags: List[str] = list(streams[stream_id].get('tags') or [])
+        if args.remove:
+            tags = [tag for tag in tags if tag != args.name]
+        elif args.name not in tags:
+            tags.append(args.name)
+        client.request('PATCH', f'/streams/{stream_id}', json={'tags': tags})
+        print(f"{stream_id}: {', '.join(tags) or '-'}")
+    return 0
+
+
+def cmd_jobs(client: Client, args) -> int:
+    for job in client.request('GET', '/bulk')['jobs']:
+        counts = ', '.join(f"{state} {count}" for state, count in sorted(job['counts'].items()))
+        state = 'selesai' if job['done'] else 'berjalan'
+        print(f"#{job['id']:<4} {job['action']:<8} {state:<9} {job['created_at']}  {counts}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Operasi massal stream StreamFlow tanpa UI")
+    parser.add_argument('--url', default=os.environ.get('STREAMFLOW_SUPERVISOR', f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"),
+                        help="alamat supervisor atau scheduler")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_selector(sub):
+        sub.add_argument('ids', nargs='*', help="id stream")
+        sub.add_argument('--tag', action='append', default=[], help="pilih stream dengan tag ini (boleh berulang)")
+        sub.add_argument('--pattern', help="glob terhadap id atau judul, mis. 'news-*'")
+        sub.add_argument('--all', action='store_true', help="semua stream")
+
+    add_selector(commands.add_parser('list', help="tampilkan stream dan statusnya"))
+    for action, help_text in (('start', "start stream terpilih secara bertahap"),
+                              ('stop', "stop stream terpilih"),
+                              ('restart', "stop lalu start lagi dari posisi terakhir, bertahap")):
+        sub = commands.add_parser(action, help=help_text)
+        add_selector(sub)
+        sub.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                         help="stream yang boleh sedang start bersamaan")
+        sub.add_argument('--stagger', type=float, default=DEFAULT_STAGGER, help="detik minimum antar launch")
+        sub.add_argument('--no-wait', action='store_true', help="kirim job lalu keluar tanpa menunggu")
+
+    tag = commands.add_parser('tag', help="tambah/hapus tag pada stream")
+    tag.add_argument('name')
+    tag.add_argument('stream_ids', nargs='+')
+    tag.add_argument('--remove', action='store_true')
+    commands.add_parser('jobs', help="job massal terakhir")
+
+    args = parser.parse_args()
+    client = Client(args.url)
+    handlers = {'list': cmd_list, 'start': cmd_bulk, 'stop': cmd_bulk, 'restart': cmd_bulk,
+                'tag': cmd_tag, 'jobs': cmd_jobs}
+    try:
+        return handlers[args.command](client, args)
+    except ApiError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
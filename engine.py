@@ -0,0 +1,156 @@
+"""Engine proses berbasis asyncio: satu event loop untuk semua anak ffmpeg.
+
+Menggantikan satu thread pembaca per stream. Output stderr (dan stdout untuk
+-progress) dibaca per chunk secara non-blocking, dipecah per baris (ffmpeg
+memakai '\\r' untuk baris statistik) lalu diteruskan ke callback.
+Menghentikan stream = membatalkan task-nya; pembatalan mengirim SIGTERM,
+menunggu ffmpeg menutup output dengan rapi, dan baru SIGKILL bila melewati
+batas waktu.
+"""
+import asyncio
+import concurrent.futures
+import logging
+import subprocess
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional
+
+READ_CHUNK = 64 * 1024
+MAX_LINE = 4096  # sisa baris tanpa newline tidak boleh tumbuh tanpa batas
+STOP_TIMEOUT = 5.0
+# Batas menunggu stop terlama (playlist/siaga): feeder SIGTERM→SIGKILL, EOF publisher,
+# lalu publisher SIGTERM→SIGKILL
+STOP_WAIT = STOP_TIMEOUT * 3 + 2
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessEngine:
+    """Menjalankan dan menghentikan proses ffmpeg dari satu event loop"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.processes: Dict[str, asyncio.subprocess.Process] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._thread = threading.Thread(target=self._run_loop, name='engine', daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def call(self, coro: Awaitable, timeout: Optional[float] = None):
+        """Jalankan coroutine di loop engine dari thread lain dan tunggu hasilnya"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def submit(self, stream_id: str, coro: Awaitable) -> concurrent.futures.Future:
+        """Jalankan coroutine milik stream sebagai task yang bisa dibatalkan lewat stop()"""
+        async def start():
+            task = asyncio.ensure_future(coro)
+            self._tasks[stream_id] = task
+            task.add_done_callback(lambda t: self._forget(stream_id, t))
+            return task
+
+        return asyncio.run_coroutine_threadsafe(start(), self.loop)
+
+    def _forget(self, stream_id: str, task: asyncio.Task):
+        if self._tasks.get(stream_id) is task:
+            del self._tasks[stream_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Task stream %s gagal", stream_id, exc_info=task.exception())
+
+    def is_running(self, stream_id: str) -> bool:
+        return stream_id in self._tasks
+
+    def pid(self, stream_id: str) -> Optional[int]:
+        process = self.processes.get(stream_id)
+        return process.pid if process else None
+
+    async def run_process(self, stream_id: str, cmd: List[str],
+                          on_line: Callable[[str], None],
+                          on_progress: Optional[Callable[[str], None]] = None,
+                          on_start: Optional[Callable[[int], None]] = None,
+                          stdin: Optional[int] = None, stdout: Optional[int] = None) -> int:
+        """Jalankan ffmpeg, teruskan setiap baris stderr ke on_line, kembalikan exit code.
+
+        Bila on_progress diberikan, stdout (tujuan -progress pipe:1) dibaca
+        terpisah dan setiap baris key=value diteruskan ke sana. on_start
+        dipanggil dengan pid begitu proses berjalan. stdin/stdout berupa file
+        descriptor dipakai untuk menyambung proses lewat pipe (mode playlist).
+        """
+        if stdout is None:
+            stdout = subprocess.PIPE if on_progress else subprocess.DEVNULL
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=subprocess.DEVNULL if stdin is None else stdin,
+            stdout=stdout,
+            stderr=subprocess.PIPE,
+        )
+        self.processes[stream_id] = process
+        try:
+            if on_start:
+                on_start(process.pid)
+            pumps = [self._pump(process.stderr, on_line)]
+            if on_progress and process.stdout is not None:
+                pumps.append(self._pump(process.stdout, on_progress))
+            await asyncio.gather(*pumps)
+            return await process.wait()
+        except asyncio.CancelledError:
+            # Stop dari pengguna: pastikan ffmpeg benar-benar selesai sebelum task berakhir
+            await asyncio.shield(self._terminate(process))
+            raise
+        finally:
+            self.processes.pop(stream_id, None)
+
+    @staticmethod
+    async def _pump(stream: asyncio.StreamReader, on_line: Callable[[str], None]):
+        pending = b''
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                break
+            lines = (pending + chunk).replace(b'\r', b'\n').split(b'\n')
+            pending = lines.pop()[-MAX_LINE:]
+            for line in lines:
+                if line:
+                    on_line(line.decode(errors='replace').strip())
+        if pending:
+            on_line(pending.decode(errors='replace').strip())
+
+    @staticmethod
+    async def _terminate(process: asyncio.subprocess.Process, timeout: float = STOP_TIMEOUT):
+        """SIGTERM lalu tunggu; SIGKILL hanya bila ffmpeg tidak berhenti dalam batas waktu"""
+        if process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+        except ProcessLookupError:
+            pass
+
+    async def terminate(self, stream_id: str):
+        """Hentikan proses ffmpeg stream tanpa membatalkan task-nya (untuk restart)"""
+        process = self.processes.get(stream_id)
+        if process is not None:
+            await self._terminate(process)
+
+    async def _cancel(self, stream_id: str):
+        task = self._tasks.get(stream_id)
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    def stop(self, stream_id: str, timeout: float = STOP_TIMEOUT + 2):
+        """Hentikan stream dan tunggu prosesnya selesai (dipanggil dari thread lain)"""
+        self.call(self._cancel(stream_id), timeout)
+
+    def shutdown(self):
+        """Hentikan semua stream lalu matikan event loop"""
+        async def cancel_all():
+            await asyncio.gather(*(self._cancel(stream_id) for stream_id in list(self._tasks)))
+
+        self.call(cancel_all(), STOP_TIMEOUT + 2)
+        self.loop.call_soon_threadsafe(self.loop.stop)
@@ -0,0 +1,86 @@
+"""Watchdog kesehatan stream dan kebijakan reconnect.
+
+Supervisor memakai HealthTracker untuk setiap proses ffmpeg: tracker diberi
+setiap sampel -progress dan secara berkala ditanya apakah stream macet
+(out_time tidak maju) atau terlalu lama di bawah realtime. Bila ffmpeg keluar
+atau watchdog memutuskan restart, jeda sebelum mencoba lagi mengikuti
+exponential backoff dengan jitter.
+"""
+import random
+import time
+from typing import Optional
+
+from progress import ProgressSample
+
+CHECK_INTERVAL = 2.0  # detik antar pemeriksaan watchdog
+STARTUP_GRACE = 30.0  # waktu untuk probe + handshake RTMP sebelum sampel pertama
+STALL_TIMEOUT = 20.0  # out_time tidak maju selama ini = macet
+RELAY_STALL_TIMEOUT = 12.0  # relay: input live yang diam segera di-reconnect
+DEGRADED_TIMEOUT = 60.0  # di bawah realtime terus-menerus selama ini = restart
+
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 300.0
+STABLE_AFTER = 60.0  # proses yang hidup selama ini mereset hitungan backoff
+HISTORY_SIZE = 20
+
+# Semua status stream; di sini (bukan di supervisor) agar metrics dan bulk bisa memakainya
+STATUSES = ('stopped', 'starting', 'armed', 'waiting', 'live', 'degraded', 'reconnecting', 'error')
+# Status stream yang sedang mengirim ke ingest
+ACTIVE_STATUSES = ('live', 'degraded')
+# Status selama task stream masih hidup (termasuk jeda backoff dan menunggu slot jadwal)
+RUNNING_STATUSES = ACTIVE_STATUSES + ('starting', 'reconnecting', 'armed', 'waiting')
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Jeda sebelum percobaan ke-N: eksponensial, dibatasi cap, dengan jitter 50-100%"""
+    delay = min(cap, base * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def resume_offset(previous_offset: float, out_time: float, duration: float) -> float:
+    """Posisi di dalam loop video tempat stream terakhir berhenti"""
+    if duration <= 0:
+        return 0.0
+    return (previous_offset + out_time) % duration
+
+
+class HealthTracker:
+    """Melacak kemajuan satu proses ffmpeg dan memutuskan kapan perlu restart"""
+
+    def __init__(self, stall_timeout: float = STALL_TIMEOUT,
+                 degraded_timeout: float = DEGRADED_TIMEOUT,
+                 startup_grace: float = STARTUP_GRACE):
+        self.stall_timeout = stall_timeout
+        self.degraded_timeout = degraded_timeout
+        self.startup_grace = startup_grace
+        self.started_at = time.monotonic()
+        self.last_advance: Optional[float] = None
+        self.last_out_time = -1.0
+        self.degraded_since: Optional[float] = None
+
+    def observe(self, sample: ProgressSample, degraded: bool):
+        """Catat satu sampel progress"""
+        now = time.monotonic()
+        if sample.out_time > self.last_out_time:
+            self.last_out_time = sample.out_time
+            self.last_advance = now
+
+        if degraded:
+            self.degraded_since = self.degraded_since or now
+        else:
+            self.degraded_since = None
+
+    def check(self, now: Optional[float] = None) -> Optional[str]:
+        """Alasan restart bila stream tidak sehat, atau None"""
+        now = now or time.monotonic()
+        if self.last_advance is None:
+            if now - self.started_at > self.startup_grace:
+                return f"tidak ada progress {self.startup_grace:.0f} detik setelah start"
+            return None
+
+        if now - self.last_advance > self.stall_timeout:
+            return f"macet, tidak ada frame baru selama {now - self.last_advance:.0f} detik"
+
+        if self.degraded_since and now - self.degraded_since > self.degraded_timeout:
+            return f"di bawah realtime selama {now - self.degraded_since:.0f} detik"
+        return None
@@ -0,0 +1,183 @@
+"""Indeks media library: metadata ffprobe per file disimpan di SQLite.
+
+Setiap file video di media dir (juga file lama di working directory dan hasil
+unduhan sources.py) di-probe dan di-hash sekali, lalu hasilnya disimpan
+bersama ukuran dan mtime. Thread watcher memindai folder secara berkala dan
+hanya memproses file yang baru, berubah, atau hilang, sehingga UI dan
+supervisor cukup membaca indeks.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from media import MEDIA_DIR, VIDEO_EXTENSIONS, display_name
+from mezzanine import file_hash
+from pipeline import probe_video
+from sources import SOURCE_DIR
+
+LIBRARY_DB = os.environ.get('STREAMFLOW_LIBRARY_DB', os.path.join(MEDIA_DIR, '.library.sqlite3'))
+SCAN_INTERVAL = 10  # detik antar pemindaian folder
+
+PROBE_FIELDS = ('vcodec', 'pix_fmt', 'width', 'height', 'fps', 'bitrate', 'keyframe_interval', 'acodec', 'duration')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    hash TEXT,
+    probed INTEGER NOT NULL DEFAULT 0,
+    vcodec TEXT,
+    pix_fmt TEXT,
+    width INTEGER,
+    height INTEGER,
+    fps REAL,
+    bitrate INTEGER,
+    keyframe_interval REAL,
+    acodec TEXT,
+    duration REAL
+)
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def _scan(directories: Iterable[str]) -> Dict[str, os.stat_result]:
+    """Semua file video di folder-folder ini (tidak rekursif) beserta stat-nya"""
+    found = {}
+    for directory in directories:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.name.endswith(VIDEO_EXTENSIONS):
+                continue
+            try:
+                if entry.is_file():
+                    path = entry.path[2:] if entry.path.startswith('./') else entry.path
+                    found[path] = entry.stat()
+            except OSError:
+                continue
+    return found
+
+
+class MediaLibrary:
+    """Indeks SQLite metadata video yang dijaga oleh thread watcher"""
+
+    def __init__(self, db_path: str = LIBRARY_DB, directories: Iterable[str] = (MEDIA_DIR, '.', SOURCE_DIR)):
+        self.directories = list(directories)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._rescan = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Jalankan watcher di background (pemindaian pertama langsung)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='media-library', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._rescan.set()
+
+    def rescan(self):
+        """Minta watcher memindai ulang sekarang (mis. setelah upload)"""
+        self._rescan.set()
+
+    def _watch(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Pemindaian media library gagal")
+            self._rescan.wait(SCAN_INTERVAL)
+            self._rescan.clear()
+
+    def sync(self):
+        """Samakan indeks dengan isi folder: probe file baru/berubah, hapus yang hilang"""
+        found = _scan(self.directories)
+        with self._lock:
+            known = {row['path']: (row['size'], row['mtime'])
+                     for row in self._db.execute("SELECT path, size, mtime FROM media")}
+            gone = [path for path in known if path not in found]
+            self._db.executemany("DELETE FROM media WHERE path = ?", [(path,) for path in gone])
+            self._db.commit()
+
+        for path, stat in found.items():
+            if self._stop.is_set():
+                return
+            if known.get(path) != (stat.st_size, stat.st_mtime):
+                self.index(path, stat)
+
+    def index(self, path: str, stat: Optional[os.stat_result] = None) -> Optional[Dict]:
+        """Probe dan hash satu file lalu simpan ke indeks"""
+        try:
+            stat = stat or os.stat(path)
+            digest = file_hash(path)
+        except OSError as e:
+            logger.warning("Tidak bisa membaca %s: %s", path, e)
+            return None
+        probe = probe_video(path) or {}
+        row = {
+            'path': path,
+            'name': display_name(path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'hash': digest,
+            'probed': int(bool(probe)),
+            **{field: probe.get(field) for field in PROBE_FIELDS},
+        }
+        columns = ', '.join(row)
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO media ({columns}) VALUES ({', '.join('?' * len(row))})",
+                list(row.values())
+            )
+            self._db.commit()
+        logger.info("Media terindeks: %s", path)
+        return row
+
+    def list(self) -> List[Dict]:
+        """Semua file terindeks, urut media dir dulu lalu nama"""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM media ORDER BY path LIKE ? DESC, name",
+                                    (os.path.join(MEDIA_DIR, '%'),)).fetchall()
+        return [dict(row) for row in rows]
+
+    def get(self, path: Optional[str]) -> Optional[Dict]:
+        """Metadata file bila sudah terindeks dan masih sama dengan isi disk"""
+        if not path:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT * FROM media WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if (row['size'], row['mtime']) != (stat.st_size, stat.st_mtime):
+            self.rescan()
+            return None
+        return dict(row)
+
+    def probe(self, path: Optional[str]) -> Optional[Dict]:
+        """Ringkasan probe dari indeks (format sama dengan pipeline.probe_video)"""
+        row = self.get(path)
+        if row is None:
+            return probe_video(path)
+        if not row['probed']:
+            return None
+        return {field: row[field] for field in PROBE_FIELDS}
@@ -0,0 +1,185 @@
+"""Log per stream: ring buffer di memori dan file terotasi di disk.
+
+Setiap baris stderr ffmpeg lewat `_add_log`, jadi jalurnya harus murah: ring
+buffer berkapasitas tetap (deque maxlen, append atomik tanpa lock), timestamp
+diformat sekali per detik, dan untuk tampilan UI baris yang sama berturut-turut
+digabung serta baris statistik ffmpeg (frame=/size=) dibatasi satu per
+PROGRESS_INTERVAL. Setiap baris apa adanya ditulis oleh satu thread
+QueueListener ke file per stream yang dirotasi dan dikompres gzip, sehingga
+I/O disk tidak pernah menahan reader ffmpeg. Antreannya dibatasi: bila disk
+tertinggal, baris dibuang dan jumlahnya dicatat di file begitu antrean lega.
+"""
+import gzip
+import logging
+import os
+import queue
+import shutil
+import time
+from collections import deque
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Deque, Dict, List, Optional, Tuple
+
+from media import safe_filename
+
+LOG_DIR = os.environ.get('STREAMFLOW_LOG_DIR', 'logs')
+RING_SIZE = 500  # baris per stream yang disimpan di memori
+LOG_MAX_BYTES = 5 * 1024 * 1024  # ukuran file log sebelum dirotasi
+LOG_BACKUPS = 5  # jumlah file .gz lama per stream
+PROGRESS_INTERVAL = 10.0  # detik antar baris statistik ffmpeg yang disimpan
+PROGRESS_PREFIXES = ('frame=', 'size=')
+LOG_QUEUE_SIZE = 10000  # baris yang menunggu ditulis ke disk; selebihnya dibuang
+
+_clock: Tuple[int, str] = (0, '')
+
+
+def timestamp(now: Optional[float] = None) -> str:
+    """'HH:MM:SS' yang diformat ulang hanya saat detiknya berganti"""
+    global _clock
+    second = int(now if now is not None else time.time())
+    cached_second, text = _clock
+    if second != cached_second:
+        text = time.strftime('%H:%M:%S', time.localtime(second))
+        _clock = (second, text)
+    return text
+
+
+class LogRing:
+    """Log satu stream berkapasitas tetap.
+
+    Penulis (thread reader ffmpeg, event loop, handler HTTP) dan pembaca (API
+    /logs) tidak memakai lock: deque.append dengan maxlen atomik di CPython.
+    Status dedup bisa sedikit meleset bila dua thread menulis bersamaan; itu
+    hanya memengaruhi hitungan "diulang N kali".
+    """
+
+    __slots__ = ('_lines', '_last', '_repeats', '_progress_at')
+
+    def __init__(self, capacity: int = RING_SIZE):
+        self._lines: Deque[str] = deque(maxlen=capacity)
+        self._last: Optional[str] = None
+        self._repeats = 0
+        self._progress_at = 0.0
+
+    def append(self, message: str, now: Optional[float] = None) -> List[str]:
+        """Simpan satu pesan; kembalikan pesan yang benar-benar masuk buffer (tanpa timestamp)"""
+        now = now if now is not None else time.time()
+        if message == self._last:
+            self._repeats += 1
+            return []
+        if message.startswith(PROGRESS_PREFIXES):
+            if now - self._progress_at < PROGRESS_INTERVAL:
+                return []
+            self._progress_at = now
+
+        stored = [message]
+        if self._repeats:
+            stored.insert(0, f"↳ baris sebelumnya diulang {self._repeats}x")
+        self._last, self._repeats = message, 0
+        stamp = timestamp(now)
+        self._lines.extend(f"[{stamp}] {line}" for line in stored)
+        return stored
+
+    def tail(self, limit: int = 20) -> List[str]:
+        """`limit` baris terakhir"""
+        while True:
+            try:
+                lines = list(self._lines)
+            except RuntimeError:  # deque berubah saat disalin; ulangi
+                continue
+            return lines[-limit:] if limit > 0 else []
+
+
+def _gzip_namer(name: str) -> str:
+    return f"{name}.gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as out:
+        shutil.copyfileobj(src, out)
+    os.remove(source)
+
+
+class _StreamFileListener(QueueListener):
+    """Thread penulis: item antrean (stream_id, created, baris) -> file per stream"""
+
+    def __init__(self, log_queue: queue.Queue, log_dir: str, max_bytes: int, backups: int):
+        super().__init__(log_queue)
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.formatter = logging.Formatter('%(asctime)s %(message)s', '%Y-%m-%d %H:%M:%S')
+        self.files: Dict[str, RotatingFileHandler] = {}
+
+    def _file(self, stream_id: str) -> RotatingFileHandler:
+        handler = self.files.get(stream_id)
+        if handler is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            path = os.path.join(self.log_dir, f"{safe_filename(stream_id)}.log")
+            handler = RotatingFileHandler(path, maxBytes=self.max_bytes, backupCount=self.backups,
+                                          encoding='utf-8', delay=True)
+            handler.namer = _gzip_namer
+            handler.rotator = _gzip_rotator
+            handler.setFormatter(self.formatter)
+            self.files[stream_id] = handler
+        return handler
+
+    def handle(self, item):
+        stream_id, created, line = item
+        if line is None:
+            handler = self.files.pop(stream_id, None)
+            if handler is not None:
+                handler.close()
+            return
+        # LogRecord baru dibuat di sini, bukan di thread ffmpeg
+        self._file(stream_id).handle(logging.makeLogRecord({'msg': line, 'created': created}))
+
+    def enqueue_sentinel(self):
+        # Antrean bisa penuh saat stop; tunggu sampai ada tempat agar thread penulis tetap berhenti
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        super().stop()
+        for handler in self.files.values():
+            handler.close()
+        self.files.clear()
+
+
+class StreamLogWriter:
+    """Menulis log lengkap semua stream ke disk secara asinkron"""
+
+    def __init__(self, log_dir: str = LOG_DIR, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS,
+                 queue_size: int = LOG_QUEUE_SIZE):
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        # Baris yang dibuang per stream sejak baris terakhir yang masuk antrean (tanpa lock, seperti LogRing)
+        self._dropped: Dict[str, int] = {}
+        self._listener = _StreamFileListener(self._queue, log_dir, max_bytes, backups)
+        self._started = False
+
+    def start(self):
+        if not self._started:
+            self._listener.start()
+            self._started = True
+
+    def stop(self):
+        """Tulis sisa antrean lalu tutup semua file"""
+        if self._started:
+            self._listener.stop()
+            self._started = False
+
+    def write(self, stream_id: str, message: str, created: Optional[float] = None):
+        """Antrekan satu baris; bila antrean penuh baris dibuang, bukan menahan pemanggil"""
+        created = created if created is not None else time.time()
+        dropped = self._dropped.pop(stream_id, 0)
+        try:
+            if dropped:
+                self._queue.put_nowait((stream_id, created, f"↳ {dropped} baris log dibuang (disk tertinggal)"))
+                dropped = 0
+            self._queue.put_nowait((stream_id, created, message))
+        except queue.Full:
+            self._dropped[stream_id] = dropped + 1
+
+    def close_stream(self, stream_id: str):
+        """Tutup file log stream (mis. setelah stream dihapus); file tetap ada di disk"""
+        self._dropped.pop(stream_id, None)
+        # Jarang dipanggil dan wajib sampai ke thread penulis, jadi boleh menunggu antrean
+        self._queue.put((stream_id, None, None))
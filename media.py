@@ -0,0 +1,84 @@
+"""Penyimpanan video upload: streaming ke disk, hash isi, dan dedup.
+
+File upload dibaca per chunk (tidak pernah utuh di memori), di-hash SHA-256
+sambil ditulis ke file sementara di MEDIA_DIR, lalu di-rename secara atomik.
+Nama file diawali potongan hash, sehingga upload dengan isi yang sama dari
+stream mana pun memakai satu file yang sama dan nama file dari klien tidak
+bisa menimpa video lain.
+"""
+import glob
+import hashlib
+import os
+import re
+import tempfile
+from typing import BinaryIO, List, Tuple
+
+MEDIA_DIR = os.environ.get('STREAMFLOW_MEDIA_DIR', 'media')
+UPLOAD_CHUNK = 4 * 1024 * 1024
+HASH_PREFIX = 16  # jumlah karakter hash di nama file
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.flv')
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def safe_filename(name: str) -> str:
+    """Nama file dari klien tanpa path dan karakter aneh"""
+    name = _UNSAFE_CHARS.sub('_', os.path.basename(name or '')).strip('._')
+    return name or 'video'
+
+
+def find_by_hash(digest: str, media_dir: str = MEDIA_DIR) -> List[str]:
+    """File di media dir yang isinya sama dengan hash ini"""
+    return sorted(glob.glob(os.path.join(glob.escape(media_dir), f"{digest[:HASH_PREFIX]}-*")))
+
+
+def store_upload(fileobj: BinaryIO, filename: str, media_dir: str = MEDIA_DIR) -> Tuple[str, bool, str]:
+    """Simpan upload ke media dir; kembalikan (path, True bila file yang sama sudah ada, SHA-256 isi).
+
+    Hash dikirim ke supervisor bersama permintaan mezzanine agar file tidak dibaca ulang di sana.
+    """
+    os.makedirs(media_dir, exist_ok=True)
+    if hasattr(fileobj, 'seek'):
+        fileobj.seek(0)
+
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=media_dir, prefix='.upload-', suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: fileobj.read(UPLOAD_CHUNK), b''):
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+
+        value = digest.hexdigest()
+        existing = find_by_hash(value, media_dir)
+        if existing:
+            os.remove(tmp_path)
+            return existing[0], True, value
+
+        path = os.path.join(media_dir, f"{value[:HASH_PREFIX]}-{safe_filename(filename)}")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path, False, value
+
+
+def upload_hash_matches(path: str, digest: str, media_dir: str = MEDIA_DIR) -> bool:
+    """Hash dari klien hanya dipercaya untuk upload di media dir yang namanya diawali potongan hash itu"""
+    if not re.fullmatch(r'[0-9a-f]{64}', digest or ''):
+        return False
+    if os.path.dirname(os.path.abspath(path)) != os.path.abspath(media_dir):
+        return False
+    return os.path.basename(path).startswith(f"{digest[:HASH_PREFIX]}-")
+
+
+def display_name(path: str) -> str:
+    """Nama file untuk UI, tanpa awalan hash"""
+    name = os.path.basename(path)
+    prefix, sep, rest = name.partition('-')
+    if sep and len(prefix) == HASH_PREFIX and all(c in '0123456789abcdef' for c in prefix):
+        return rest
+    return name
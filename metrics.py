@@ -0,0 +1,133 @@
+"""Exporter Prometheus/OpenMetrics untuk supervisor StreamFlow.
+
+Endpoint GET /metrics di supervisor memakai render_metrics() untuk
+menghasilkan format teks Prometheus: status dan telemetri -progress per
+stream, pemakaian CPU/RSS proses ffmpeg-nya, serta beban host.
+"""
+import os
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import psutil
+
+from health import STATUSES
+from profiles import host_cpu
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Objek psutil.Process disimpan per pid agar cpu_percent() punya titik acuan
+_process_cache: Dict[int, psutil.Process] = {}
+_render_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class _Family:
+    """Satu metrik (HELP/TYPE) beserta sampel-sampelnya"""
+
+    def __init__(self, name: str, kind: str, help_text: str):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.samples: List[Tuple[Dict[str, str], float]] = []
+
+    def add(self, labels: Dict[str, str], value):
+        if value is not None:
+            self.samples.append((labels, value))
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in self.samples:
+            yield f"{self.name}{_labels(labels) if labels else ''} {float(value):g}"
+
+
+def process_usage(pid: int) -> Dict[str, float]:
+    """CPU (persen satu core dan detik total) serta RSS sebuah proses ffmpeg"""
+    process = _process_cache.get(pid)
+    try:
+        if process is None:
+            process = _process_cache[pid] = psutil.Process(pid)
+        with process.oneshot():
+            cpu_times = process.cpu_times()
+            return {
+                'cpu_percent': process.cpu_percent(None),
+                'cpu_seconds': cpu_times.user + cpu_times.system,
+                'rss_bytes': process.memory_info().rss,
+            }
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        _process_cache.pop(pid, None)
+        return {}
+
+
+def render_metrics(supervisor) -> str:
+    """Teks Prometheus untuk semua stream milik supervisor plus metrik host"""
+    with _render_lock:
+        return _render(supervisor)
+
+
+def _render(supervisor) -> str:
+    families = {
+        'status': _Family('streamflow_stream_status', 'gauge', "Status stream (1 untuk status aktif)"),
+        'fps': _Family('streamflow_stream_encode_fps', 'gauge', "FPS encode dari -progress"),
+        'bitrate': _Family('streamflow_stream_output_bitrate_kbps', 'gauge', "Bitrate output (kbps)"),
+        'speed': _Family('streamflow_stream_speed_ratio', 'gauge', "Speed ffmpeg terhadap realtime"),
+        'drop': _Family('streamflow_stream_dropped_frames_total', 'counter', "Frame yang di-drop ffmpeg"),
+        'dup': _Family('streamflow_stream_duplicated_frames_total', 'counter', "Frame yang diduplikasi ffmpeg"),
+        'restarts': _Family('streamflow_stream_restarts_total', 'counter', "Jumlah restart ffmpeg"),
+        'cpu': _Family('streamflow_stream_process_cpu_seconds_total', 'counter', "Waktu CPU proses ffmpeg (termasuk feeder)"),
+        'cpu_percent': _Family('streamflow_stream_process_cpu_percent', 'gauge', "Pemakaian CPU ffmpeg (100 = satu core)"),
+        'rss': _Family('streamflow_stream_process_resident_memory_bytes', 'gauge', "RSS proses ffmpeg"),
+    }
+
+    live_pids = set()
+    for stream_id, stream in supervisor.snapshot().items():
+        labels = {'stream_id': stream_id, 'title': stream['title']}
+        for status in STATUSES:
+            families['status'].add({**labels, 'status': status}, int(stream['status'] == status))
+        families['restarts'].add(labels, stream.get('restart_count', 0))
+
+        progress = stream.get('progress')
+        if progress and stream['status'] != 'stopped':
+            families['fps'].add(labels, progress['fps'])
+            families['bitrate'].add(labels, progress['bitrate_kbps'])
+            families['speed'].add(labels, progress['speed'])
+            families['drop'].add(labels, progress['drop_frames'])
+            families['dup'].add(labels, progress['dup_frames'])
+
+        # Mode playlist/warm standby: feeder yang men-decode item ikut dihitung ke stream
+        pids = supervisor.stream_pids(stream_id)
+        live_pids.update(pids)
+        usages = [process_usage(pid) for pid in pids]
+        for family, key in (('cpu', 'cpu_seconds'), ('cpu_percent', 'cpu_percent'), ('rss', 'rss_bytes')):
+            values = [usage[key] for usage in usages if key in usage]
+            families[family].add(labels, sum(values) if values else None)
+
+    for pid in set(_process_cache) - live_pids:
+        del _process_cache[pid]
+
+    load1, load5, load15 = os.getloadavg()
+    memory = psutil.virtual_memory()
+    host = [
+        ('streamflow_host_load1', load1, "Load average 1 menit"),
+        ('streamflow_host_load5', load5, "Load average 5 menit"),
+        ('streamflow_host_load15', load15, "Load average 15 menit"),
+        ('streamflow_host_cpu_count', psutil.cpu_count(), "Jumlah core logis"),
+        ('streamflow_host_cpu_usage_ratio', host_cpu.busy(), "Pemakaian CPU host (0-1)"),
+        ('streamflow_host_memory_available_bytes', memory.available, "Memori yang tersedia"),
+    ]
+
+    lines = []
+    for family in families.values():
+        lines.extend(family.render())
+    for name, value, help_text in host:
+        family = _Family(name, 'gauge', help_text)
+        family.add({}, value)
+        lines.extend(family.render())
+    return '\n'.join(lines) + '\n'
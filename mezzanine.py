@@ -0,0 +1,374 @@
+"""Cache video siap-ingest (mezzanine) per isi file dan profil encode.
+
+Setiap video di-transcode sekali per profil (bitrate, resolusi, fps) menjadi
+file H.264/AAC dengan GOP tetap, lalu stream yang loop cukup me-remux file
+tersebut dengan -c copy alih-alih encode terus-menerus.
+
+Stream ambient (gambar + audio) memakai cache yang sama dengan jenis lain:
+'loop' adalah visual pendek H.264 tanpa audio yang bisa diulang tanpa putus,
+'audio' adalah trek AAC; keduanya lalu di-remux bersama oleh satu proses.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CACHE_DIR = os.environ.get('STREAMFLOW_MEZZANINE_DIR', '.mezzanine')
+MAX_CACHE_BYTES = int(float(os.environ.get('STREAMFLOW_MEZZANINE_MAX_GB', '20')) * 1024 ** 3)
+HASH_CHUNK = 8 * 1024 * 1024
+
+# Ukuran output per pilihan resolusi (sama dengan pilihan di UI)
+SCALES = {
+    '480p': (854, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+}
+
+Profile = Tuple[int, str, int]  # (bitrate kbps, resolusi, fps)
+
+# Jenis entri cache: video lengkap, visual loop ambient, trek audio ambient
+STREAM, LOOP, AUDIO = 'stream', 'loop', 'audio'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+IMAGE_LOOP_SECONDS = 4  # gambar diam cukup dua GOP; di-loop oleh -stream_loop
+MAX_LOOP_SECONDS = 60  # visual loop dari video dipotong sepanjang ini
+AMBIENT_AUDIO_BITRATE = 192  # kbps, audio adalah isi utama channel ambient
+
+logger = logging.getLogger(__name__)
+
+_hash_lock = threading.Lock()
+_hash_memo: Dict[Tuple[str, int, float], str] = {}
+
+
+def known_hash(path: str) -> Optional[str]:
+    """Hash isi file bila sudah pernah dihitung untuk versi file ini"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    with _hash_lock:
+        return _hash_memo.get((os.path.abspath(path), stat.st_size, stat.st_mtime))
+
+
+def remember_hash(path: str, value: str):
+    """Catat hash yang sudah dihitung di luar (mis. saat upload) agar tidak dibaca ulang"""
+    stat = os.stat(path)
+    with _hash_lock:
+        _hash_memo[(os.path.abspath(path), stat.st_size, stat.st_mtime)] = value
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 isi file, dibaca per chunk dan di-memo per (path, ukuran, mtime)"""
+    cached = known_hash(path)
+    if cached:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+
+    value = digest.hexdigest()
+    remember_hash(path, value)
+    return value
+
+
+def profile_name(profile: Profile) -> str:
+    """Nama profil untuk nama file cache, mis. '3000k_1080p_30fps'"""
+    bitrate, resolution, fps = profile
+    return f"{bitrate}k_{resolution}_{fps}fps"
+
+
+def build_transcode_command(src: str, dst: str, profile: Profile) -> list:
+    """Perintah ffmpeg untuk membuat file mezzanine dengan GOP tetap"""
+    bitrate, resolution, fps = profile
+    width, height = SCALES[resolution]
+    gop = fps * 2
+    return [
+        "ffmpeg", "-y", "-nostdin",
+        "-i", src,
+        "-map", "0:v:0",
+        "-map", "0:a:0?",
+        "-vf", f"scale={width}:{height},fps={fps}",
+        "-c:v", "libx264",
+        "-preset", "medium",  # sekali jalan, jadi boleh lebih lambat dari veryfast
+        "-b:v", f"{bitrate}k",
+        "-maxrate", f"{bitrate}k",
+        "-bufsize", f"{bitrate * 2}k",
+        "-pix_fmt", "yuv420p",
+        "-g", str(gop),
+        "-keyint_min", str(gop),
+        "-sc_threshold", "0",
+        "-c:a", "aac",
+        "-b:a", "128k",
+        "-ar", "44100",
+        "-movflags", "+faststart",
+        "-f", "mp4",
+        dst,
+    ]
+
+
+def build_loop_command(src: str, dst: str, profile: Profile) -> list:
+    """Visual ambient: gambar atau klip pendek menjadi loop H.264 tanpa audio dengan GOP tetap.
+
+    Gambar diam di-encode dengan -tune stillimage; frame P hampir kosong,
+    jadi bitrate jauh di bawah batas stream walau fps-nya sama.
+    """
+    bitrate, resolution, fps = profile
+    width, height = SCALES[resolution]
+    gop = fps * 2
+    still = src.lower().endswith(IMAGE_EXTENSIONS)
+    cmd = ["ffmpeg", "-y", "-nostdin"]
+    if still:
+        cmd += ["-loop", "1", "-framerate", str(fps), "-i", src, "-t", str(IMAGE_LOOP_SECONDS)]
+    else:
+        cmd += ["-i", src, "-t", str(MAX_LOOP_SECONDS)]
+    return cmd + [
+        "-map", "0:v:0",
+        "-an",
+        "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+               f"pad={width}:{height}:-1:-1,fps={fps},format=yuv420p",
+        "-c:v", "libx264",
+        "-preset", "slow",  # sekali jalan untuk klip beberapa detik
+        "-tune", "stillimage" if still else "film",
+        "-crf", "20",
+        "-maxrate", f"{bitrate}k",
+        "-bufsize", f"{bitrate * 2}k",
+        "-g", str(gop),
+        "-keyint_min", str(gop),
+        "-sc_threshold", "0",
+        "-movflags", "+faststart",
+        "-f", "mp4",
+        dst,
+    ]
+
+
+def build_audio_command(src: str, dst: str) -> list:
+    """Trek audio ambient: AAC stereo 44.1 kHz yang bisa disambung dengan concat -c copy"""
+    return [
+        "ffmpeg", "-y", "-nostdin",
+        "-i", src,
+        "-map", "0:a:0",
+        "-vn",
+        "-c:a", "aac",
+        "-b:a", f"{AMBIENT_AUDIO_BITRATE}k",
+        "-ar", "44100",
+        "-ac", "2",
+        "-movflags", "+faststart",
+        "-f", "mp4",
+        dst,
+    ]
+
+
+BUILDERS = {
+    STREAM: build_transcode_command,
+    LOOP: build_loop_command,
+    AUDIO: lambda src, dst, profile: build_audio_command(src, dst),
+}
+
+
+class MezzanineStore:
+    """Menyimpan dan membuat file mezzanine di background, dengan eviction LRU"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._index_path = os.path.join(cache_dir, 'index.json')
+        self._lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._pending = set()
+        self._worker = None
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        # Buang entri yang file-nya sudah tidak ada
+        return {name: entry for name, entry in index.items()
+                if os.path.exists(os.path.join(self.cache_dir, name))}
+
+    def _save_index(self):
+        tmp = self._index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+    @staticmethod
+    def _entry_name(content_hash: str, profile: Profile, kind: str = STREAM) -> str:
+        if kind == AUDIO:
+            # Trek audio tidak bergantung pada profil video
+            return f"{content_hash[:32]}_audio.m4a"
+        suffix = '' if kind == STREAM else f"_{kind}"
+        return f"{content_hash[:32]}_{profile_name(profile)}{suffix}.mp4"
+
+    def _known_hash(self, path: str) -> Optional[str]:
+        """Hash dari memo, atau dari index bila file sumber belum berubah sejak transcode"""
+        content_hash = known_hash(path)
+        if content_hash:
+            return content_hash
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = [os.path.abspath(path), stat.st_size, stat.st_mtime]
+        for entry in list(self._index.values()):
+            if entry.get('signature') == signature:
+                return entry['hash']
+        return None
+
+    def lookup(self, path: str, profile: Profile, kind: str = STREAM) -> Optional[str]:
+        """Path file mezzanine yang siap, atau None (tidak pernah menghitung hash di sini)"""
+        content_hash = self._known_hash(path)
+        if not content_hash:
+            return None
+
+        name = self._entry_name(content_hash, profile, kind)
+        with self._lock:
+            entry = self._index.get(name)
+            if entry is None:
+                return None
+            entry['last_used'] = time.time()
+            self._save_index()
+        return os.path.join(self.cache_dir, name)
+
+    def status(self, path: str, profile: Profile, kind: str = STREAM) -> str:
+        """'ready', 'pending' atau 'missing' untuk kombinasi file + profil"""
+        content_hash = self._known_hash(path)
+        if content_hash and self._entry_name(content_hash, profile, kind) in self._index:
+            return 'ready'
+        if (os.path.abspath(path), profile, kind) in self._pending:
+            return 'pending'
+        return 'missing'
+
+    def request(self, path: str, profiles: Iterable[Profile], priority: int = 10, kind: str = STREAM):
+        """Antrikan transcode file untuk profil yang belum ada di cache"""
+        path = os.path.abspath(path)
+        with self._lock:
+            for profile in profiles:
+                if (path, profile, kind) in self._pending:
+                    continue
+                self._pending.add((path, profile, kind))
+                self._queue.put((priority, next(self._order), path, profile, kind))
+
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='mezzanine', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        """Worker tunggal: satu transcode pada satu waktu agar tidak merebut CPU stream live"""
+        while True:
+            _, _, path, profile, kind = self._queue.get()
+            try:
+                self._build(path, profile, kind)
+            except Exception:
+                logger.exception("Transcode mezzanine gagal: %s %s %s", path, profile and profile_name(profile), kind)
+            finally:
+                with self._lock:
+                    self._pending.discard((path, profile, kind))
+
+    def _build(self, path: str, profile: Profile, kind: str = STREAM):
+        if not os.path.exists(path):
+            return
+
+        stat = os.stat(path)
+        content_hash = file_hash(path)
+        name = self._entry_name(content_hash, profile, kind)
+        if name in self._index:
+            return
+
+        dst = os.path.join(self.cache_dir, name)
+        tmp = dst + '.part'
+        logger.info("Transcode mezzanine %s -> %s", path, name)
+        result = subprocess.run(
+            BUILDERS[kind](path, tmp, profile),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            preexec_fn=(lambda: os.nice(10)) if hasattr(os, 'nice') else None,
+        )
+        if result.returncode != 0:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise RuntimeError(result.stderr.decode(errors='replace')[-500:])
+
+        os.replace(tmp, dst)
+        with self._lock:
+            self._index[name] = {
+                'hash': content_hash,
+                'signature': [path, stat.st_size, stat.st_mtime],
+                'size': os.path.getsize(dst),
+                'last_used': time.time(),
+            }
+            self._evict()
+            self._save_index()
+
+    def join_audio(self, paths: List[str]) -> Optional[str]:
+        """Satu trek AAC dari beberapa trek audio yang sudah siap (concat -c copy, tanpa encode).
+
+        Demuxer concat tidak bisa diulang dengan -stream_loop, jadi playlist
+        audio ambient disambung sekali menjadi satu file yang bisa di-loop.
+        """
+        parts = [self.lookup(path, None, AUDIO) for path in paths]
+        if not parts or None in parts:
+            return None
+        if len(parts) == 1:
+            return parts[0]
+
+        key = hashlib.sha256('|'.join(os.path.basename(part) for part in parts).encode()).hexdigest()
+        name = f"{key[:32]}_playlist.m4a"
+        dst = os.path.join(self.cache_dir, name)
+        with self._lock:
+            entry = self._index.get(name)
+            if entry is not None:
+                entry['last_used'] = time.time()
+                self._save_index()
+                return dst
+
+        list_path = dst + '.txt'
+        with open(list_path, 'w') as f:
+            f.writelines(f"file '{os.path.abspath(part)}'\n" for part in parts)
+        tmp = dst + '.part'
+        try:
+            result = subprocess.run(
+                ["ffmpeg", "-y", "-nostdin", "-f", "concat", "-safe", "0", "-i", list_path,
+                 "-c", "copy", "-movflags", "+faststart", "-f", "mp4", tmp],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+        finally:
+            os.remove(list_path)
+        if result.returncode != 0:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise RuntimeError(result.stderr.decode(errors='replace')[-500:])
+
+        os.replace(tmp, dst)
+        with self._lock:
+            self._index[name] = {'hash': key, 'signature': None, 'size': os.path.getsize(dst),
+                                 'last_used': time.time()}
+            self._evict()
+            self._save_index()
+        return dst
+
+    def _evict(self):
+        """Hapus entri yang paling lama tidak dipakai sampai di bawah batas ukuran"""
+        total = sum(entry['size'] for entry in self._index.values())
+        for name, entry in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= entry['size']
+            del self._index[name]
@@ -0,0 +1,420 @@
+"""Probe file video dan penyusun perintah ffmpeg untuk streaming"""
+import functools
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import ffmpeg
+
+from mezzanine import SCALES as RESOLUTIONS
+from profiles import DEFAULT_PROFILE, get_profile
+
+# Jarak keyframe maksimum (detik) agar cocok dengan -g fps*2 saat re-encode
+MAX_KEYFRAME_INTERVAL = 2.0
+
+# Interval (detik) blok -progress yang ditulis ffmpeg
+PROGRESS_PERIOD = 1
+
+# Preview: JPEG kecil per stream di tmpfs (tidak menyentuh disk)
+PREVIEW_DIR = os.environ.get('STREAMFLOW_PREVIEW_DIR') or (
+    '/dev/shm/streamflow' if os.path.isdir('/dev/shm') else os.path.join(tempfile.gettempdir(), 'streamflow'))
+PREVIEW_FPS = 1
+PREVIEW_WIDTH = 320
+
+# Relay: input live (HLS/RTMP/SRT) yang diteruskan ke tujuan
+RELAY_BUFFER_MS = 2000  # default jitter buffer input
+RELAY_RW_TIMEOUT = 10.0  # detik tanpa data dari input sebelum ffmpeg menyerah (lalu reconnect)
+RELAY_PROBE_TTL = 30.0  # hasil probe input live dipakai ulang selama ini
+
+# Pesan tee muxer ffmpeg saat satu tujuan gagal, mis. "Slave muxer #1 failed: ..."
+TEE_FAILURE_RE = re.compile(r"Slave muxer #(\d+) failed")
+
+# Baris stderr ffmpeg milik input (in#N) atau output (out#N), mis. "[in#0/flv @ 0x..] Error during demuxing"
+INPUT_LINE_RE = re.compile(r"^\[in#\d+\b|Will reconnect at|Error opening input")
+OUTPUT_ERROR_RE = re.compile(r"^\[out#\d+\b.*[Ee]rror|Error opening output")
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=256)
+def _probe_cached(path: str, size: int, mtime: float) -> Optional[Dict]:
+    """Jalankan ffprobe sekali per versi file (path, ukuran, mtime)"""
+    try:
+        info = ffmpeg.probe(path)
+        # Hanya keyframe di 30 detik pertama, cukup untuk mengukur GOP
+        frames = ffmpeg.probe(
+            path,
+            select_streams='v:0',
+            skip_frame='nokey',
+            show_entries='frame=pts_time',
+            read_intervals='%+30'
+        ).get('frames', [])
+    except (ffmpeg.Error, OSError) as e:
+        logger.warning("ffprobe gagal untuk %s: %s", path, e)
+        return None
+
+    video = next((s for s in info['streams'] if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in info['streams'] if s.get('codec_type') == 'audio'), None)
+    if video is None:
+        return None
+
+    duration = float(info['format'].get('duration') or 0)
+    num, _, den = video.get('avg_frame_rate', '0/1').partition('/')
+    fps = float(num) / float(den) if float(den or 0) else 0.0
+
+    bitrate = video.get('bit_rate') or info['format'].get('bit_rate')
+    bitrate = int(bitrate) // 1000 if bitrate else None
+    if bitrate and not video.get('bit_rate') and audio:
+        bitrate -= int(audio.get('bit_rate', 128000)) // 1000
+
+    times = sorted(float(f['pts_time']) for f in frames if 'pts_time' in f)
+    if len(times) >= 2:
+        keyframe_interval = max(b - a for a, b in zip(times, times[1:]))
+    else:
+        keyframe_interval = duration
+
+    return {
+        'vcodec': video.get('codec_name'),
+        'pix_fmt': video.get('pix_fmt'),
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'fps': round(fps, 2),
+        'bitrate': bitrate,
+        'keyframe_interval': round(keyframe_interval, 2),
+        'acodec': audio.get('codec_name') if audio else None,
+        'duration': duration,
+    }
+
+
+def probe_video(path: Optional[str]) -> Optional[Dict]:
+    """Ringkasan codec/resolusi/bitrate/GOP file video (di-cache per versi file)"""
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return _probe_cached(path, stat.st_size, stat.st_mtime)
+
+
+_live_probe_lock = threading.Lock()
+_live_probes: Dict[str, Tuple[float, Optional[Dict]]] = {}
+
+
+def probe_live(url: str) -> Optional[Dict]:
+    """Codec dan resolusi input live (tanpa durasi/GOP); di-cache RELAY_PROBE_TTL detik.
+
+    Admission dan penyusunan perintah sama-sama butuh hasilnya, dan setiap
+    probe ke sumber live bisa memakan beberapa detik.
+    """
+    now = time.monotonic()
+    with _live_probe_lock:
+        cached = _live_probes.get(url)
+    if cached and now - cached[0] < RELAY_PROBE_TTL:
+        return cached[1]
+
+    try:
+        info = ffmpeg.probe(url, rw_timeout=int(RELAY_RW_TIMEOUT * 1e6), analyzeduration=int(3e6))
+    except (ffmpeg.Error, OSError) as e:
+        logger.warning("ffprobe gagal untuk input live %s: %s", url, e)
+        info = None
+    video = next((s for s in info['streams'] if s.get('codec_type') == 'video'), None) if info else None
+    audio = next((s for s in info['streams'] if s.get('codec_type') == 'audio'), None) if info else None
+    probe = {
+        'vcodec': video.get('codec_name'),
+        'pix_fmt': video.get('pix_fmt'),
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'acodec': audio.get('codec_name') if audio else None,
+    } if video else None
+
+    with _live_probe_lock:
+        _live_probes[url] = (now, probe)
+    return probe
+
+
+def check_relay_copy(probe: Optional[Dict]) -> Tuple[bool, str]:
+    """Cek apakah input live bisa diteruskan dengan -c copy (codec yang diterima FLV/ingest)"""
+    if probe is None:
+        return False, "probe input live gagal"
+    if probe['vcodec'] != 'h264' or probe['pix_fmt'] not in ('yuv420p', 'yuvj420p'):
+        return False, f"video {probe['vcodec']}/{probe['pix_fmt']}, butuh h264/yuv420p"
+    if probe['acodec'] != 'aac':
+        return False, f"audio {probe['acodec']}, butuh aac"
+    # Resolusi/bitrate mengikuti encoder sumber; relay tidak mengubahnya
+    return True, f"H.264/AAC {probe['width']}x{probe['height']} dari sumber"
+
+
+def check_passthrough(probe: Optional[Dict], stream: Dict) -> Tuple[bool, str]:
+    """Cek apakah file bisa dikirim dengan -c copy tanpa re-encode"""
+    if probe is None:
+        return False, "probe gagal"
+    if probe['vcodec'] != 'h264' or probe['pix_fmt'] != 'yuv420p':
+        return False, f"video {probe['vcodec']}/{probe['pix_fmt']}, butuh h264/yuv420p"
+    if probe['acodec'] != 'aac':
+        return False, f"audio {probe['acodec']}, butuh aac"
+    if (probe['width'], probe['height']) != RESOLUTIONS.get(stream['resolution']):
+        return False, f"resolusi {probe['width']}x{probe['height']} ≠ {stream['resolution']}"
+    if abs(probe['fps'] - stream['fps']) > 0.5:
+        return False, f"fps {probe['fps']} ≠ {stream['fps']}"
+    if not probe['bitrate'] or probe['bitrate'] > stream['bitrate'] * 1.1:
+        return False, f"bitrate {probe['bitrate']}k > {stream['bitrate']}k"
+    if probe['keyframe_interval'] > MAX_KEYFRAME_INTERVAL + 0.1:
+        return False, f"keyframe tiap {probe['keyframe_interval']}s > {MAX_KEYFRAME_INTERVAL}s"
+    return True, "H.264/AAC sudah sesuai target"
+
+
+def stream_profile(stream: Dict) -> Tuple[int, str, int]:
+    """Profil encode yang sedang dipilih stream"""
+    return (stream['bitrate'], stream['resolution'], stream['fps'])
+
+
+def _tee_escape(url: str) -> str:
+    """Escape karakter khusus tee muxer pada URL tujuan"""
+    for char in ("\\", "|", "[", "]", "'"):
+        url = url.replace(char, "\\" + char)
+    return url
+
+
+def output_targets(stream: Dict) -> List[str]:
+    """Daftar URL tujuan (utama + tambahan) yang stream key-nya sudah diisi"""
+    targets = []
+    for dest in [{'rtmp_url': stream['rtmp_url'], 'stream_key': stream['stream_key']}] + stream.get('destinations', []):
+        if dest.get('rtmp_url') and dest.get('stream_key'):
+            targets.append(f"{dest['rtmp_url'].rstrip('/')}/{dest['stream_key']}")
+    return targets
+
+
+def build_command(stream: Dict, targets: List[str], passthrough: bool = False,
+                  input_path: Optional[str] = None, start_offset: float = 0.0,
+                  profile: Optional[Dict] = None, preview: Optional[str] = None) -> List[str]:
+    """Menyusun perintah ffmpeg: encode sekali, kirim ke satu atau banyak tujuan (+ preview JPEG)"""
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        # Telemetri terstruktur ke stdout; baris statistik stderr dimatikan
+        "-nostats",
+        "-progress", "pipe:1",
+        "-stats_period", str(PROGRESS_PERIOD),
+        "-stream_loop", "-1",
+        "-re",
+    ]
+    if start_offset > 0:
+        # Hanya berlaku untuk putaran pertama; loop berikutnya mulai dari awal file
+        cmd += ["-ss", f"{start_offset:.3f}"]
+    cmd += [
+        "-i", input_path or stream['video_path'],
+        "-map", "0:v:0",
+        "-map", "0:a:0?",
+    ]
+
+    if passthrough:
+        # File sudah siap ingest: cukup remux tanpa decode/encode
+        cmd += ["-c", "copy"]
+    else:
+        cmd += encode_args(stream, profile)
+
+    return cmd + output_args(targets) + (preview_args(preview) if preview else [])
+
+
+def is_relay(stream: Dict) -> bool:
+    """Stream meneruskan input live (relay_url), bukan memutar file"""
+    return bool(stream.get('relay_url'))
+
+
+def relay_input_args(url: str, buffer_ms: int = RELAY_BUFFER_MS) -> List[str]:
+    """Opsi input live: timeout baca, reconnect protokol dan jitter buffer sebesar buffer_ms"""
+    scheme = urlparse(url).scheme.lower()
+    # Input yang diam lebih lama dari ini membuat ffmpeg keluar, lalu supervisor reconnect
+    args = ["-rw_timeout", str(int(RELAY_RW_TIMEOUT * 1e6))]
+    if scheme in ('http', 'https'):
+        # HLS/HTTP: coba sambung ulang di dalam ffmpeg dulu sebelum proses keluar
+        args += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_on_network_error", "1",
+                 "-reconnect_delay_max", "5"]
+    elif scheme in ('rtmp', 'rtmps'):
+        args += ["-rtmp_live", "live", "-rtmp_buffer", str(buffer_ms)]
+    elif scheme == 'srt':
+        args += ["-latency", str(buffer_ms * 1000)]  # mikrodetik
+    elif scheme in ('udp', 'rtp'):
+        args += ["-fifo_size", str(max(buffer_ms, 1) * 64), "-overrun_nonfatal", "1"]
+    return args + [
+        # Paket yang datang terlambat/tidak urut ditampung sampai buffer_ms sebelum di-demux
+        "-max_delay", str(buffer_ms * 1000),
+        "-thread_queue_size", "1024",
+        "-fflags", "+genpts+discardcorrupt",
+    ]
+
+
+def is_ambient(stream: Dict) -> bool:
+    """Stream ambient: visual diam/loop pendek di atas audio, tanpa encode per frame"""
+    return bool(stream.get('ambient_image'))
+
+
+def build_ambient_command(stream: Dict, targets: List[str], loop_path: str, audio_path: str,
+                          preview: Optional[str] = None) -> List[str]:
+    """Remux visual loop (H.264 siap) dan trek AAC siap, keduanya diulang tanpa henti.
+
+    Tidak ada decode/encode video, jadi biayanya setara stream passthrough.
+    """
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        "-progress", "pipe:1",
+        "-stats_period", str(PROGRESS_PERIOD),
+        "-re", "-stream_loop", "-1",
+        "-i", loop_path,
+        "-re", "-stream_loop", "-1",
+        "-i", audio_path,
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+        "-c", "copy",
+    ]
+    return cmd + output_args(targets) + (preview_args(preview) if preview else [])
+
+
+def build_relay_command(stream: Dict, targets: List[str], passthrough: bool = False,
+                        profile: Optional[Dict] = None, preview: Optional[str] = None) -> List[str]:
+    """ffmpeg mode relay: input live (sudah realtime, tanpa -re/-stream_loop) ke tujuan"""
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        "-progress", "pipe:1",
+        "-stats_period", str(PROGRESS_PERIOD),
+    ] + relay_input_args(stream['relay_url'], int(stream.get('relay_buffer_ms') or RELAY_BUFFER_MS))
+    cmd += [
+        "-i", stream['relay_url'],
+        "-map", "0:v:0",
+        "-map", "0:a:0?",
+    ]
+    cmd += ["-c", "copy"] if passthrough else encode_args(stream, profile)
+    return cmd + output_args(targets) + (preview_args(preview) if preview else [])
+
+
+def encode_args(stream: Dict, profile: Optional[Dict] = None, scale: bool = True) -> List[str]:
+    """Opsi encode H.264/AAC sesuai profil stream"""
+    profile = profile or get_profile(DEFAULT_PROFILE)
+    args = [
+        "-c:v", "libx264",
+        "-preset", profile['preset'],
+        "-b:v", f"{stream['bitrate']}k",
+        "-maxrate", f"{stream['bitrate']}k",
+        "-bufsize", f"{stream['bitrate'] * 2}k",
+        "-pix_fmt", "yuv420p",
+        "-g", str(stream['fps'] * profile['keyint_sec']),
+        "-rc-lookahead", str(profile['rc_lookahead']),
+    ]
+    if profile['tune']:
+        args += ["-tune", profile['tune']]
+    if profile['threads']:
+        args += ["-threads:v", str(profile['threads'])]
+    args += [
+        "-c:a", "aac",
+        "-b:a", "128k",
+        "-ar", "44100",
+    ]
+
+    # Add resolution scaling if needed
+    if scale and stream['resolution'] != '1080p' and stream['resolution'] in RESOLUTIONS:
+        width, height = RESOLUTIONS[stream['resolution']]
+        args += ["-vf", f"scale={width}:{height}"]
+    return args
+
+
+def preview_path(stream_id: str) -> str:
+    """Lokasi JPEG preview terbaru sebuah stream"""
+    return os.path.join(PREVIEW_DIR, f"{re.sub(r'[^A-Za-z0-9._-]', '_', stream_id)}.jpg")
+
+
+def preview_args(path: str) -> List[str]:
+    """Output kedua dari graph yang sama: JPEG kecil PREVIEW_FPS, ditimpa di tempat secara atomik.
+
+    Pada mode -c copy semua frame tetap di-decode untuk preview: dengan
+    -skip_frame nokey decoder hanya menerima keyframe dan menahan output
+    remux beberapa detik.
+    """
+    return [
+        "-map", "0:v:0",
+        "-vf", f"fps={PREVIEW_FPS},scale={PREVIEW_WIDTH}:-2",
+        "-q:v", "5",
+        "-update", "1",
+        "-atomic_writing", "1",
+        "-f", "image2",
+        "-y", path,
+    ]
+
+
+def output_args(targets: List[str]) -> List[str]:
+    """Muxer output: flv untuk satu tujuan, tee untuk banyak tujuan"""
+    if len(targets) == 1:
+        return ["-f", "flv", targets[0]]
+
+    # Banyak tujuan: satu encode dibagi lewat tee muxer. onfail=ignore
+    # membuat tujuan yang gagal dilepas tanpa menghentikan tujuan lain.
+    slaves = "|".join(f"[f=flv:onfail=ignore]{_tee_escape(url)}" for url in targets)
+    return ["-flags", "+global_header", "-f", "tee", slaves]
+
+
+def build_publisher_command(stream: Dict, targets: List[str], profile: Optional[Dict] = None,
+                            paced: bool = False, preview: Optional[str] = None) -> List[str]:
+    """ffmpeg mode playlist: satu encoder membaca frame mentah dari stdin dan kirim ke tujuan.
+
+    paced: publisher sendiri yang menjaga kecepatan realtime (-re), dipakai
+    warm standby karena feeder-nya sudah berjalan sebelum go-live. Jam -re
+    ffmpeg baru mulai setelah input terbuka, jadi frame yang tertahan saat
+    siaga tidak dikirim sekaligus.
+    """
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        "-progress", "pipe:1",
+        "-stats_period", str(PROGRESS_PERIOD),
+    ]
+    if paced:
+        cmd.append("-re")
+    return cmd + [
+        "-f", "nut",
+        "-i", "pipe:0",
+        "-map", "0:v:0",
+        "-map", "0:a:0",
+    ] + encode_args(stream, profile, scale=False) + output_args(targets) + (preview_args(preview) if preview else [])
+
+
+def build_feeder_command(stream: Dict, input_path: str, ts_offset: float, has_audio: bool = True,
+                         paced: bool = True) -> List[str]:
+    """ffmpeg untuk satu item playlist: decode realtime ke video/audio mentah (NUT) di stdout.
+
+    Semua item dinormalisasi ke resolusi, fps dan format audio yang sama,
+    sehingga encoder publisher melihat satu aliran kontinu. Tanpa paced,
+    feeder hanya ditahan oleh pipe (publisher yang memakai -re).
+    """
+    width, height = RESOLUTIONS.get(stream['resolution'], RESOLUTIONS['1080p'])
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        "-loglevel", "error",
+    ]
+    if paced:
+        cmd.append("-re")
+    cmd += ["-i", input_path]
+    if has_audio:
+        cmd += ["-map", "0:v:0", "-map", "0:a:0"]
+    else:
+        # Audio kosong agar layout stream di pipe tetap sama untuk setiap item
+        cmd += ["-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo", "-shortest", "-map", "0:v:0", "-map", "1:a:0"]
+    return cmd + [
+        "-vf", f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+               f"pad={width}:{height}:-1:-1,fps={stream['fps']},format=yuv420p",
+        "-c:v", "rawvideo",
+        "-ar", "44100",
+        "-ac", "2",
+        "-c:a", "pcm_s16le",
+        "-output_ts_offset", f"{ts_offset:.3f}",
+        "-f", "nut",
+        "pipe:1",
+    ]
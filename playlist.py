@@ -0,0 +1,118 @@
+"""Playlist dan jadwal per stream tanpa memutus koneksi RTMP.
+
+Satu ffmpeg "publisher" membaca video/audio mentah (NUT) dari pipe, meng-encode
+sekali dan mengirim ke tujuan, sehingga koneksi ingest, GOP dan rate control
+tetap kontinu selama stream berjalan. Setiap item playlist di-decode oleh
+ffmpeg "feeder" terpisah yang menulis ke pipe yang sama dengan
+-output_ts_offset berurutan. Item berikutnya dipilih saat item sebelumnya
+selesai: dari slot jadwal yang aktif pada jam itu, atau dari playlist utama
+bila tidak ada slot yang aktif. Stream yang hanya berisi jadwal menunggu slot
+berikutnya (status 'waiting') tanpa menjalankan ffmpeg.
+"""
+import random
+from datetime import datetime, time as dtime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+Slot = Dict  # {'start': 'HH:MM', 'end': 'HH:MM', 'items': [path, ...]}
+
+# Alasan berhenti feeder saat slot jadwal habis; bukan kegagalan, jadi tanpa backoff
+SLOT_ENDED = "slot jadwal selesai"
+
+
+def _parse_clock(value: str) -> dtime:
+    hours, _, minutes = value.strip().partition(':')
+    return dtime(int(hours), int(minutes or 0))
+
+
+def parse_schedule(text: str) -> List[Slot]:
+    """'07:00-12:00 a.mp4, b.mp4' per baris -> daftar slot"""
+    slots = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        window, _, items = line.partition(' ')
+        start, sep, end = window.partition('-')
+        if not sep:
+            raise ValueError(f"Format jadwal salah: {line!r} (contoh: 07:00-12:00 a.mp4, b.mp4)")
+        _parse_clock(start), _parse_clock(end)
+        files = [item.strip() for item in items.split(',') if item.strip()]
+        if not files:
+            # Slot kosong membuat feeder tidak punya apa pun untuk diputar selama jendela itu
+            raise ValueError(f"Slot {window} belum berisi file (contoh: 07:00-12:00 a.mp4, b.mp4)")
+        slots.append({'start': start.strip(), 'end': end.strip(), 'items': files})
+    return slots
+
+
+def format_schedule(slots: List[Slot]) -> str:
+    return "\n".join(f"{slot['start']}-{slot['end']} {', '.join(slot['items'])}" for slot in slots)
+
+
+def slot_active(slot: Slot, now: dtime) -> bool:
+    """Apakah jam `now` ada di dalam slot (slot boleh melewati tengah malam)"""
+    start, end = _parse_clock(slot['start']), _parse_clock(slot['end'])
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end
+
+
+def has_playlist(stream: Dict) -> bool:
+    """Stream memakai mode playlist/jadwal, bukan loop satu file"""
+    return bool(stream.get('playlist') or stream.get('schedule'))
+
+
+def playlist_items(stream: Dict) -> List[str]:
+    """Semua file yang bisa diputar stream (playlist utama + semua slot)"""
+    items = list(stream.get('playlist') or [])
+    for slot in stream.get('schedule') or []:
+        items += [item for item in slot['items'] if item not in items]
+    return items
+
+
+class PlaylistCursor:
+    """Memilih item berikutnya sesuai jadwal; urutan diingat per daftar item"""
+
+    def __init__(self, stream: Dict):
+        self.playlist: List[str] = list(stream.get('playlist') or [])
+        self.schedule: List[Slot] = list(stream.get('schedule') or [])
+        self.shuffle: bool = bool(stream.get('shuffle'))
+        self._queues: Dict[Tuple[str, ...], List[str]] = {}
+        self.last: Optional[str] = None
+
+    def current_items(self, now: Optional[datetime] = None) -> List[str]:
+        """Item dari slot yang aktif sekarang, atau playlist utama"""
+        clock = (now or datetime.now()).time()
+        for slot in self.schedule:
+            if slot['items'] and slot_active(slot, clock):
+                return slot['items']
+        return self.playlist
+
+    def idle_until(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """Stream jadwal-saja di luar semua slot: awal slot berikutnya, selain itu None"""
+        now = now or datetime.now()
+        if self.current_items(now):
+            return None
+        starts = []
+        for slot in self.schedule:
+            if not slot['items']:
+                continue
+            start = datetime.combine(now.date(), _parse_clock(slot['start']))
+            starts.append(start if start > now else start + timedelta(days=1))
+        return min(starts, default=None)
+
+    def next_item(self, now: Optional[datetime] = None) -> Optional[str]:
+        items = self.current_items(now)
+        if not items:
+            return None
+        key = tuple(items)
+        queue = self._queues.get(key)
+        if not queue:
+            queue = list(items)
+            if self.shuffle:
+                random.shuffle(queue)
+                # Hindari item yang sama diputar dua kali berturut-turut saat putaran baru
+                if len(queue) > 1 and queue[0] == self.last:
+                    queue.append(queue.pop(0))
+            self._queues[key] = queue
+        self.last = queue.pop(0)
+        return self.last
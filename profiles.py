@@ -0,0 +1,129 @@
+"""Profil encoder x264 dan admission control berbasis headroom CPU.
+
+Setiap profil punya perkiraan biaya CPU relatif terhadap 'veryfast' (preset
+lama yang dipakai semua stream). Sebelum stream baru dijalankan, supervisor
+mengukur sisa CPU host lalu memilih preset paling lambat (kualitas terbaik)
+yang masih muat, atau menolak start bila tidak ada yang muat.
+"""
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import psutil
+
+from mezzanine import SCALES
+
+# Urut dari paling lambat (kualitas terbaik) ke paling cepat
+ENCODER_PROFILES: Dict[str, Dict] = {
+    'medium': {'preset': 'medium', 'tune': None, 'threads': 0, 'rc_lookahead': 40, 'keyint_sec': 2, 'cost': 2.6},
+    'fast': {'preset': 'fast', 'tune': None, 'threads': 0, 'rc_lookahead': 30, 'keyint_sec': 2, 'cost': 2.0},
+    'faster': {'preset': 'faster', 'tune': None, 'threads': 0, 'rc_lookahead': 20, 'keyint_sec': 2, 'cost': 1.5},
+    'veryfast': {'preset': 'veryfast', 'tune': None, 'threads': 0, 'rc_lookahead': 10, 'keyint_sec': 2, 'cost': 1.0},
+    'superfast': {'preset': 'superfast', 'tune': 'zerolatency', 'threads': 0, 'rc_lookahead': 0, 'keyint_sec': 2, 'cost': 0.6},
+    'ultrafast': {'preset': 'ultrafast', 'tune': 'zerolatency', 'threads': 0, 'rc_lookahead': 0, 'keyint_sec': 2, 'cost': 0.4},
+}
+DEFAULT_PROFILE = 'veryfast'
+AUTO = 'auto'
+
+# Throughput satu core pada preset veryfast: 1080p30 kira-kira butuh 1.5 core
+PIXELS_PER_CORE = 1920 * 1080 * 30 / 1.5
+PASSTHROUGH_COST = 0.05  # remux -c copy hampir tidak memakai CPU
+# Decode H.264 untuk preview stream -c copy, relatif terhadap encode veryfast resolusi yang sama
+PREVIEW_DECODE_RATIO = 0.15
+
+# Cadangan CPU (dalam core) yang tidak boleh dipakai stream baru
+CPU_MARGIN = float(os.environ.get('STREAMFLOW_CPU_MARGIN', '0.5'))
+SAMPLE_INTERVAL = 1.0  # detik per sampel CPU host di background
+
+
+def get_profile(name: Optional[str]) -> Dict:
+    """Profil encoder berdasarkan nama; nama tidak dikenal jatuh ke default"""
+    return ENCODER_PROFILES.get(name or DEFAULT_PROFILE, ENCODER_PROFILES[DEFAULT_PROFILE])
+
+
+def estimate_cost(resolution: str, fps: int, profile_name: Optional[str], passthrough: bool = False,
+                  preview: bool = False) -> float:
+    """Perkiraan jumlah core yang dibutuhkan satu stream (resolusi x fps x preset).
+
+    preview hanya berpengaruh untuk passthrough: remux tidak men-decode, jadi
+    preview berarti decode penuh tambahan.
+    """
+    width, height = SCALES.get(resolution, SCALES['1080p'])
+    pixel_cost = width * height * fps / PIXELS_PER_CORE
+    if passthrough:
+        return PASSTHROUGH_COST + (pixel_cost * PREVIEW_DECODE_RATIO if preview else 0.0)
+    return pixel_cost * get_profile(profile_name)['cost']
+
+
+def preview_enabled(stream: Dict, passthrough: bool) -> bool:
+    """Opsi preview: None = otomatis (hanya saat re-encode, frame sudah di-decode), True/False = paksa"""
+    setting = stream.get('preview')
+    return not passthrough if setting is None else bool(setting)
+
+
+def faster_profile(name: Optional[str]) -> Optional[str]:
+    """Satu tingkat preset lebih cepat, atau None bila sudah paling cepat"""
+    names = list(ENCODER_PROFILES)
+    index = names.index(name) if name in names else names.index(DEFAULT_PROFILE)
+    return names[index + 1] if index + 1 < len(names) else None
+
+
+class CpuSampler:
+    """Pemakaian CPU host yang diukur terus-menerus oleh satu thread background.
+
+    psutil.cpu_percent(None) menyimpan titik acuan per thread pemanggil, jadi
+    dari thread request HTTP yang selalu baru hasilnya tidak bermakna. Pembaca
+    (API kapasitas, metrics, controller ABR) cukup membaca sampel terakhir.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self._busy: Optional[float] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='cpu-sampler', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            self._busy = psutil.cpu_percent(interval=self.interval) / 100
+            self._ready.set()
+
+    def busy(self) -> float:
+        """Rasio CPU host terpakai (0-1) dari sampel terakhir; sampel pertama ditunggu"""
+        self.start()
+        self._ready.wait(self.interval * 2)
+        return self._busy if self._busy is not None else 0.0
+
+
+host_cpu = CpuSampler()
+
+
+def measure_headroom(pending_cost: float = 0.0, interval: Optional[float] = 0.5) -> float:
+    """Sisa core yang bisa dipakai: idle host dikurangi stream yang belum ramp-up dan cadangan.
+
+    interval None membaca sampel terakhir host_cpu tanpa memblokir.
+    """
+    busy = psutil.cpu_percent(interval=interval) / 100 if interval else host_cpu.busy()
+    return psutil.cpu_count() * (1 - busy) - pending_cost - CPU_MARGIN
+
+
+def choose_profile(resolution: str, fps: int, requested: str, headroom: float,
+                   candidates: Iterable[str] = None) -> Tuple[Optional[str], float]:
+    """Pilih profil untuk stream baru; (None, biaya termurah) bila tidak ada yang muat.
+
+    Untuk 'auto' dicoba dari preset paling lambat ke paling cepat; profil yang
+    diminta secara eksplisit hanya dicek apakah muat.
+    """
+    names = list(candidates or ENCODER_PROFILES) if requested == AUTO else [requested]
+    cost = 0.0
+    for name in names:
+        cost = estimate_cost(resolution, fps, name)
+        if cost <= headroom:
+            return name, cost
+    return None, cost
@@ -0,0 +1,108 @@
+"""Telemetri progress ffmpeg (-progress pipe:1) dalam bentuk sampel bertipe.
+
+ffmpeg menulis blok key=value setiap -stats_period detik, diakhiri baris
+'progress=continue' (atau 'progress=end'). Setiap blok menjadi satu
+ProgressSample yang disimpan di ring buffer berukuran tetap per stream.
+"""
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, List, Optional
+
+RING_SIZE = 300  # 5 menit sampel pada -stats_period 1
+SPEED_WINDOW = 5  # jumlah sampel untuk rata-rata speed
+MIN_SPEED = 0.98  # -re membuat speed berfluktuasi tipis di bawah 1.0x
+
+
+@dataclass
+class ProgressSample:
+    """Satu blok progress ffmpeg"""
+    timestamp: float
+    frame: int = 0
+    fps: float = 0.0
+    bitrate_kbps: Optional[float] = None
+    total_size: int = 0
+    out_time: float = 0.0  # detik
+    speed: Optional[float] = None
+    dup_frames: int = 0
+    drop_frames: int = 0
+    ended: bool = False
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _number(value: str, suffix: str = '') -> Optional[float]:
+    """'1234.5kbits/s' -> 1234.5, 'N/A' -> None"""
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class ProgressParser:
+    """Merakit baris key=value dari -progress menjadi ProgressSample"""
+
+    def __init__(self):
+        self._fields: Dict[str, str] = {}
+
+    def feed(self, line: str) -> Optional[ProgressSample]:
+        """Masukkan satu baris; kembalikan sampel bila satu blok sudah lengkap"""
+        key, sep, value = line.partition('=')
+        if not sep:
+            return None
+        key = key.strip()
+        if key != 'progress':
+            self._fields[key] = value.strip()
+            return None
+
+        fields, self._fields = self._fields, {}
+        out_time_us = _number(fields.get('out_time_us', ''))
+        return ProgressSample(
+            timestamp=time.time(),
+            frame=int(_number(fields.get('frame', '')) or 0),
+            fps=_number(fields.get('fps', '')) or 0.0,
+            bitrate_kbps=_number(fields.get('bitrate', ''), 'kbits/s'),
+            total_size=int(_number(fields.get('total_size', '')) or 0),
+            out_time=max(out_time_us or 0, 0) / 1_000_000,
+            speed=_number(fields.get('speed', ''), 'x'),
+            dup_frames=int(_number(fields.get('dup_frames', '')) or 0),
+            drop_frames=int(_number(fields.get('drop_frames', '')) or 0),
+            ended=value.strip() == 'end',
+        )
+
+
+class MetricsRing:
+    """Ring buffer sampel progress per stream"""
+
+    def __init__(self, size: int = RING_SIZE):
+        self.samples: Deque[ProgressSample] = deque(maxlen=size)
+
+    def append(self, sample: ProgressSample):
+        self.samples.append(sample)
+
+    def latest(self) -> Optional[ProgressSample]:
+        return self.samples[-1] if self.samples else None
+
+    def recent(self, limit: int) -> List[ProgressSample]:
+        return list(self.samples)[-limit:]
+
+    def average_speed(self, window: int = SPEED_WINDOW) -> Optional[float]:
+        speeds = [s.speed for s in self.recent(window) if s.speed is not None]
+        return sum(speeds) / len(speeds) if speeds else None
+
+    def below_realtime(self, window: int = SPEED_WINDOW) -> bool:
+        """True bila rata-rata speed beberapa sampel terakhir di bawah realtime"""
+        speed = self.average_speed(window)
+        return speed is not None and len(self.samples) >= window and speed < MIN_SPEED
+
+
+def format_time(seconds: float) -> str:
+    """Detik -> 'm:ss' atau 'h:mm:ss' seperti kolom durasi di card"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
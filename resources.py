@@ -0,0 +1,179 @@
+"""Isolasi resource per stream: afinitas CPU, nice/ionice, batas thread x264, cgroup v2.
+
+Tanpa batas, setiap ffmpeg bebas memakai semua core sehingga satu encode
+1080p60 bisa membuat stream lain turun di bawah realtime. Setiap stream bisa
+meminta core khusus (dipasang eksklusif oleh CorePacker; stream lain berjalan
+di core sisanya), prioritas CPU/IO, jumlah thread x264, serta quota CPU dan
+batas memori cgroup v2. Batas ini juga dipakai admission control: profil
+encoder dipilih agar muat di dalam quota/core stream itu sendiri.
+
+cgroup memakai subtree yang bisa ditulis supervisor (STREAMFLOW_CGROUP, mis.
+direktori yang didelegasikan systemd dengan Delegate=yes). Bila cgroup v2
+tidak tersedia, quota dilewati dan hanya afinitas/nice yang diterapkan.
+"""
+import logging
+import math
+import os
+import threading
+from typing import Dict, List, Optional
+
+import psutil
+
+CGROUP_ROOT = os.environ.get('STREAMFLOW_CGROUP', '/sys/fs/cgroup/streamflow')
+CPU_PERIOD = 100000  # mikrodetik, periode cpu.max
+SHARED_MIN_CORES = 1  # core yang selalu disisakan untuk stream tanpa core khusus dan supervisor
+
+IONICE_CLASSES = {
+    'best-effort': getattr(psutil, 'IOPRIO_CLASS_BE', None),
+    'idle': getattr(psutil, 'IOPRIO_CLASS_IDLE', None),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def budget(stream: Dict, headroom: float) -> float:
+    """Core yang boleh dipakai encoder stream ini: headroom node dibatasi quota/core khusus"""
+    limits = [headroom]
+    if stream.get('cpu_limit'):
+        limits.append(float(stream['cpu_limit']))
+    if stream.get('dedicated_cores'):
+        limits.append(float(stream['dedicated_cores']))
+    return min(limits)
+
+
+def reserved_cost(stream: Dict, cost: float) -> float:
+    """Biaya yang dicadangkan untuk stream: core khusus dihitung utuh, quota membatasi biaya"""
+    if stream.get('dedicated_cores'):
+        return float(stream['dedicated_cores'])
+    if stream.get('cpu_limit'):
+        return min(cost, float(stream['cpu_limit']))
+    return cost
+
+
+def thread_cap(stream: Dict, cpus: Optional[List[int]]) -> Optional[int]:
+    """Jumlah thread x264: dari konfigurasi, atau sejumlah core yang boleh dipakai"""
+    if stream.get('threads'):
+        return int(stream['threads'])
+    if stream.get('dedicated_cores') and cpus:
+        return len(cpus)
+    if stream.get('cpu_limit'):
+        # x264 default memakai 1.5x jumlah core; di bawah quota thread sebanyak itu hanya saling tunggu
+        return max(1, math.ceil(float(stream['cpu_limit'])))
+    return None
+
+
+class CorePacker:
+    """Membagi core ke stream yang meminta core khusus; sisanya menjadi pool bersama"""
+
+    def __init__(self, cpus: Optional[List[int]] = None):
+        self.cpus = sorted(cpus if cpus is not None else os.sched_getaffinity(0))
+        self.assigned: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, stream_id: str, count: int) -> Optional[List[int]]:
+        """Core eksklusif untuk stream, atau None bila tidak cukup"""
+        with self._lock:
+            if stream_id in self.assigned:
+                return self.assigned[stream_id]
+            used = {cpu for cores in self.assigned.values() for cpu in cores}
+            free = [cpu for cpu in self.cpus if cpu not in used]
+            if count > len(free) - SHARED_MIN_CORES:
+                return None
+            # Ambil dari core tertinggi; core rendah (IRQ, proses sistem) tetap di pool bersama
+            cores = free[-count:]
+            self.assigned[stream_id] = cores
+            return cores
+
+    def release(self, stream_id: str):
+        with self._lock:
+            self.assigned.pop(stream_id, None)
+
+    def shared(self) -> List[int]:
+        """Core yang tidak dipakai eksklusif oleh stream mana pun"""
+        with self._lock:
+            used = {cpu for cores in self.assigned.values() for cpu in cores}
+        return [cpu for cpu in self.cpus if cpu not in used]
+
+    def free_cores(self) -> int:
+        """Core yang masih bisa dijadikan core khusus"""
+        with self._lock:
+            used = sum(len(cores) for cores in self.assigned.values())
+        return max(len(self.cpus) - used - SHARED_MIN_CORES, 0)
+
+
+def cgroup_available(root: str = CGROUP_ROOT) -> bool:
+    """cgroup v2 terpasang dan subtree supervisor bisa ditulis"""
+    parent = root if os.path.isdir(root) else os.path.dirname(root)
+    return os.path.exists(os.path.join(parent, 'cgroup.controllers')) and os.access(parent, os.W_OK)
+
+
+def _write(path: str, value: str):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _cgroup_path(stream_id: str, root: str = CGROUP_ROOT) -> str:
+    return os.path.join(root, stream_id.replace('/', '_'))
+
+
+def cgroup_attach(pid: int, stream_id: str, stream: Dict, root: str = CGROUP_ROOT):
+    """Masukkan pid ke cgroup stream dengan cpu.max/memory.max sesuai konfigurasi"""
+    if not os.path.isdir(root):
+        os.makedirs(root)
+        # Controller harus diaktifkan di induk sebelum bisa dipakai anak-anaknya
+        _write(os.path.join(os.path.dirname(root), 'cgroup.subtree_control'), '+cpu +memory')
+    _write(os.path.join(root, 'cgroup.subtree_control'), '+cpu +memory')
+
+    path = _cgroup_path(stream_id, root)
+    os.makedirs(path, exist_ok=True)
+    cpu_limit = stream.get('cpu_limit')
+    _write(os.path.join(path, 'cpu.max'), f"{int(float(cpu_limit) * CPU_PERIOD)} {CPU_PERIOD}" if cpu_limit
+           else f"max {CPU_PERIOD}")
+    memory = stream.get('memory_limit_mb')
+    _write(os.path.join(path, 'memory.max'), str(int(memory) * 1024 * 1024) if memory else 'max')
+    _write(os.path.join(path, 'cgroup.procs'), str(pid))
+
+
+def cgroup_remove(stream_id: str, root: str = CGROUP_ROOT):
+    """Hapus cgroup stream setelah prosesnya keluar"""
+    try:
+        os.rmdir(_cgroup_path(stream_id, root))
+    except OSError:
+        pass
+
+
+def apply_limits(pid: int, stream_id: str, stream: Dict, cpus: Optional[List[int]]) -> List[str]:
+    """Terapkan afinitas, nice, ionice dan cgroup ke proses yang baru jalan; kembalikan peringatan"""
+    warnings = []
+    try:
+        process = psutil.Process(pid)
+        if cpus:
+            process.cpu_affinity(cpus)
+        if stream.get('nice'):
+            process.nice(int(stream['nice']))
+        ionice = IONICE_CLASSES.get(stream.get('ionice') or '')
+        if ionice is not None:
+            process.ionice(ionice)
+    except psutil.NoSuchProcess:
+        return warnings
+    except (psutil.AccessDenied, OSError, ValueError) as e:
+        warnings.append(f"afinitas/prioritas: {e}")
+
+    if stream.get('cpu_limit') or stream.get('memory_limit_mb'):
+        if not cgroup_available():
+            warnings.append(f"cgroup v2 tidak tersedia di {CGROUP_ROOT}, quota CPU/memori dilewati")
+        else:
+            try:
+                cgroup_attach(pid, stream_id, stream)
+            except OSError as e:
+                warnings.append(f"cgroup: {e}")
+    return warnings
+
+
+def set_affinity(pids: List[int], cpus: List[int]):
+    """Pindahkan proses yang sudah berjalan ke set core baru (mis. pool bersama menyusut)"""
+    for pid in pids:
+        try:
+            psutil.Process(pid).cpu_affinity(cpus)
+        except (psutil.Error, OSError, ValueError):
+            continue
@@ -0,0 +1,632 @@
+"""Scheduler multi-node: menempatkan stream ke beberapa host encoder.
+
+Setiap host encoder menjalankan supervisor.py sebagai agent. Scheduler
+menyimpan konfigurasi semua stream, memilih node dengan headroom CPU
+terbesar yang muat untuk biaya encode stream (resolusi x fps x preset),
+lalu meneruskan perintah ke agent node tersebut. Node yang gagal health
+check beberapa kali berturut-turut dianggap mati dan stream-nya
+dipindahkan ke node lain.
+
+API HTTP-nya sama dengan supervisor (GET /streams, POST /streams/<id>/start,
+dll) ditambah GET /nodes, sehingga UI cukup diarahkan ke scheduler lewat
+STREAMFLOW_SUPERVISOR. Video diasumsikan ada di path yang sama di semua
+node (mis. media dir di storage bersama).
+
+    python scheduler.py --node enc1=http://10.0.0.11:8765 --node enc2=http://10.0.0.12:8765
+    python scheduler.py --local-agents 2   # dua agent lokal untuk uji coba
+"""
+import argparse
+import concurrent.futures
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+import bulk
+from api import DEFAULT_HOST, DEFAULT_PORT
+from library import LIBRARY_DB
+from logbuffer import LOG_DIR
+from mezzanine import CACHE_DIR as MEZZANINE_DIR
+from pipeline import PREVIEW_DIR
+from playlist import playlist_items
+from profiles import AUTO, DEFAULT_PROFILE, estimate_cost
+from resources import CGROUP_ROOT, reserved_cost
+from sources import SOURCE_DIR
+from store import StreamStore
+from supervisor import (
+    AGENT_STATE_FIELDS,
+    STOP_WAIT,
+    VOLATILE_FIELDS,
+    StreamSupervisor,
+    SupervisorHandler,
+)
+
+SCHEDULER_DB = os.environ.get('STREAMFLOW_SCHEDULER_DB', 'scheduler.sqlite3')
+HEALTH_INTERVAL = 5  # detik antar health check semua node
+FAILURE_THRESHOLD = 3  # health check gagal berturut-turut sebelum node dianggap mati
+RAMP_SECONDS = 20  # stream yang baru ditempatkan belum terlihat di headroom node
+REQUEST_TIMEOUT = STOP_WAIT + 3  # stop di agent bisa menunggu ffmpeg keluar
+
+logger = logging.getLogger('streamflow.scheduler')
+
+
+class NodeError(Exception):
+    """Agent tidak bisa dihubungi atau menolak permintaan"""
+
+
+@dataclass
+class Node:
+    """Satu host encoder (agent supervisor.py)"""
+    name: str
+    url: str
+    healthy: bool = False
+    failures: int = 0
+    last_seen: float = 0.0
+    cpu_count: int = 0
+    headroom: float = 0.0
+    committed_cost: float = 0.0
+    running: int = 0
+    degraded: bool = False
+    free_cores: int = 0  # core yang masih bisa dijadikan core khusus
+    # stream_id -> (biaya, waktu ditempatkan) untuk stream yang masih ramp-up
+    recent: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+
+    def available(self, now: Optional[float] = None) -> float:
+        """Headroom yang dilaporkan dikurangi stream yang baru saja ditempatkan ke sini"""
+        now = now or time.time()
+        self.recent = {sid: (cost, at) for sid, (cost, at) in self.recent.items() if now - at < RAMP_SECONDS}
+        return self.headroom - sum(cost for cost, _ in self.recent.values())
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.pop('recent')
+        data['available'] = round(self.available(), 2)
+        return data
+
+
+def stream_cost(stream: Dict) -> float:
+    """Perkiraan core untuk stream; 'auto' dihitung dengan preset default, dibatasi quota/core khusus"""
+    profile = stream.get('encoder_profile') or AUTO
+    cost = estimate_cost(stream['resolution'], stream['fps'], DEFAULT_PROFILE if profile == AUTO else profile)
+    return reserved_cost(stream, cost)
+
+
+def choose_node(nodes: List[Node], cost: float, exclude: Tuple[str, ...] = (), cores: int = 0) -> Optional[Node]:
+    """Node sehat dengan sisa headroom terbesar yang masih muat untuk biaya (dan core khusus) ini"""
+    candidates = [node for node in nodes
+                  if node.healthy and not node.degraded and node.name not in exclude
+                  and node.available() >= cost and node.free_cores >= cores]
+    return max(candidates, key=lambda node: node.available() - cost, default=None)
+
+
+class StreamScheduler:
+    """Konfigurasi stream, penempatan ke node dan rebalancing saat node mati"""
+
+    def __init__(self, nodes: List[Node], store: Optional[StreamStore] = None):
+        self.nodes: Dict[str, Node] = {node.name: node for node in nodes}
+        self.store = store or StreamStore(SCHEDULER_DB)
+        self.session = requests.Session()
+        self.streams: Dict[str, Dict] = {}
+        self.placement: Dict[str, str] = {}  # stream_id -> nama node
+        self.desired: Dict[str, bool] = {}  # stream_id -> seharusnya berjalan
+        # Stream yang dipindahkan dari node mati; dihentikan di sana saat node hidup lagi
+        self.evicted: Dict[str, set] = {}
+        self._lock = threading.RLock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(4, len(nodes)))
+        self._stop = threading.Event()
+        self.bulk = bulk.BulkRunner(
+            start=lambda stream_id, resume: self.start_stream(stream_id, resume=resume),
+            stop=self.stop_stream,
+            state=self.stream_snapshot,
+        )
+
+        configs, runtime = self.store.load()
+        self.streams.update(configs)
+        for stream_id, state in runtime.items():
+            if state['node'] in self.nodes:
+                self.placement[stream_id] = state['node']
+            self.desired[stream_id] = state['desired'] == 'running'
+
+    # --- komunikasi dengan agent -------------------------------------------------
+
+    def _call(self, node: Node, method: str, path: str, **kwargs):
+        try:
+            response = self.session.request(method, f"{node.url}{path}", timeout=REQUEST_TIMEOUT, **kwargs)
+        except requests.RequestException as e:
+            raise NodeError(f"{node.name} tidak bisa dihubungi: {e}")
+        try:
+            body = response.json()
+        except ValueError:
+            raise NodeError(f"{node.name} mengirim respons yang bukan JSON ({response.status_code})")
+        if response.status_code >= 400:
+            raise NodeError(body.get('error', response.reason))
+        return body
+
+    def _node_of(self, stream_id: str) -> Optional[Node]:
+        name = self.placement.get(stream_id)
+        node = self.nodes.get(name) if name else None
+        return node if node is not None and node.healthy else None
+
+    # --- health check dan rebalancing -------------------------------------------
+
+    def start(self):
+        threading.Thread(target=self._health_loop, name='scheduler-health', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _health_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.check_nodes()
+            except Exception:
+                logger.exception("Health check node gagal")
+            self._stop.wait(HEALTH_INTERVAL)
+
+    def check_nodes(self):
+        """Health check semua node paralel, lalu tangani node yang mati/hidup lagi"""
+        results = dict(zip(self.nodes, self._pool.map(self._probe_node, self.nodes.values())))
+        for name, info in results.items():
+            node = self.nodes[name]
+            if info is not None:
+                came_back = not node.healthy
+                node.healthy, node.failures, node.last_seen = True, 0, time.time()
+                for key in ('cpu_count', 'headroom', 'committed_cost', 'running', 'degraded', 'free_cores'):
+                    setattr(node, key, info.get(key, getattr(node, key)))
+                if came_back:
+                    logger.info("Node %s sehat", name)
+                    self._cleanup_evicted(node)
+            else:
+                node.failures += 1
+                if node.healthy and node.failures >= FAILURE_THRESHOLD:
+                    node.healthy = False
+                    logger.warning("Node %s dianggap mati setelah %d health check gagal", name, node.failures)
+                    self._evacuate(node)
+
+        # Stream yang seharusnya berjalan tapi belum punya node (mis. kapasitas sempat penuh)
+        with self._lock:
+            waiting = [sid for sid, want in self.desired.items()
+                       if want and sid in self.streams and self._node_of(sid) is None]
+        for stream_id in waiting:
+            self.start_stream(stream_id)
+
+    def _probe_node(self, node: Node) -> Optional[Dict]:
+        try:
+            return self._call(node, 'GET', '/health')
+        except NodeError:
+            return None
+
+    def _evacuate(self, node: Node):
+        """Pindahkan stream yang seharusnya berjalan dari node mati ke node lain"""
+        with self._lock:
+            moved = [sid for sid, name in self.placement.items() if name == node.name]
+            for stream_id in moved:
+                del self.placement[stream_id]
+                self.evicted.setdefault(node.name, set()).add(stream_id)
+                self.store.update_runtime(stream_id, node=None)
+        for stream_id in moved:
+            if self.desired.get(stream_id):
+                ok, message = self.start_stream(stream_id, exclude=(node.name,))
+                logger.info("Rebalance %s dari %s: %s", stream_id, node.name, message)
+
+    def _cleanup_evicted(self, node: Node):
+        """Node hidup lagi: hentikan salinan stream yang sudah dipindah agar tidak double publish"""
+        for stream_id in self.evicted.pop(node.name, set()):
+            if self.placement.get(stream_id) == node.name:
+                continue
+            for method, path in (('POST', f'/streams/{stream_id}/stop'), ('DELETE', f'/streams/{stream_id}')):
+                try:
+                    self._call(node, method, path)
+                except NodeError as e:
+                    logger.warning("Gagal membersihkan %s di %s: %s", stream_id, node.name, e)
+
+    # --- operasi stream (dipanggil handler HTTP) --------------------------------
+
+    def add_stream(self, stream_id: str, title: str, video_path: str = None) -> Dict:
+        stream = StreamSupervisor._new_stream(stream_id, title, video_path)
+        with self._lock:
+            self.streams[stream_id] = stream
+            self.desired.setdefault(stream_id, False)
+        self.store.save_stream(stream)
+        return stream
+
+    def update_stream(self, stream_id: str, updates: Dict):
+        with self._lock:
+            if stream_id not in self.streams:
+                return
+            self.streams[stream_id].update(updates)
+            stream = dict(self.streams[stream_id])
+        self.store.save_stream(stream)
+        node = self._node_of(stream_id)
+        if node is not None:
+            self._call(node, 'PATCH', f'/streams/{stream_id}', json=updates)
+
+    def start_stream(self, stream_id: str, exclude: Tuple[str, ...] = (), warm: bool = False,
+                     go_live_at: Optional[float] = None, resume: bool = False) -> Tuple[bool, str]:
+        """Tempatkan stream di node dengan headroom terbesar lalu jalankan di sana.
+
+        warm: siapkan saja (warm standby) di node tersebut; go-live berikutnya
+        memakai start biasa dan jatuh ke node yang sama.
+        """
+        with self._lock:
+            if stream_id not in self.streams:
+                return False, f"Stream {stream_id} tidak ada"
+            stream = dict(self.streams[stream_id])
+            if not warm:
+                self.desired[stream_id] = True
+        if not warm:
+            self.store.update_runtime(stream_id, desired='running')
+        action, body = ('arm', {'go_live_at': go_live_at}) if warm else ('start', {'resume': resume})
+
+        cost = stream_cost(stream)
+        # Hanya konfigurasi yang diubah pengguna; riwayat restart dan posisi resume milik agent
+        config = {key: value for key, value in stream.items()
+                  if key not in VOLATILE_FIELDS and key not in AGENT_STATE_FIELDS}
+        previous = self._node_of(stream_id)
+        if previous is not None and previous.name not in exclude:
+            # Sudah punya node yang sehat: jalankan lagi di sana tanpa penempatan ulang
+            self._call(previous, 'PATCH', f'/streams/{stream_id}', json=config)
+            result = self._call(previous, 'POST', f'/streams/{stream_id}/{action}', json=body)
+            return True, f"{result.get('message', '')} (node {previous.name})"
+
+        tried = list(exclude)
+        while True:
+            with self._lock:
+                node = choose_node(list(self.nodes.values()), cost, tuple(tried),
+                                   int(stream.get('dedicated_cores') or 0))
+                if node is not None:
+                    # Dicatat sebelum request agar start paralel tidak menumpuk di node yang sama
+                    node.recent[stream_id] = (cost, time.time())
+            if node is None:
+                return False, f"Tidak ada node dengan headroom ±{cost:.1f} core untuk {stream['title']}"
+            try:
+                self._call(node, 'POST', '/streams', json={
+                    'id': stream_id, 'title': stream['title'],
+                    'video_path': stream['video_path'], 'updates': config,
+                })
+                result = self._call(node, 'POST', f'/streams/{stream_id}/{action}', json=body)
+            except NodeError as e:
+                node.recent.pop(stream_id, None)
+                logger.info("Node %s menolak %s: %s", node.name, stream_id, e)
+                tried.append(node.name)
+                continue
+
+            with self._lock:
+                self.placement[stream_id] = node.name
+            self.store.update_runtime(stream_id, node=node.name)
+            return True, f"{result.get('message', '')} (node {node.name})"
+
+    def stop_stream(self, stream_id: str):
+        with self._lock:
+            self.desired[stream_id] = False
+        self.store.update_runtime(stream_id, desired='stopped')
+        node = self._node_of(stream_id)
+        if node is not None:
+            self._call(node, 'POST', f'/streams/{stream_id}/stop')
+
+    def delete_stream(self, stream_id: str):
+        node = self._node_of(stream_id)
+        if node is not None:
+            self._call(node, 'DELETE', f'/streams/{stream_id}')
+        with self._lock:
+            self.streams.pop(stream_id, None)
+            self.placement.pop(stream_id, None)
+            self.desired.pop(stream_id, None)
+        self.store.delete_stream(stream_id)
+
+    def release_video(self, stream_id: str) -> Tuple[bool, str]:
+        """Seperti Supervisor.release_video, tetapi dicek terhadap semua stream di semua node"""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                return False, f"Stream {stream_id} tidak ada"
+            path = stream['video_path']
+            if not path:
+                return False, f"{stream['title']} tidak punya video"
+            stream['video_path'] = None
+            in_use = {item for other in self.streams.values()
+                      for item in [other['video_path'], *playlist_items(other)] if item}
+        self.update_stream(stream_id, {'video_path': None})
+        if path in in_use:
+            return True, "Video masih dipakai stream lain, hanya dilepas dari stream ini"
+        # Media dir diasumsikan sama di semua node (lihat list_media)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.update_stream(stream_id, {'video_path': path})
+            return False, f"Gagal menghapus video: {e}"
+        return True, "Video dihapus!"
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Status semua stream: dari agent bila sudah ditempatkan, selain itu dari konfigurasi"""
+        healthy = [node for node in self.nodes.values() if node.healthy]
+        remote: Dict[str, Dict] = {}
+        for node, streams in zip(healthy, self._pool.map(self._node_streams, healthy)):
+            for stream_id, stream in streams.items():
+                if self.placement.get(stream_id) == node.name:
+                    remote[stream_id] = stream
+
+        with self._lock:
+            result = {}
+            for stream_id, config in self.streams.items():
+                stream = dict(remote.get(stream_id) or config)
+                if stream_id not in remote:
+                    # Belum/tidak lagi punya node: menunggu penempatan atau berhenti
+                    stream['status'] = 'reconnecting' if self.desired.get(stream_id) else 'stopped'
+                stream['node'] = self.placement.get(stream_id)
+                result[stream_id] = stream
+            return result
+
+    def stream_snapshot(self, stream_id: str) -> Optional[Dict]:
+        """Satu entri snapshot(), hanya dari node tempat stream berjalan (tanpa fan-out ke semua node)"""
+        with self._lock:
+            config = self.streams.get(stream_id)
+            if config is None:
+                return None
+            config = dict(config)
+        remote = None
+        node = self._node_of(stream_id)
+        if node is not None:
+            try:
+                remote = self._call(node, 'GET', f'/streams/{stream_id}')
+            except NodeError:
+                pass
+        stream = dict(remote or config)
+        if remote is None:
+            stream.update({'status': 'reconnecting' if self.desired.get(stream_id) else 'stopped', 'speed': None})
+        stream['node'] = self.placement.get(stream_id)
+        return stream
+
+    def _node_streams(self, node: Node) -> Dict[str, Dict]:
+        try:
+            return self._call(node, 'GET', '/streams')
+        except NodeError:
+            return {}
+
+    def forward(self, stream_id: str, method: str, path: str, **kwargs):
+        """Teruskan request milik satu stream ke node tempatnya berjalan"""
+        node = self._node_of(stream_id)
+        if node is None:
+            raise NodeError(f"Stream {stream_id} belum ditempatkan di node mana pun")
+        return self._call(node, method, path, **kwargs)
+
+    def broadcast(self, method: str, path: str, **kwargs) -> List:
+        """Kirim request yang sama ke semua node sehat"""
+        results = []
+        for node in self.nodes.values():
+            if node.healthy:
+                try:
+                    results.append(self._call(node, method, path, **kwargs))
+                except NodeError as e:
+                    logger.warning("%s %s di %s gagal: %s", method, path, node.name, e)
+        return results
+
+
+class SchedulerHandler(SupervisorHandler):
+    """API scheduler; kompatibel dengan API supervisor yang dipakai UI"""
+
+    scheduler: StreamScheduler = None
+    routes = [
+        ('GET', r'/health', 'health'),
+        ('GET', r'/nodes', 'list_nodes'),
+        ('GET', r'/streams', 'list_streams'),
+        ('POST', r'/streams', 'create_stream'),
+        ('GET', r'/streams/(?P<stream_id>[^/]+)', 'get_stream'),
+        ('PATCH', r'/streams/(?P<stream_id>[^/]+)', 'patch_stream'),
+        ('DELETE', r'/streams/(?P<stream_id>[^/]+)', 'remove_stream'),
+        ('POST', r'/streams/(?P<stream_id>[^/]+)/start', 'start'),
+        ('POST', r'/streams/(?P<stream_id>[^/]+)/arm', 'arm'),
+        ('POST', r'/streams/(?P<stream_id>[^/]+)/stop', 'stop'),
+        ('GET', r'/streams/(?P<stream_id>[^/]+)/logs', 'logs'),
+        ('GET', r'/streams/(?P<stream_id>[^/]+)/metrics', 'stream_metrics'),
+        ('GET', r'/streams/(?P<stream_id>[^/]+)/preview\.jpg', 'preview'),
+        ('POST', r'/streams/(?P<stream_id>[^/]+)/source', 'fetch_source'),
+        ('DELETE', r'/streams/(?P<stream_id>[^/]+)/video', 'remove_video'),
+        ('POST', r'/mezzanine', 'mezzanine'),
+        ('GET', r'/media', 'list_media'),
+        ('POST', r'/media/rescan', 'rescan_media'),
+        ('GET', r'/sources', 'list_sources'),
+        ('GET', r'/bulk', 'list_bulk'),
+        ('POST', r'/bulk', 'create_bulk'),
+        ('GET', r'/bulk/(?P<job_id>\d+)', 'get_bulk'),
+        ('DELETE', r'/bulk/(?P<job_id>\d+)', 'cancel_bulk'),
+    ]
+
+    def _dispatch(self, method: str):
+        try:
+            super()._dispatch(method)
+        except NodeError as e:
+            self._send(502, {'error': str(e)})
+
+    def health(self, query):
+        nodes = self.scheduler.nodes.values()
+        return 200, {'ok': True, 'pid': os.getpid(), 'streams': len(self.scheduler.streams),
+                     'nodes': sum(node.healthy for node in nodes)}
+
+    def list_nodes(self, query):
+        placement = self.scheduler.placement
+        return 200, {name: {**node.to_dict(), 'streams': sorted(sid for sid, n in placement.items() if n == name)}
+                     for name, node in self.scheduler.nodes.items()}
+
+    def list_streams(self, query):
+        return 200, self.scheduler.snapshot()
+
+    def create_stream(self, query):
+        body = self._body()
+        stream = self.scheduler.add_stream(body['id'], body['title'], body.get('video_path'))
+        if body.get('updates'):
+            self.scheduler.update_stream(body['id'], body['updates'])
+        return 201, stream
+
+    def get_stream(self, query, stream_id):
+        stream = self.scheduler.stream_snapshot(stream_id)
+        if stream is None:
+            return 404, {'error': f"Stream {stream_id} tidak ada"}
+        return 200, stream
+
+    def patch_stream(self, query, stream_id):
+        if stream_id not in self.scheduler.streams:
+            return 404, {'error': f"Stream {stream_id} tidak ada"}
+        self.scheduler.update_stream(stream_id, self._body())
+        return 200, {'ok': True}
+
+    def remove_stream(self, query, stream_id):
+        self.scheduler.delete_stream(stream_id)
+        return 200, {'ok': True}
+
+    def start(self, query, stream_id):
+        ok, message = self.scheduler.start_stream(stream_id, resume=bool(self._body().get('resume')))
+        return (200, {'ok': True, 'message': message}) if ok else (400, {'error': message})
+
+    def arm(self, query, stream_id):
+        ok, message = self.scheduler.start_stream(stream_id, warm=True, go_live_at=self._body().get('go_live_at'))
+        return (200, {'ok': True, 'message': message}) if ok else (400, {'error': message})
+
+    def stop(self, query, stream_id):
+        self.scheduler.stop_stream(stream_id)
+        return 200, {'ok': True}
+
+    def logs(self, query, stream_id):
+        if self.scheduler._node_of(stream_id) is None:
+            return 200, {'logs': []}
+        return 200, self.scheduler.forward(stream_id, 'GET', f'/streams/{stream_id}/logs',
+                                           params={key: values[-1] for key, values in query.items()})
+
+    def stream_metrics(self, query, stream_id):
+        return 200, self.scheduler.forward(stream_id, 'GET', f'/streams/{stream_id}/metrics',
+                                           params={key: values[-1] for key, values in query.items()})
+
+    def preview(self, query, stream_id):
+        node = self.scheduler._node_of(stream_id)
+        if node is None:
+            return 404, {'error': f"Belum ada preview untuk {stream_id}"}
+        try:
+            response = self.scheduler.session.get(
+                f"{node.url}/streams/{stream_id}/preview.jpg", timeout=REQUEST_TIMEOUT,
+                headers={'If-None-Match': self.headers.get('If-None-Match', '')})
+        except requests.RequestException as e:
+            raise NodeError(f"{node.name} tidak bisa dihubungi: {e}")
+        headers = {key: response.headers[key] for key in ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+                   if key in response.headers}
+        return response.status_code, response.content, headers
+
+    def fetch_source(self, query, stream_id):
+        # Unduhan terjadi di node tempat stream berjalan; sebelum ditempatkan, saat start
+        if self.scheduler._node_of(stream_id) is None:
+            return 202, {'ok': True}
+        return 202, self.scheduler.forward(stream_id, 'POST', f'/streams/{stream_id}/source')
+
+    def remove_video(self, query, stream_id):
+        ok, message = self.scheduler.release_video(stream_id)
+        return (200, {'ok': True, 'message': message}) if ok else (400, {'error': message})
+
+    def mezzanine(self, query):
+        self.scheduler.broadcast('POST', '/mezzanine', json=self._body())
+        return 202, {'ok': True}
+
+    def list_media(self, query):
+        # Media dir diasumsikan sama di semua node; cukup tanya satu node sehat
+        for node in self.scheduler.nodes.values():
+            if node.healthy:
+                return 200, self.scheduler._call(node, 'GET', '/media')
+        return 200, {'media': []}
+
+    def rescan_media(self, query):
+        self.scheduler.broadcast('POST', '/media/rescan')
+        return 202, {'ok': True}
+
+    def _bulk_streams(self) -> Dict[str, Dict]:
+        with self.scheduler._lock:
+            return {stream_id: dict(stream) for stream_id, stream in self.scheduler.streams.items()}
+
+    def _bulk_runner(self) -> bulk.BulkRunner:
+        return self.scheduler.bulk
+
+    def list_sources(self, query):
+        # Cache sumber per node; gabungkan isi semua node sehat
+        return 200, {'sources': [source for result in self.scheduler.broadcast('GET', '/sources')
+                                 for source in result['sources']]}
+
+
+def spawn_local_agents(count: int, base_port: int) -> Tuple[List[Node], List[subprocess.Popen]]:
+    """Jalankan beberapa supervisor lokal sebagai node uji coba (state terpisah per node).
+
+    File media (upload) dipakai bersama; store, index library/mezzanine/sumber,
+    log, preview dan cgroup masing-masing milik satu node, agar penulis
+    bersamaan tidak saling menimpa dan cgroup_remove satu node tidak
+    membongkar cgroup node lain. Akibatnya transcode mezzanine dan unduhan
+    sumber tidak dibagi antar node lokal.
+    """
+    library_root, library_ext = os.path.splitext(LIBRARY_DB)
+    nodes, processes = [], []
+    for index in range(count):
+        name, port = f"local{index + 1}", base_port + index
+        env = {
+            **os.environ,
+            'STREAMFLOW_NODE': name,
+            'STREAMFLOW_STATE_DB': f"{name}.sqlite3",
+            'STREAMFLOW_LIBRARY_DB': f"{library_root}-{name}{library_ext}",
+            'STREAMFLOW_MEZZANINE_DIR': f"{MEZZANINE_DIR.rstrip(os.sep)}-{name}",
+            'STREAMFLOW_SOURCE_DIR': os.path.join(SOURCE_DIR, name),
+            'STREAMFLOW_LOG_DIR': os.path.join(LOG_DIR, name),
+            'STREAMFLOW_PREVIEW_DIR': os.path.join(PREVIEW_DIR, name),
+            'STREAMFLOW_CGROUP': f"{CGROUP_ROOT.rstrip('/')}-{name}",
+        }
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'supervisor.py'),
+             '--host', '127.0.0.1', '--port', str(port)],
+            env=env,
+        ))
+        nodes.append(Node(name, f"http://127.0.0.1:{port}"))
+    return nodes, processes
+
+
+def _parse_node(value: str) -> Node:
+    name, sep, url = value.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError("format node: nama=http://host:port")
+    return Node(name, url.rstrip('/'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler multi-node StreamFlow")
+    parser.add_argument('--host', default=os.environ.get('STREAMFLOW_HOST', DEFAULT_HOST))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('STREAMFLOW_PORT', DEFAULT_PORT)))
+    parser.add_argument('--node', type=_parse_node, action='append', default=[], help="nama=http://host:port")
+    parser.add_argument('--local-agents', type=int, default=0, help="jalankan N agent supervisor lokal")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    nodes, agents = spawn_local_agents(args.local_agents, args.port + 1) if args.local_agents else ([], [])
+    nodes += args.node
+    if not nodes:
+        parser.error("butuh minimal satu --node atau --local-agents")
+
+    scheduler = StreamScheduler(nodes)
+    scheduler.check_nodes()
+    scheduler.start()
+    handler = type('Handler', (SchedulerHandler,), {'scheduler': scheduler})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    logger.info("Scheduler berjalan di http://%s:%d dengan %d node", args.host, args.port, len(nodes))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        for agent in agents:
+            agent.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""Sumber video dari URL: unduh di background lewat yt-dlp ke cache bersama.
+
+Upload multi-GB lewat browser adalah langkah paling lambat saat menyiapkan
+channel. Stream cukup diberi `source_url`; supervisor mengunduhnya di
+background dengan beberapa fragment sekaligus (HLS/DASH) atau beberapa koneksi
+aria2c bila terpasang. File .part disimpan per URL sehingga unduhan yang
+terputus (atau supervisor yang restart) dilanjutkan, bukan diulang.
+
+File yang selesai dinamai menurut hash isinya (sama seperti media upload), jadi
+URL berbeda dengan isi sama memakai satu file. Cache dibatasi ukurannya dan
+file yang paling lama tidak dipakai dihapus lebih dulu, kecuali yang masih
+dipakai stream.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from media import HASH_PREFIX, MEDIA_DIR, find_by_hash, safe_filename
+from mezzanine import file_hash
+
+SOURCE_DIR = os.environ.get('STREAMFLOW_SOURCE_DIR', os.path.join(MEDIA_DIR, 'sources'))
+MAX_SOURCE_BYTES = int(float(os.environ.get('STREAMFLOW_SOURCE_MAX_GB', '50')) * 1024 ** 3)
+SOURCE_WORKERS = 2  # unduhan URL berbeda yang berjalan bersamaan
+CONCURRENT_FRAGMENTS = int(os.environ.get('STREAMFLOW_SOURCE_FRAGMENTS', '8'))
+HTTP_CHUNK = 10 * 1024 * 1024  # range request per potongan untuk file non-fragment
+
+# Utamakan H.264/AAC agar file hasil unduhan bisa langsung passthrough
+FORMAT = 'bv*[vcodec^=avc1]+ba[acodec^=mp4a]/b[ext=mp4]/bv*+ba/b'
+
+Callback = Callable[[Optional[str], Optional[str]], None]  # (path, error)
+
+logger = logging.getLogger(__name__)
+
+
+def url_key(url: str) -> str:
+    """Nama folder .partial untuk URL ini"""
+    return hashlib.sha256(url.encode()).hexdigest()[:HASH_PREFIX]
+
+
+def download_options(partial_dir: str, progress_hook: Callable[[Dict], None]) -> Dict:
+    """Opsi yt-dlp: fragment paralel, lanjutkan .part, tanpa playlist"""
+    options = {
+        'format': FORMAT,
+        'merge_output_format': 'mp4',
+        'outtmpl': os.path.join(partial_dir, 'source.%(ext)s'),
+        'noplaylist': True,
+        'continuedl': True,
+        'nopart': False,
+        'concurrent_fragment_downloads': CONCURRENT_FRAGMENTS,
+        'http_chunk_size': HTTP_CHUNK,
+        'retries': 10,
+        'fragment_retries': 10,
+        'quiet': True,
+        'noprogress': True,
+        'progress_hooks': [progress_hook],
+        'logger': logger,
+    }
+    if shutil.which('aria2c'):
+        # File tunggal (bukan HLS/DASH) juga dipecah ke beberapa koneksi
+        options['external_downloader'] = {'http': 'aria2c'}
+        options['external_downloader_args'] = {'aria2c': [
+            '-c', '-x', str(CONCURRENT_FRAGMENTS), '-s', str(CONCURRENT_FRAGMENTS), '-k', '1M',
+        ]}
+    return options
+
+
+class SourceCache:
+    """Unduhan URL di background ke cache berbasis hash isi, dengan eviction LRU"""
+
+    def __init__(self, cache_dir: str = SOURCE_DIR, max_bytes: int = MAX_SOURCE_BYTES,
+                 in_use: Optional[Callable[[], Set[str]]] = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.in_use = in_use or set
+        self._partial_dir = os.path.join(cache_dir, '.partial')
+        self._index_path = os.path.join(cache_dir, '.index.json')
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(SOURCE_WORKERS, thread_name_prefix='source')
+        self._jobs: Dict[str, Dict] = {}  # url -> {'status', 'progress', 'error'}
+        self._waiters: Dict[str, List[Callback]] = {}
+
+        os.makedirs(self._partial_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        # Buang entri yang file-nya sudah tidak ada
+        return {name: entry for name, entry in index.items()
+                if os.path.exists(os.path.join(self.cache_dir, name))}
+
+    def _save_index(self):
+        tmp = self._index_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+    def _find_url(self, url: str) -> Optional[str]:
+        for name, entry in self._index.items():
+            if url in entry['urls']:
+                return name
+        return None
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Path file yang sudah diunduh untuk URL ini, atau None"""
+        with self._lock:
+            name = self._find_url(url)
+            if name is None:
+                return None
+            self._index[name]['last_used'] = time.time()
+            self._save_index()
+        return os.path.join(self.cache_dir, name)
+
+    def status(self, url: str) -> Dict:
+        """{'status': 'ready'/'downloading'/'error'/'missing', 'progress': 0-100, 'error': ...}"""
+        with self._lock:
+            if self._find_url(url):
+                return {'status': 'ready', 'progress': 100.0, 'error': None}
+            job = self._jobs.get(url)
+            return dict(job) if job else {'status': 'missing', 'progress': 0.0, 'error': None}
+
+    def fetch(self, url: str, callback: Optional[Callback] = None):
+        """Pastikan URL ada di cache; callback(path, error) dipanggil saat siap atau gagal.
+
+        Beberapa stream yang meminta URL yang sama menunggu satu unduhan yang sama.
+        """
+        path = self.lookup(url)
+        if path:
+            if callback:
+                callback(path, None)
+            return
+        with self._lock:
+            if callback:
+                self._waiters.setdefault(url, []).append(callback)
+            if self._jobs.get(url, {}).get('status') == 'downloading':
+                return
+            self._jobs[url] = {'status': 'downloading', 'progress': 0.0, 'error': None}
+        self._executor.submit(self._run, url)
+
+    def _run(self, url: str):
+        path, error = None, None
+        try:
+            path = self._download(url)
+        except Exception as e:
+            logger.exception("Unduhan sumber gagal: %s", url)
+            error = str(e)
+        with self._lock:
+            if error:
+                self._jobs[url] = {'status': 'error', 'progress': self._jobs[url]['progress'], 'error': error}
+            else:
+                self._jobs.pop(url, None)
+            waiters = self._waiters.pop(url, [])
+        for callback in waiters:
+            try:
+                callback(path, error)
+            except Exception:
+                logger.exception("Callback sumber gagal: %s", url)
+
+    def _progress(self, url: str, update: Dict):
+        total = update.get('total_bytes') or update.get('total_bytes_estimate')
+        if update.get('fragment_count'):
+            # HLS/DASH: byte total baru diketahui di akhir, hitung per fragment
+            progress = 100.0 * (update.get('fragment_index') or 0) / update['fragment_count']
+        elif total:
+            progress = 100.0 * (update.get('downloaded_bytes') or 0) / total
+        else:
+            return
+        with self._lock:
+            job = self._jobs.get(url)
+            if job is not None:
+                job['progress'] = round(min(progress, 100.0), 1)
+
+    def _download(self, url: str) -> str:
+        # yt-dlp berat untuk diimpor; hanya dibutuhkan di thread unduhan
+        import yt_dlp
+
+        partial = os.path.join(self._partial_dir, url_key(url))
+        os.makedirs(partial, exist_ok=True)
+        logger.info("Mengunduh sumber %s", url)
+        with yt_dlp.YoutubeDL(download_options(partial, lambda update: self._progress(url, update))) as ydl:
+            info = ydl.extract_info(url, download=True)
+            downloads = info.get('requested_downloads') or [{}]
+            downloaded = downloads[0].get('filepath') or ydl.prepare_filename(info)
+
+        content_hash = file_hash(downloaded)
+        existing = find_by_hash(content_hash, self.cache_dir)
+        if existing:
+            # URL lain sudah mengunduh isi yang sama
+            path = existing[0]
+        else:
+            ext = os.path.splitext(downloaded)[1] or '.mp4'
+            title = safe_filename(info.get('title') or url_key(url))[:80]
+            path = os.path.join(self.cache_dir, f"{content_hash[:HASH_PREFIX]}-{title}{ext}")
+            os.replace(downloaded, path)
+        shutil.rmtree(partial, ignore_errors=True)
+
+        name = os.path.basename(path)
+        # in_use() mengambil lock supervisor; panggil sebelum lock cache agar urutan lock tidak terbalik
+        in_use = self.in_use()
+        with self._lock:
+            entry = self._index.setdefault(name, {'hash': content_hash, 'size': os.path.getsize(path), 'urls': []})
+            if url not in entry['urls']:
+                entry['urls'].append(url)
+            entry['last_used'] = time.time()
+            self._evict(keep={name}, in_use=in_use)
+            self._save_index()
+        logger.info("Sumber siap: %s -> %s", url, path)
+        return path
+
+    def _evict(self, keep: Iterable[str] = (), in_use: Iterable[str] = ()):
+        """Hapus file yang paling lama tidak dipakai sampai di bawah batas, kecuali yang dipakai stream"""
+        protected = set(keep) | {os.path.basename(path) for path in in_use
+                                 if os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.cache_dir)}
+        total = sum(entry['size'] for entry in self._index.values())
+        for name, entry in sorted(self._index.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if name in protected:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= entry['size']
+            del self._index[name]
+        if total > self.max_bytes:
+            logger.warning("Cache sumber %.1f GB melebihi batas; semua file masih dipakai stream", total / 1024 ** 3)
+
+    def list(self) -> List[Dict]:
+        """Isi cache beserta unduhan yang sedang berjalan"""
+        with self._lock:
+            files = [{'path': os.path.join(self.cache_dir, name), 'status': 'ready', **entry}
+                     for name, entry in self._index.items()]
+            jobs = [{'url': url, **job} for url, job in self._jobs.items()]
+        return files + jobs
@@ -0,0 +1,95 @@
+"""Penyimpanan konfigurasi dan state runtime stream di SQLite (WAL).
+
+Konfigurasi stream (judul, video, stream key, tujuan, bitrate, dll) disimpan
+sebagai JSON per stream. State runtime terpisah: apakah stream seharusnya
+berjalan, pid ffmpeg terakhir, dan posisi loop, sehingga supervisor yang
+di-restart (crash atau reboot host) bisa menyalakan kembali channel yang
+sebelumnya live tanpa ada yang memasukkan stream key lagi.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Tuple
+
+STATE_DB = os.environ.get('STREAMFLOW_STATE_DB', 'streamflow.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS streams (
+    id TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runtime (
+    id TEXT PRIMARY KEY,
+    desired TEXT NOT NULL DEFAULT 'stopped',  -- 'running' / 'stopped'
+    pid INTEGER,
+    loop_offset REAL NOT NULL DEFAULT 0,
+    out_time REAL NOT NULL DEFAULT 0,
+    node TEXT,  -- node tempat stream ditempatkan (scheduler.py)
+    updated_at REAL NOT NULL
+);
+"""
+
+RUNTIME_FIELDS = ('desired', 'pid', 'loop_offset', 'out_time', 'node')
+
+
+class StreamStore:
+    """Konfigurasi dan state runtime stream yang tahan crash"""
+
+    def __init__(self, path: str = STATE_DB):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commit tetap atomik, fsync hanya saat checkpoint
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        # Database lama dibuat sebelum kolom node ada
+        columns = {row['name'] for row in self._db.execute("PRAGMA table_info(runtime)")}
+        if 'node' not in columns:
+            self._db.execute("ALTER TABLE runtime ADD COLUMN node TEXT")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def load(self) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+        """(konfigurasi per stream, runtime per stream) urut sesuai waktu dibuat"""
+        with self._lock:
+            configs = {row['id']: json.loads(row['config'])
+                       for row in self._db.execute("SELECT id, config FROM streams ORDER BY rowid")}
+            runtime = {row['id']: dict(row) for row in self._db.execute("SELECT * FROM runtime")}
+        return configs, runtime
+
+    def save_stream(self, stream: Dict):
+        """Simpan (insert/replace) konfigurasi satu stream"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO streams (id, config, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET config = excluded.config, updated_at = excluded.updated_at",
+                (stream['id'], json.dumps(stream), time.time())
+            )
+            self._db.commit()
+
+    def delete_stream(self, stream_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM streams WHERE id = ?", (stream_id,))
+            self._db.execute("DELETE FROM runtime WHERE id = ?", (stream_id,))
+            self._db.commit()
+
+    def update_runtime(self, stream_id: str, **fields):
+        """Ubah sebagian kolom runtime (desired, pid, loop_offset, out_time, node)"""
+        unknown = set(fields) - set(RUNTIME_FIELDS)
+        if unknown:
+            raise ValueError(f"Kolom runtime tidak dikenal: {', '.join(sorted(unknown))}")
+        columns = ['id', *fields, 'updated_at']
+        values = [stream_id, *fields.values(), time.time()]
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns[1:])
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO runtime ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}",
+                values
+            )
+            self._db.commit()
@@ -0,0 +1,1533 @@
+"""Supervisor StreamFlow: daemon pemilik proses ffmpeg di luar sesi Streamlit.
+
+Semua konfigurasi stream, proses ffmpeg dan log disimpan di sini, sehingga
+stream tetap berjalan walau halaman di-reload atau Streamlit di-restart.
+UI (app.py) hanya menjadi client lewat HTTP API lokal.
+
+Jalankan: python supervisor.py [--host 127.0.0.1] [--port 8765]
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import json
+import logging
+import os
+import platform
+import re
+import threading
+import time
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import psutil
+
+import bulk
+import metrics
+from api import DEFAULT_HOST, DEFAULT_PORT
+from abr import (
+    CHECK_INTERVAL as ABR_INTERVAL,
+    THROUGHPUT_WINDOW,
+    BitrateController,
+    StreamLoad,
+    current_rung,
+    effective_stream,
+    ladder,
+    send_backlog,
+    throughput_kbps,
+)
+from engine import STOP_TIMEOUT, STOP_WAIT, ProcessEngine
+from library import MediaLibrary
+from mezzanine import AUDIO, LOOP, MezzanineStore, remember_hash
+from pipeline import (
+    INPUT_LINE_RE,
+    OUTPUT_ERROR_RE,
+    PREVIEW_FPS,
+    RELAY_BUFFER_MS,
+    TEE_FAILURE_RE,
+    build_ambient_command,
+    build_command,
+    build_feeder_command,
+    build_publisher_command,
+    build_relay_command,
+    check_passthrough,
+    check_relay_copy,
+    is_ambient,
+    is_relay,
+    output_targets,
+    preview_path,
+    probe_live,
+    stream_profile,
+)
+from profiles import (
+    AUTO,
+    choose_profile,
+    estimate_cost,
+    faster_profile,
+    get_profile,
+    host_cpu,
+    measure_headroom,
+    preview_enabled,
+)
+from progress import MetricsRing, ProgressParser, format_time
+from health import (
+    ACTIVE_STATUSES,
+    CHECK_INTERVAL,
+    DEGRADED_TIMEOUT,
+    HISTORY_SIZE,
+    STABLE_AFTER,
+    RELAY_STALL_TIMEOUT,
+    RUNNING_STATUSES,
+    STALL_TIMEOUT,
+    HealthTracker,
+    backoff_delay,
+    resume_offset,
+)
+from store import StreamStore
+from playlist import SLOT_ENDED, PlaylistCursor, has_playlist, playlist_items
+from resources import (
+    CorePacker, apply_limits, budget, cgroup_remove, reserved_cost, set_affinity, thread_cap,
+)
+from media import display_name, upload_hash_matches
+from logbuffer import LogRing, StreamLogWriter
+from sources import SourceCache
+
+# Nama node ini saat dipakai sebagai agent oleh scheduler.py
+NODE_NAME = os.environ.get('STREAMFLOW_NODE') or platform.node()
+POSITION_SAVE_INTERVAL = 10  # detik antar penyimpanan posisi loop ke store
+RELAY_CHUNK = 1024 * 1024  # byte per splice relay warm standby
+
+# Field yang hanya berlaku selama proses berjalan; perubahannya tidak ditulis ke store
+VOLATILE_FIELDS = ('status', 'speed', 'current_time', 'destination_status', 'passthrough', 'cpus',
+                   'go_live_at', 'start_latency', 'input_status', 'abr_level', 'output_kbps', 'send_backlog')
+# Keadaan yang dikelola agent sendiri (riwayat restart, posisi resume, hasil probe/admission);
+# scheduler tidak boleh menimpanya dengan salinan konfigurasinya yang basi
+AGENT_STATE_FIELDS = ('duration', 'restart_count', 'restart_history', 'loop_offset', 'active_profile',
+                      'estimated_cost', 'created_at')
+
+logger = logging.getLogger('streamflow.supervisor')
+
+
+def _relay(src: int, dst: int):
+    """Salin pipe feeder ke pipe publisher sampai EOF; splice menyalin di kernel tanpa lewat Python"""
+    try:
+        if hasattr(os, 'splice'):
+            while os.splice(src, dst, RELAY_CHUNK):
+                pass
+        else:
+            while True:
+                data = os.read(src, RELAY_CHUNK)
+                if not data:
+                    break
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(dst, view):]
+    except OSError:
+        pass  # publisher sudah keluar (EPIPE)
+    finally:
+        # EOF diteruskan ke publisher; feeder yang masih menulis mendapat EPIPE
+        os.close(dst)
+        os.close(src)
+
+
+
+def _feeder_key(stream_id: str) -> str:
+    """Kunci proses feeder playlist di engine, terpisah dari publisher stream itu"""
+    return f"{stream_id}/feeder"
+
+class StreamSupervisor:
+    """Mengelola multi streaming: konfigurasi, proses ffmpeg dan log"""
+
+    def __init__(self, mezzanine: Optional[MezzanineStore] = None, engine: Optional[ProcessEngine] = None,
+                 library: Optional[MediaLibrary] = None, store: Optional[StreamStore] = None,
+                 log_writer: Optional[StreamLogWriter] = None, sources: Optional[SourceCache] = None):
+        self.store = store or StreamStore()
+        self.mezzanine = mezzanine or MezzanineStore()
+        self.engine = engine or ProcessEngine()
+        self.library = library or MediaLibrary()
+        self.library.start()
+        # CPU host diukur di satu thread; /health, metrics dan ABR membaca sampel terakhirnya
+        host_cpu.start()
+        self.log_writer = log_writer or StreamLogWriter()
+        self.log_writer.start()
+        # File hasil unduhan yang masih dipakai stream tidak ikut di-evict
+        self.sources = sources or SourceCache(in_use=self._media_in_use)
+        self.streams: Dict[str, Dict] = {}
+        self.stream_logs: Dict[str, LogRing] = {}
+        self.metrics: Dict[str, MetricsRing] = {}
+        self.health: Dict[str, HealthTracker] = {}
+        self._lock = threading.RLock()
+        # Admission diserialisasi agar dua start bersamaan tidak memakai headroom yang sama
+        self._admission_lock = threading.Lock()
+        self._position_saved: Dict[str, float] = {}
+        # Mode playlist: (task feeder, ujung tulis pipe) per stream
+        self._feeds: Dict[str, Tuple[asyncio.Task, int]] = {}
+        self.packer = CorePacker()
+        # Warm standby: event go-live per stream yang sedang siaga/berjalan dari siaga
+        self._armed: Dict[str, asyncio.Event] = {}
+        self._start_clock: Dict[str, float] = {}  # waktu klik LIVE/go-live, untuk start_latency
+        self._live_since: Dict[str, float] = {}  # waktu relay warm standby dinyalakan
+        # Bitrate adaptif: stream yang sedang di-restart karena pindah tingkat (tanpa backoff)
+        self.abr = BitrateController()
+        self._reconfigure: set = set()
+        # Profil/biaya admission stream passthrough yang diturunkan ke re-encode, dipulihkan di tingkat 0
+        self._abr_admitted: Dict[str, Tuple[Optional[str], float]] = {}
+        asyncio.run_coroutine_threadsafe(self._abr_loop(), self.engine.loop)
+        # Start/stop/restart massal dengan launch bertahap (POST /bulk, cli.py)
+        self.bulk = bulk.BulkRunner(
+            start=lambda stream_id, resume: self.start_stream(stream_id, resume=resume),
+            stop=self.stop_stream,
+            state=self.streams.get,
+        )
+
+    def add_stream(self, stream_id: str, title: str, video_path: str = None) -> Dict:
+        """Menambahkan stream baru"""
+        stream = self._register(self._new_stream(stream_id, title, video_path))
+        self._persist(stream_id)
+        return stream
+
+    @staticmethod
+    def _new_stream(stream_id: str, title: str, video_path: str = None) -> Dict:
+        """Konfigurasi default stream baru"""
+        return {
+            'id': stream_id,
+            'title': title,
+            'tags': [],  # label bebas untuk operasi massal (mis. 'news', 'rak-2')
+            'video_path': video_path,
+            'stream_key': '',
+            'status': 'stopped',  # lihat health.STATUSES
+            'duration': '0:00',
+            'current_time': '0:00',
+            'bitrate': 3000,
+            'resolution': '1080p',
+            'fps': 30,
+            'loop_video': True,
+            'rtmp_url': 'rtmp://a.rtmp.youtube.com/live2',
+            'destinations': [],  # tujuan tambahan: [{'rtmp_url': ..., 'stream_key': ...}]
+            'destination_status': [],  # status per tujuan: 'ok' / 'error'
+            'passthrough': False,  # True bila berjalan dengan -c copy
+            'speed': None,  # rata-rata speed ffmpeg dari -progress
+            'restart_count': 0,
+            'restart_history': [],  # [{'at': ..., 'reason': ..., 'delay': ...}]
+            'auto_restart': True,  # watchdog: reconnect otomatis saat ffmpeg keluar/macet
+            'resume_on_restart': True,  # lanjutkan dari posisi loop terakhir
+            'loop_offset': 0.0,
+            'encoder_profile': AUTO,  # 'auto' atau nama profil di profiles.ENCODER_PROFILES
+            'active_profile': None,  # profil yang dipilih admission control
+            'estimated_cost': 0.0,  # perkiraan core yang dipakai
+            'playlist': [],  # file yang diputar berurutan; kosong = loop video_path
+            'shuffle': False,  # acak urutan playlist setiap putaran
+            'schedule': [],  # slot jam: [{'start': 'HH:MM', 'end': 'HH:MM', 'items': [...]}]
+            'dedicated_cores': 0,  # core eksklusif untuk stream ini; 0 = pool bersama
+            'cpu_limit': None,  # quota cgroup dalam core (mis. 1.5)
+            'memory_limit_mb': None,  # batas memori cgroup
+            'nice': 0,
+            'ionice': None,  # None, 'best-effort' atau 'idle'
+            'threads': None,  # batas thread x264; None = sesuai core/quota
+            'cpus': [],  # core yang sedang dipasang untuk stream
+            'go_live_at': None,  # epoch go-live terjadwal saat siaga (warm standby)
+            'start_latency': None,  # detik dari klik LIVE/go-live sampai output ffmpeg terbuka
+            'preview': None,  # JPEG 1 fps untuk card; None = hanya saat re-encode (copy tidak men-decode)
+            'source_url': None,  # URL yang diunduh ke cache sumber lalu dipakai sebagai video_path
+            'relay_url': None,  # input live (HLS/RTMP/SRT) yang diteruskan; diisi = mode relay
+            'relay_buffer_ms': RELAY_BUFFER_MS,  # jitter buffer input relay
+            'input_status': None,  # relay: 'connecting', 'ok', 'reconnecting', 'stalled', 'error'
+            'ambient_image': None,  # gambar/klip pendek untuk stream ambient; diisi = mode ambient
+            'ambient_audio': [],  # file audio ambient, diputar berurutan lalu diulang
+            'abr': False,  # turunkan/naikkan bitrate otomatis mengikuti kapasitas uplink node
+            'abr_min_bitrate': 1500,  # batas bawah tangga bitrate (kbps)
+            'abr_min_resolution': '480p',  # batas bawah resolusi
+            'abr_priority': 0,  # lebih tinggi = diturunkan paling akhir, dinaikkan paling dulu
+            'abr_level': 0,  # tingkat aktif di tangga; 0 = bitrate/resolusi konfigurasi
+            'output_kbps': None,  # throughput output terukur
+            'send_backlog': None,  # byte yang antre di socket RTMP
+            'created_at': datetime.now().isoformat()
+        }
+
+    def _register(self, stream: Dict) -> Dict:
+        with self._lock:
+            self.streams[stream['id']] = stream
+            self.stream_logs.setdefault(stream['id'], LogRing())
+            self.metrics[stream['id']] = MetricsRing()
+            return stream
+
+    def update_stream(self, stream_id: str, updates: Dict):
+        """Update stream configuration"""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                return
+            changed = any(key not in VOLATILE_FIELDS and stream.get(key) != value
+                          for key, value in updates.items())
+            new_source = updates.get('source_url') and updates['source_url'] != stream.get('source_url')
+            stream.update(updates)
+        if changed:
+            self._persist(stream_id)
+        if new_source:
+            self.fetch_source(stream_id)
+
+    def fetch_source(self, stream_id: str):
+        """Unduh source_url stream di background; video_path diganti saat file siap"""
+        url = self.streams[stream_id]['source_url']
+
+        def done(path: Optional[str], error: Optional[str]):
+            stream = self.streams.get(stream_id)
+            if stream is None or stream.get('source_url') != url:
+                return  # stream dihapus atau URL sudah diganti selama mengunduh
+            if error:
+                self._add_log(stream_id, f"❌ Unduhan sumber gagal: {error}")
+                return
+            if stream['video_path'] != path:
+                self.update_stream(stream_id, {'video_path': path})
+                self._add_log(stream_id, f"📥 Sumber siap: {display_name(path)}")
+                self.library.rescan()
+
+        if not self.sources.lookup(url):
+            self._add_log(stream_id, f"📥 Mengunduh sumber {url}")
+        self.sources.fetch(url, done)
+
+    def release_video(self, stream_id: str) -> Tuple[bool, str]:
+        """Lepas video dari stream; filenya dihapus bila tidak dipakai stream lain (video utama atau playlist)"""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                return False, f"Stream {stream_id} tidak ada"
+            path = stream['video_path']
+            if not path:
+                return False, f"{stream['title']} tidak punya video"
+            # Lock dipegang sampai file terhapus agar stream lain tidak mengambil file ini di tengah jalan
+            self.update_stream(stream_id, {'video_path': None})
+            if path in self._media_in_use():
+                return True, "Video masih dipakai stream lain, hanya dilepas dari stream ini"
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.update_stream(stream_id, {'video_path': path})
+                return False, f"Gagal menghapus video: {e}"
+        return True, "Video dihapus!"
+
+    def stream_pids(self, stream_id: str) -> List[int]:
+        """Pid ffmpeg milik stream: proses utama plus feeder (mode playlist dan warm standby)"""
+        return [pid for pid in (self.engine.pid(stream_id), self.engine.pid(_feeder_key(stream_id))) if pid]
+
+    def _media_in_use(self) -> set:
+        """Semua file yang dipakai stream (video utama dan playlist)"""
+        with self._lock:
+            streams = list(self.streams.values())
+        return {path for stream in streams for path in [stream['video_path'], *playlist_items(stream)] if path}
+
+    def _persist(self, stream_id: str):
+        """Tulis konfigurasi stream ke store"""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                return
+            config = {key: value for key, value in stream.items() if key not in VOLATILE_FIELDS}
+        self.store.save_stream(config)
+
+    def recover(self) -> List[str]:
+        """Muat stream dari store saat boot dan nyalakan lagi yang sebelumnya berjalan"""
+        configs, runtime = self.store.load()
+        for stream_id, config in configs.items():
+            defaults = self._new_stream(stream_id, config.get('title', stream_id))
+            stream = self._register({**defaults, **config, 'status': 'stopped'})
+            # Unduhan yang terputus saat supervisor mati dilanjutkan dari file .part
+            if stream['source_url'] and not (stream['video_path'] and os.path.exists(stream['video_path'])):
+                self.fetch_source(stream_id)
+
+        restarted = []
+        for stream_id, state in runtime.items():
+            if stream_id not in self.streams:
+                continue
+            if state['pid']:
+                self._reap_orphan(stream_id, state['pid'])
+            if state['desired'] != 'running':
+                continue
+
+            # Lanjutkan dari posisi terakhir yang sempat disimpan sebelum crash/reboot
+            stream = self.streams[stream_id]
+            probe = self.library.probe(stream['video_path'])
+            offset = resume_offset(state['loop_offset'], state['out_time'], probe['duration'] if probe else 0.0)
+            self.update_stream(stream_id, {'loop_offset': round(offset, 3)})
+            ok, message = self.start_stream(stream_id, resume=True)
+            self._add_log(stream_id, f"♻️ Dipulihkan setelah supervisor restart: {message}")
+            logger.info("Pemulihan %s: %s", stream_id, message)
+            if ok:
+                restarted.append(stream_id)
+        return restarted
+
+    def _reap_orphan(self, stream_id: str, pid: int):
+        """Hentikan ffmpeg sisa supervisor sebelumnya agar tidak ada dua publisher ke key yang sama.
+
+        Proses lama tidak bisa diambil alih: pipe stderr/-progress-nya milik
+        supervisor yang sudah mati, jadi telemetri dan watchdog tidak akan jalan.
+        """
+        try:
+            process = psutil.Process(pid)
+            cmdline = process.cmdline()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return
+        # pid bisa sudah dipakai proses lain; pastikan ini ffmpeg milik stream ini
+        targets = output_targets(self.streams[stream_id])
+        if not cmdline or 'ffmpeg' not in os.path.basename(cmdline[0]):
+            return
+        if not any(target in arg for target in targets for arg in cmdline):
+            return
+        self._add_log(stream_id, f"🧹 Menghentikan ffmpeg lama (pid {pid})")
+        process.terminate()
+        try:
+            process.wait(5)
+        except psutil.TimeoutExpired:
+            process.kill()
+
+    def start_stream(self, stream_id: str, resume: bool = False, warm: bool = False,
+                     go_live_at: Optional[float] = None) -> Tuple[bool, str]:
+        """Memulai streaming untuk stream tertentu.
+
+        resume: pertahankan posisi loop. warm: siapkan ffmpeg (input terbuka,
+        encoder siap) tanpa tersambung ke tujuan sampai go-live, otomatis pada
+        go_live_at (epoch) bila diisi. Start pada stream yang sedang siaga
+        berarti go-live.
+        """
+        requested = time.monotonic()
+        if stream_id not in self.streams:
+            return False, f"Stream {stream_id} tidak ada"
+        # Cache sumber memanggil balik _media_in_use (lock supervisor) saat menyimpan unduhan,
+        # jadi sumber diselesaikan sebelum lock supervisor diambil
+        ok, message = self._resolve_source(stream_id)
+        if not ok:
+            return False, message
+
+        with self._lock:
+            if stream_id not in self.streams:
+                return False, f"Stream {stream_id} tidak ada"
+
+            stream = self.streams[stream_id]
+            if stream['status'] == 'armed' and not warm:
+                return self.go_live(stream_id)
+            if self.engine.is_running(stream_id) or stream['status'] in RUNNING_STATUSES:
+                return False, f"{stream['title']} sudah berjalan"
+
+            if is_relay(stream):
+                if warm:
+                    return False, f"Mode siaga belum didukung untuk relay {stream['title']}"
+            elif is_ambient(stream):
+                if warm:
+                    return False, f"Mode siaga belum didukung untuk ambient {stream['title']}"
+                if not os.path.exists(stream['ambient_image']):
+                    return False, f"Gambar ambient {stream['title']} tidak ditemukan!"
+                if not any(os.path.exists(path) for path in stream.get('ambient_audio') or []):
+                    return False, f"Audio ambient {stream['title']} belum dipilih atau tidak ditemukan!"
+            elif has_playlist(stream):
+                if not any(os.path.exists(path) for path in playlist_items(stream)):
+                    return False, f"Tidak ada file playlist {stream['title']} yang ditemukan!"
+            elif not stream['video_path'] or not os.path.exists(stream['video_path']):
+                return False, f"Video untuk {stream['title']} tidak ditemukan!"
+
+            if not output_targets(stream):
+                return False, f"Stream key untuk {stream['title']} belum diisi!"
+
+            # Update status
+            # speed kosong sampai sampel -progress pertama (dipakai bulk sebagai tanda siap)
+            self.update_stream(stream_id, {'status': 'starting', 'speed': None} if resume
+                               else {'status': 'starting', 'speed': None, 'loop_offset': 0.0})
+            stream = dict(stream)
+
+        ok, message = self._admit(stream, piped=warm)
+        if not ok:
+            self.update_stream(stream_id, {'status': 'stopped'})
+            self._add_log(stream_id, f"⛔ {message}")
+            return False, message
+
+        if warm:
+            go = self._armed[stream_id] = asyncio.Event()
+            self.update_stream(stream_id, {'status': 'armed', 'go_live_at': go_live_at, 'start_latency': None})
+            if go_live_at:
+                delay = max(go_live_at - time.time(), 0.0)
+                self.engine.loop.call_soon_threadsafe(self.engine.loop.call_later, delay, self.go_live, stream_id, go)
+            message = f"{stream['title']} siaga, menunggu go-live {message}"
+        else:
+            self._start_clock[stream_id] = requested
+            self.update_stream(stream_id, {'start_latency': None})
+            self.store.update_runtime(stream_id, desired='running')
+            message = f"Streaming {stream['title']} dimulai! {message}"
+
+        # Start streaming sebagai task di event loop engine
+        self.engine.submit(stream_id, self._run_stream(stream_id))
+        return True, message
+
+    def _resolve_source(self, stream_id: str) -> Tuple[bool, str]:
+        """Pastikan stream ber-source_url punya video_path dari cache, atau mulai unduhannya"""
+        stream = self.streams[stream_id]
+        if (stream['status'] in RUNNING_STATUSES or is_relay(stream) or is_ambient(stream)
+                or has_playlist(stream) or not stream['source_url']
+                or (stream['video_path'] and os.path.exists(stream['video_path']))):
+            return True, ""
+        # File sumber bisa sudah ada di cache (mis. konfigurasi dari scheduler belum memuat path-nya)
+        path = self.sources.lookup(stream['source_url'])
+        if path is None:
+            self.fetch_source(stream_id)
+            source = self.sources.status(stream['source_url'])
+            if source['status'] == 'error':
+                return False, f"Unduhan sumber {stream['title']} gagal: {source['error']}"
+            return False, f"Sumber {stream['title']} masih diunduh ({source['progress']:.0f}%)"
+        self.update_stream(stream_id, {'video_path': path})
+        return True, ""
+
+    def go_live(self, stream_id: str, go: Optional[asyncio.Event] = None) -> Tuple[bool, str]:
+        """Sambungkan stream yang siaga ke tujuan (go: hanya bila masih siaga yang sama)"""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            armed = self._armed.get(stream_id)
+            if stream is None or armed is None or stream['status'] != 'armed' or (go is not None and armed is not go):
+                return False, f"Stream {stream_id} tidak dalam mode siaga"
+            self._start_clock[stream_id] = time.monotonic()
+            self.update_stream(stream_id, {'go_live_at': None})
+        self.store.update_runtime(stream_id, desired='running')
+        self.engine.loop.call_soon_threadsafe(armed.set)
+        return True, f"{stream['title']} go-live!"
+
+    def _admit(self, stream: Dict, piped: bool = False) -> Tuple[bool, str]:
+        """Admission control: pilih profil encoder yang muat di sisa CPU, atau tolak"""
+        stream_id = stream['id']
+        # Playlist dan warm standby memakai pipeline pipe (selalu re-encode)
+        passthrough = (not piped and (is_relay(stream) or is_ambient(stream) or not has_playlist(stream))
+                       and self._plan_input(stream, queue_missing=False)[1])
+        with self._admission_lock:
+            ok, message = self._allocate_cores(stream)
+            if not ok:
+                return False, message
+            if passthrough:
+                # Preview yang dipaksa menyala berarti decode penuh di samping remux
+                cost = estimate_cost(stream['resolution'], stream['fps'], None, passthrough=True,
+                                     preview=preview_enabled(stream, True))
+                self.update_stream(stream_id, {'active_profile': None, 'estimated_cost': reserved_cost(stream, cost)})
+                return True, "(passthrough)"
+
+            with self._lock:
+                others = [s for s in self.streams.values() if s['id'] != stream_id]
+                degraded = [s['title'] for s in others if s['status'] == 'degraded']
+                pending = self._pending_cost(stream_id)
+
+            if degraded:
+                self._release_cores(stream_id)
+                return False, f"Host sudah jenuh: {', '.join(degraded)} di bawah realtime"
+
+            # Stream dengan quota/core khusus harus muat di batasnya sendiri, bukan di sisa host
+            headroom = budget(stream, measure_headroom(pending))
+            name, cost = choose_profile(stream['resolution'], stream['fps'],
+                                        stream.get('encoder_profile') or AUTO, headroom)
+            if name is None:
+                self._release_cores(stream_id)
+                return False, (f"CPU tidak cukup: butuh ±{cost:.1f} core, "
+                               f"sisa {max(headroom, 0):.1f} core")
+
+            self.update_stream(stream_id, {'active_profile': name,
+                                           'estimated_cost': round(reserved_cost(stream, cost), 2)})
+        return True, f"(profil {name}, ±{cost:.1f} core)"
+
+    def _allocate_cores(self, stream: Dict) -> Tuple[bool, str]:
+        """Pasang core khusus bila diminta; stream lain dipindah ke core sisanya"""
+        count = int(stream.get('dedicated_cores') or 0)
+        if not count:
+            return True, ""
+        cores = self.packer.allocate(stream['id'], count)
+        if cores is None:
+            return False, (f"Core khusus tidak cukup: {stream['title']} minta {count}, "
+                           f"sisa {self.packer.free_cores()}")
+        self.update_stream(stream['id'], {'cpus': cores})
+        self._repin_shared()
+        return True, ""
+
+    def _release_cores(self, stream_id: str):
+        if self.packer.assigned.get(stream_id):
+            self.packer.release(stream_id)
+            self.update_stream(stream_id, {'cpus': []})
+            self._repin_shared()
+
+    def _repin_shared(self):
+        """Samakan afinitas ffmpeg tanpa core khusus dengan pool bersama terbaru"""
+        pids = [process.pid for name, process in list(self.engine.processes.items())
+                if not self.packer.assigned.get(name.split('/')[0])]
+        set_affinity(pids, self.packer.shared())
+
+    def _on_publisher_start(self, stream_id: str, stream: Dict, pid: int):
+        self._on_spawn(stream_id, pid)
+        self.store.update_runtime(stream_id, pid=pid, loop_offset=stream.get('loop_offset', 0.0), out_time=0.0)
+
+    def _on_spawn(self, stream_id: str, pid: int):
+        """Terapkan batas resource stream ke proses ffmpeg yang baru jalan"""
+        with self._lock:
+            stream = dict(self.streams.get(stream_id) or {})
+        cpus = self.packer.assigned.get(stream_id)
+        if not cpus and len(self.packer.shared()) < len(self.packer.cpus):
+            cpus = self.packer.shared()
+        for warning in apply_limits(pid, stream_id, stream, cpus):
+            self._add_log(stream_id, f"⚠️ Batas resource: {warning}")
+
+    def _pending_cost(self, exclude: Optional[str] = None) -> float:
+        """Biaya stream yang baru start dan belum terlihat di pemakaian CPU"""
+        with self._lock:
+            return sum(s.get('estimated_cost', 0.0) for s in self.streams.values()
+                       if s['id'] != exclude and s['status'] in ('starting', 'reconnecting'))
+
+    def capacity(self) -> Dict:
+        """Ringkasan kapasitas node untuk scheduler multi-node"""
+        with self._lock:
+            running = [s for s in self.streams.values() if s['status'] in RUNNING_STATUSES]
+            degraded = any(s['status'] == 'degraded' for s in running)
+        return {
+            'node': NODE_NAME,
+            'cpu_count': psutil.cpu_count(),
+            # interval=None: sampel terakhir host_cpu, tidak memblok request /health
+            'headroom': round(measure_headroom(self._pending_cost(), interval=None), 2),
+            'committed_cost': round(sum(s.get('estimated_cost', 0.0) for s in running), 2),
+            'running': len(running),
+            'degraded': degraded,
+            'free_cores': self.packer.free_cores(),
+            'outbound_kbps': round(sum(s.get('output_kbps') or 0 for s in running)),
+            'uplink_kbps': self.abr.uplink_kbps or None,
+        }
+
+    def _plan_input(self, stream: Dict, queue_missing: bool = True) -> Tuple[str, bool, str, Optional[Dict]]:
+        """Tentukan input dan mode: file asli di-copy, file mezzanine di-copy, atau re-encode"""
+        if is_relay(stream):
+            # Input live tidak punya durasi/GOP dan tidak bisa di-mezzanine; cukup cek codec
+            passthrough, reason = check_relay_copy(probe_live(stream['relay_url']))
+            if passthrough and stream.get('abr_level'):
+                # -c copy meneruskan bitrate sumber; tingkat yang lebih rendah harus di-encode
+                passthrough, reason = False, f"bitrate adaptif {stream['bitrate']}k {stream['resolution']}"
+            return stream['relay_url'], passthrough, reason, None
+        if is_ambient(stream):
+            # Visual dan audio disiapkan sekali (_prepare_ambient), lalu hanya di-remux
+            return stream['ambient_image'], True, "ambient: visual loop + audio AAC di-remux", None
+
+        # Pre-flight probe: file yang sudah H.264/AAC sesuai target cukup di-copy
+        probe = self.library.probe(stream['video_path'])
+        passthrough, reason = check_passthrough(probe, stream)
+        input_path = stream['video_path']
+
+        if not passthrough:
+            # Pakai file mezzanine bila sudah ada; bila belum, encode live
+            # sambil mengantrikan transcode untuk start berikutnya
+            mezzanine_path = self.mezzanine.lookup(stream['video_path'], stream_profile(stream))
+            if mezzanine_path:
+                input_path, passthrough, reason = mezzanine_path, True, "file mezzanine siap"
+            elif queue_missing and not stream.get('abr_level'):
+                # Tingkat bitrate adaptif hanya sementara; tidak perlu mezzanine sendiri
+                self.mezzanine.request(stream['video_path'], [stream_profile(stream)], priority=0)
+
+        return input_path, passthrough, reason, probe
+
+    def _prepare_command(self, stream: Dict) -> Tuple[List[str], float]:
+        """Probe file, pilih passthrough/mezzanine/re-encode, lalu susun perintah ffmpeg"""
+        stream_id = stream['id']
+        targets = output_targets(stream)
+        input_path, passthrough, reason, probe = self._plan_input(stream)
+
+        self.update_stream(stream_id, {
+            'destination_status': ['ok'] * len(targets),
+            'passthrough': passthrough
+        })
+        self._add_log(stream_id, f"🔍 {'Passthrough (-c copy)' if passthrough else 'Re-encode'}: {reason}")
+
+        profile = self._capped_profile(stream)
+        if is_relay(stream):
+            self._add_log(stream_id, f"📡 Relay dari {stream['relay_url']}")
+            if not passthrough:
+                self._add_log(stream_id, f"🎛️ Profil encoder: {profile['preset']}")
+            return build_relay_command(stream, targets, passthrough, profile,
+                                       preview=self._preview_target(stream, passthrough)), 0.0
+        if is_ambient(stream):
+            loop_path = self.mezzanine.lookup(stream['ambient_image'], stream_profile(stream), LOOP)
+            audio_path = self.mezzanine.join_audio(self._ambient_audio(stream))
+            if not loop_path or not audio_path:
+                raise RuntimeError("visual/audio ambient belum siap")
+            self._add_log(stream_id, f"🖼️ Ambient: {display_name(stream['ambient_image'])} + "
+                                     f"{len(self._ambient_audio(stream))} audio")
+            return build_ambient_command(stream, targets, loop_path, audio_path,
+                                         preview=self._preview_target(stream, True)), 0.0
+
+        offset = stream['loop_offset'] if stream.get('resume_on_restart', True) else 0.0
+        if offset:
+            self._add_log(stream_id, f"⏩ Melanjutkan dari {format_time(offset)}")
+        duration = probe['duration'] if probe else 0.0
+        if not passthrough:
+            self._add_log(stream_id, f"🎛️ Profil encoder: {profile['preset']}")
+        return build_command(stream, targets, passthrough, input_path, offset, profile,
+                             preview=self._preview_target(stream, passthrough)), duration
+
+    @staticmethod
+    def _ambient_audio(stream: Dict) -> List[str]:
+        return [path for path in stream.get('ambient_audio') or [] if os.path.exists(path)]
+
+    async def _prepare_ambient(self, stream: Dict):
+        """Tunggu visual loop dan trek AAC ambient ada di cache mezzanine; antrikan yang belum"""
+        stream_id = stream['id']
+        jobs = [(stream['ambient_image'], stream_profile(stream), LOOP)]
+        jobs += [(path, None, AUDIO) for path in self._ambient_audio(stream)]
+        loop = asyncio.get_running_loop()
+        requested = set()
+        while True:
+            statuses = await loop.run_in_executor(None, lambda: [self.mezzanine.status(*job) for job in jobs])
+            missing = [job for job, status in zip(jobs, statuses) if status == 'missing']
+            if not missing and 'pending' not in statuses:
+                return
+            failed = [job for job in missing if job in requested]
+            if failed:
+                raise RuntimeError(f"gagal menyiapkan {display_name(failed[0][0])} untuk ambient")
+            if missing and not requested:
+                self._add_log(stream_id, "🖼️ Menyiapkan visual loop dan audio ambient (sekali per file)")
+            for path, profile, kind in missing:
+                self.mezzanine.request(path, [profile], priority=0, kind=kind)
+                requested.add((path, profile, kind))
+            await asyncio.sleep(1)
+
+    @staticmethod
+    def _preview_target(stream: Dict, passthrough: bool) -> Optional[str]:
+        """Path JPEG preview bila diaktifkan untuk stream ini dalam mode tersebut"""
+        if not preview_enabled(stream, passthrough):
+            return None
+        path = preview_path(stream['id'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def get_preview(self, stream_id: str) -> Optional[Tuple[bytes, os.stat_result]]:
+        """Frame preview terbaru beserta stat-nya (untuk ETag/Last-Modified)"""
+        try:
+            with open(preview_path(stream_id), 'rb') as f:
+                return f.read(), os.fstat(f.fileno())
+        except OSError:
+            return None
+
+    @staticmethod
+    def _capped_profile(stream: Dict) -> Dict:
+        """Profil aktif dengan jumlah thread x264 dibatasi sesuai core/quota stream"""
+        profile = get_profile(stream.get('active_profile'))
+        threads = thread_cap(stream, stream.get('cpus'))
+        return {**profile, 'threads': threads} if threads else profile
+
+    async def _run_stream(self, stream_id: str):
+        """Jalankan ffmpeg untuk streaming, reconnect otomatis sampai dihentikan pengguna"""
+        attempt = 0
+        try:
+            while True:
+                with self._lock:
+                    # Bitrate adaptif: perintah disusun dengan bitrate/resolusi tingkat aktif
+                    stream = effective_stream(dict(self.streams[stream_id]))
+
+                if has_playlist(stream) and not is_relay(stream) and not is_ambient(stream):
+                    idle_until = PlaylistCursor(stream).idle_until()
+                    if idle_until is not None:
+                        # Di luar semua slot jadwal: tunggu tanpa ffmpeg, bukan kegagalan
+                        self.update_stream(stream_id, {'status': 'waiting', 'speed': None})
+                        self._add_log(stream_id, f"⏳ Menunggu slot jadwal berikutnya ({idle_until:%H:%M})")
+                        # Bangun sedikit setelah awal slot agar slot_active() sudah benar
+                        await asyncio.sleep((idle_until - datetime.now()).total_seconds() + 1)
+                        attempt = 0
+                        continue
+
+                started = time.monotonic()
+                reason = await self._run_once(stream_id, stream)
+
+                if stream_id in self._reconfigure:
+                    # Pindah tingkat bitrate: langsung jalan lagi dari posisi terakhir, bukan reconnect
+                    self._reconfigure.discard(stream_id)
+                    continue
+                if reason == SLOT_ENDED:
+                    # Iterasi berikutnya menunggu slot jadwal berikutnya
+                    continue
+                if not self.streams.get(stream_id, {}).get('auto_restart', True):
+                    break
+
+                # Proses yang sempat stabil memulai backoff dari awal lagi
+                if time.monotonic() - started > STABLE_AFTER:
+                    attempt = 0
+                delay = backoff_delay(attempt)
+                attempt += 1
+                self._record_restart(stream_id, reason, delay)
+                await asyncio.sleep(delay)
+
+            # Berhenti sendiri (auto-reconnect mati): jangan dinyalakan lagi saat boot
+            self.store.update_runtime(stream_id, desired='stopped', pid=None)
+
+        except asyncio.CancelledError:
+            self._add_log(stream_id, "🛑 Streaming dihentikan oleh pengguna")
+            raise
+        finally:
+            self._armed.pop(stream_id, None)
+            self._start_clock.pop(stream_id, None)
+            self._live_since.pop(stream_id, None)
+            self._release_cores(stream_id)
+            self._restore_admission(stream_id)
+            self._reconfigure.discard(stream_id)
+            self.abr.forget(stream_id)
+            cgroup_remove(stream_id)
+            # Frame lama tidak boleh terlihat seperti stream yang masih berjalan
+            with contextlib.suppress(OSError):
+                os.remove(preview_path(stream_id))
+            self.update_stream(stream_id, {'status': 'stopped', 'speed': None, 'input_status': None,
+                                           'abr_level': 0, 'output_kbps': None, 'send_backlog': None})
+            self._add_log(stream_id, "⏹️ Streaming dihentikan")
+
+    async def _run_once(self, stream_id: str, stream: Dict) -> str:
+        """Satu proses ffmpeg dari start sampai keluar; kembalikan alasan berhenti"""
+        health = HealthTracker(
+            stall_timeout=stream.get('stall_timeout') or (RELAY_STALL_TIMEOUT if is_relay(stream) else STALL_TIMEOUT),
+            degraded_timeout=stream.get('degraded_timeout') or DEGRADED_TIMEOUT,
+        )
+        watchdog = None
+        feeder = None
+        read_fd = None
+        # Warm standby: feeder -> (relay_fd) relay (publisher_fd) -> publisher; relay baru jalan saat go-live
+        go = self._armed.get(stream_id)
+        relay_fd = publisher_fd = None
+        duration = 0.0
+        try:
+            if (has_playlist(stream) and not is_relay(stream) and not is_ambient(stream)) or go is not None:
+                # Publisher (satu encoder) tetap tersambung ke ingest; item di-decode feeder lewat pipe
+                profile = self._capped_profile(stream)
+                cmd = build_publisher_command(stream, output_targets(stream), profile, paced=go is not None,
+                                              preview=self._preview_target(stream, False))
+                self.update_stream(stream_id, {'destination_status': ['ok'] * len(output_targets(stream)),
+                                               'passthrough': False})
+                self._add_log(stream_id, f"🎛️ Profil encoder: {profile['preset']}")
+                read_fd, write_fd = os.pipe()
+                feed_fd = write_fd
+                if go is not None:
+                    relay_fd, feed_fd = os.pipe()
+                    publisher_fd = write_fd
+                feeder = asyncio.ensure_future(self._feed_playlist(stream_id, stream, feed_fd, paced=go is None))
+                self._feeds[stream_id] = (feeder, feed_fd)
+            else:
+                if is_relay(stream):
+                    self.update_stream(stream_id, {'input_status': 'connecting'})
+                elif is_ambient(stream):
+                    await self._prepare_ambient(stream)
+                # Probe dan hashing bersifat blocking, jadi dijalankan di thread pool
+                cmd, duration = await asyncio.get_running_loop().run_in_executor(None, self._prepare_command, stream)
+
+            # Update status
+            self.update_stream(stream_id, {'status': 'armed' if go is not None and not go.is_set() else 'live'})
+
+            # Log command
+            self._add_log(stream_id, f"🚀 Memulai streaming: {' '.join(cmd[:10])}...")
+
+            parser = ProgressParser()
+            publisher = asyncio.ensure_future(self.engine.run_process(
+                stream_id, cmd,
+                on_line=lambda line: self._on_output(stream_id, line),
+                on_progress=lambda line: self._on_progress(stream_id, parser, line),
+                on_start=lambda pid: self._on_publisher_start(stream_id, stream, pid),
+                stdin=read_fd,
+            ))
+            try:
+                if go is not None:
+                    if not go.is_set():
+                        self._add_log(stream_id, "🔥 Siaga: feeder sudah membuka input, publisher menunggu go-live")
+                        waiter = asyncio.ensure_future(go.wait())
+                        try:
+                            await asyncio.wait({waiter, publisher}, return_when=asyncio.FIRST_COMPLETED)
+                        finally:
+                            waiter.cancel()
+                    if not publisher.done():
+                        threading.Thread(target=_relay, args=(relay_fd, publisher_fd),
+                                         name=f'relay-{stream_id}', daemon=True).start()
+                        relay_fd = publisher_fd = None  # sekarang milik thread relay
+                        self._live_since[stream_id] = time.monotonic()
+                        self.update_stream(stream_id, {'status': 'live'})
+
+                # Watchdog baru dipasang setelah live; saat siaga memang belum ada progress
+                with self._lock:
+                    self.health[stream_id] = health
+                watchdog = asyncio.ensure_future(self._watchdog(stream_id, health))
+                returncode = await asyncio.shield(publisher)
+            except asyncio.CancelledError:
+                if relay_fd is not None:
+                    # Masih siaga: feeder keluar karena EPIPE, publisher karena EOF
+                    os.close(relay_fd)
+                    os.close(publisher_fd)
+                    relay_fd = publisher_fd = None
+                if feeder is not None:
+                    # ffmpeg yang membaca pipe baru keluar setelah EOF: hentikan feeder dulu
+                    await self._stop_feed(stream_id)
+                    try:
+                        await asyncio.wait_for(publisher, STOP_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    publisher.cancel()
+                    await asyncio.gather(publisher, return_exceptions=True)
+                raise
+            self._add_log(stream_id, f"ffmpeg selesai dengan kode {returncode}")
+
+            if watchdog.done() and not watchdog.cancelled():
+                if health.degraded_since is not None:
+                    self._step_down_preset(stream_id)
+                return watchdog.result()
+            if feeder is not None and feeder.done() and not feeder.cancelled():
+                return feeder.result()
+            return f"ffmpeg keluar dengan kode {returncode}"
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._add_log(stream_id, f"❌ Error: {e}")
+            self.update_stream(stream_id, {'status': 'error'})
+            return f"error: {e}"
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            for fd in (relay_fd, publisher_fd):
+                if fd is not None:
+                    os.close(fd)
+            await self._stop_feed(stream_id)
+            if read_fd is not None:
+                os.close(read_fd)
+            self._save_position(stream_id, stream, health, duration)
+
+    async def _feed_playlist(self, stream_id: str, stream: Dict, fd: int, paced: bool = True) -> str:
+        """Putar item playlist satu per satu ke pipe publisher; kembalikan alasan bila berhenti"""
+        if not has_playlist(stream):
+            # Warm standby satu file: diputar sebagai playlist satu item (loop)
+            stream = {**stream, 'playlist': [stream['video_path']]}
+        cursor = PlaylistCursor(stream)
+        ts_offset = 0.0
+        failures = 0
+        loop = asyncio.get_running_loop()
+        while True:
+            item = cursor.next_item()
+            if item is None:
+                reason = SLOT_ENDED if cursor.schedule else "playlist kosong"
+                break
+            if failures > len(playlist_items(stream)):
+                reason = "semua item playlist gagal diputar"
+                break
+
+            if not os.path.exists(item):
+                self._add_log(stream_id, f"⚠️ Item playlist tidak ditemukan: {item}")
+                failures += 1
+                continue
+
+            probe = await loop.run_in_executor(None, self.library.probe, item)
+            self._add_log(stream_id, f"▶️ Playlist: {display_name(item)}")
+            cmd = build_feeder_command(stream, item, ts_offset,
+                                       has_audio=bool(probe['acodec']) if probe else True, paced=paced)
+            started = time.monotonic()
+            returncode = await self.engine.run_process(
+                _feeder_key(stream_id), cmd,
+                on_line=lambda line: self._add_log(stream_id, f"[playlist] {line}"),
+                on_start=lambda pid: self._on_spawn(stream_id, pid),
+                stdout=fd,
+            )
+            # Waktu menunggu go-live (warm standby) bukan bagian dari durasi item
+            elapsed = time.monotonic() - max(started, self._live_since.get(stream_id, 0.0))
+            if returncode != 0 and elapsed < 2:
+                failures += 1
+                continue
+
+            failures = 0
+            # Timestamp item berikutnya menyambung tepat di akhir item ini
+            ts_offset += probe['duration'] if probe and probe['duration'] else elapsed
+
+        self._add_log(stream_id, f"⚠️ Feeder playlist berhenti: {reason}")
+        # Tutup pipe dari luar task ini agar publisher mendapat EOF dan keluar
+        asyncio.ensure_future(self._stop_feed(stream_id))
+        return reason
+
+    async def _stop_feed(self, stream_id: str):
+        """Hentikan feeder playlist dan tutup ujung tulis pipe (publisher lalu keluar karena EOF)"""
+        feed = self._feeds.pop(stream_id, None)
+        if feed is None:
+            return
+        feeder, write_fd = feed
+        feeder.cancel()
+        await asyncio.gather(feeder, return_exceptions=True)
+        os.close(write_fd)
+
+    async def _watchdog(self, stream_id: str, health: HealthTracker) -> str:
+        """Periksa kesehatan proses secara berkala; hentikan ffmpeg bila macet/lambat"""
+        while True:
+            await asyncio.sleep(CHECK_INTERVAL)
+            reason = health.check()
+            if reason:
+                self._add_log(stream_id, f"🩺 Watchdog: {reason}")
+                if health.degraded_since is None:
+                    # Relay: frame berhenti datang (bukan encode lambat) berarti input live yang diam
+                    self._set_input_status(stream_id, 'stalled')
+                await self._stop_feed(stream_id)
+                await self.engine.terminate(stream_id)
+                return reason
+
+    def _step_down_preset(self, stream_id: str):
+        """Auto-tuning: stream yang terus di bawah realtime di-restart dengan preset lebih cepat"""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            if stream is None or stream.get('encoder_profile', AUTO) != AUTO or not stream.get('active_profile'):
+                return
+            name = faster_profile(stream['active_profile'])
+            if name is None:
+                return
+            stream['active_profile'] = name
+            stream['estimated_cost'] = round(estimate_cost(stream['resolution'], stream['fps'], name), 2)
+        self._persist(stream_id)
+        self._add_log(stream_id, f"🎛️ Turun ke preset {name} agar kembali realtime")
+
+    async def _abr_loop(self):
+        """Controller bitrate adaptif: satu keputusan naik/turun per interval untuk seluruh node"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(ABR_INTERVAL)
+            try:
+                # Membaca /proc untuk antrean socket bersifat blocking
+                loads = await loop.run_in_executor(None, self._abr_loads)
+                decision = self.abr.decide(loads)
+                if decision:
+                    await self._set_abr_level(*decision)
+            except Exception:
+                logger.exception("Controller bitrate adaptif gagal")
+
+    def _abr_loads(self) -> List[StreamLoad]:
+        """Throughput dan antrean kirim semua stream aktif (yang tanpa abr tetap dihitung ke total uplink)"""
+        with self._lock:
+            active = [dict(stream) for stream in self.streams.values() if stream['status'] in ACTIVE_STATUSES]
+            windows = {stream['id']: (self.metrics[stream['id']].recent(THROUGHPUT_WINDOW),
+                                      self.metrics[stream['id']].below_realtime())
+                       for stream in active if stream['id'] in self.metrics}
+        pids = {stream['id']: self.engine.pid(stream['id']) for stream in active}
+        backlogs = send_backlog([pid for pid in pids.values() if pid])
+
+        loads = []
+        for stream in active:
+            stream_id = stream['id']
+            samples, below = windows.get(stream_id, ([], False))
+            throughput = throughput_kbps(samples)
+            backlog = backlogs.get(pids[stream_id])
+            self.update_stream(stream_id, {'output_kbps': round(throughput) if throughput is not None else None,
+                                           'send_backlog': backlog})
+            rungs = ladder(stream)
+            level = min(int(stream.get('abr_level') or 0), len(rungs) - 1)
+            can_step_down = True
+            if stream.get('abr') and level + 1 < len(rungs) and stream['passthrough'] and not is_ambient(stream):
+                # Passthrough yang diturunkan harus di-encode; hanya bila CPU-nya ada
+                can_step_down = self._encode_fits(stream, rungs[level + 1]) is not None
+            loads.append(StreamLoad(
+                stream_id=stream_id,
+                enabled=bool(stream.get('abr')),
+                priority=int(stream.get('abr_priority') or 0),
+                level=level,
+                max_level=len(rungs) - 1,
+                target_kbps=rungs[level][0],
+                up_kbps=rungs[level - 1][0] if level else None,
+                throughput_kbps=throughput,
+                backlog_bytes=backlog,
+                below_realtime=below,
+                can_step_down=can_step_down,
+            ))
+        return loads
+
+    def _encode_fits(self, stream: Dict, rung: Tuple[int, str]) -> Optional[Tuple[str, float]]:
+        """Profil encoder untuk tingkat ini yang muat di sisa CPU, atau None"""
+        headroom = budget(stream, measure_headroom(self._pending_cost(), interval=None))
+        name, cost = choose_profile(rung[1], stream['fps'], stream.get('encoder_profile') or AUTO, headroom)
+        return (name, cost) if name else None
+
+    async def _set_abr_level(self, stream_id: str, level: int, reason: str):
+        """Pindahkan stream ke tingkat lain lalu restart ffmpeg-nya dari posisi terakhir"""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            if stream is None or stream['status'] not in ACTIVE_STATUSES or stream_id not in self.engine.processes:
+                return
+            rungs = ladder(stream)
+            level = max(0, min(level, len(rungs) - 1))
+            if level == (stream.get('abr_level') or 0):
+                return
+            down = level > (stream.get('abr_level') or 0)
+            stream = dict(stream)
+
+        if down and stream['passthrough'] and not is_ambient(stream):
+            # Admission lock bisa ditahan _admit selama sampling CPU; jangan blokir event loop engine
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(None, self._admit_encode, stream, rungs[level]):
+                self._add_log(stream_id, "📶 Uplink padat, tapi CPU tidak cukup untuk re-encode bitrate lebih rendah")
+                return
+        if level == 0:
+            self._restore_admission(stream_id)
+
+        bitrate, resolution = rungs[level]
+        self.update_stream(stream_id, {'abr_level': level})
+        self._add_log(stream_id, f"📶 {'Turun' if down else 'Naik'} ke {bitrate}k {resolution} ({reason})")
+        self._reconfigure.add(stream_id)
+        await self._stop_feed(stream_id)
+        await self.engine.terminate(stream_id)
+
+    def _admit_encode(self, stream: Dict, rung: Tuple[int, str]) -> bool:
+        """Admission re-encode untuk stream passthrough yang diturunkan abr (dijalankan di thread)"""
+        with self._admission_lock:
+            fits = self._encode_fits(stream, rung)
+            if fits is None:
+                return False
+            self._abr_admitted.setdefault(stream['id'], (stream.get('active_profile'),
+                                                         stream.get('estimated_cost', 0.0)))
+            self.update_stream(stream['id'], {'active_profile': fits[0],
+                                              'estimated_cost': round(reserved_cost(stream, fits[1]), 2)})
+            return True
+
+    def _restore_admission(self, stream_id: str):
+        """Kembalikan profil/biaya admission stream passthrough yang sempat di-encode oleh abr"""
+        admitted = self._abr_admitted.pop(stream_id, None)
+        if admitted is not None:
+            self.update_stream(stream_id, {'active_profile': admitted[0], 'estimated_cost': admitted[1]})
+
+    def _save_position(self, stream_id: str, stream: Dict, health: HealthTracker, duration: float):
+        """Simpan posisi loop terakhir agar restart bisa melanjutkan dari sana"""
+        if health.last_out_time <= 0:
+            return
+        offset = resume_offset(stream.get('loop_offset', 0.0), health.last_out_time, duration)
+        self.update_stream(stream_id, {'loop_offset': round(offset, 3)})
+        self.store.update_runtime(stream_id, loop_offset=round(offset, 3), out_time=0.0)
+
+    def _record_restart(self, stream_id: str, reason: str, delay: float):
+        """Catat riwayat restart dan tandai stream sedang menunggu reconnect"""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            if stream is None:
+                return
+            history = stream['restart_history'][-(HISTORY_SIZE - 1):] + [{
+                'at': datetime.now().isoformat(timespec='seconds'),
+                'reason': reason,
+                'delay': round(delay, 1),
+            }]
+            stream.update({
+                'status': 'reconnecting',
+                'speed': None,
+                'restart_count': stream['restart_count'] + 1,
+                'restart_history': history,
+            })
+        self._persist(stream_id)
+        self._add_log(stream_id, f"🔁 Reconnect dalam {delay:.1f} detik ({reason})")
+
+    def _on_output(self, stream_id: str, line: str):
+        """Satu baris stderr ffmpeg"""
+        self._add_log(stream_id, line)
+        # 'Output #0' dicetak saat output (koneksi RTMP) sudah terbuka
+        if line.startswith('Output #0') and stream_id in self._start_clock:
+            latency = time.monotonic() - self._start_clock.pop(stream_id)
+            self.update_stream(stream_id, {'start_latency': round(latency, 3)})
+            self._add_log(stream_id, f"⏱️ Output terbuka {latency:.2f} detik setelah LIVE")
+        if 'Slave muxer' in line:
+            self._check_tee_failure(stream_id, line)
+        elif OUTPUT_ERROR_RE.search(line):
+            # Output ffmpeg (bukan satu slave tee) gagal: semua tujuan ikut terputus
+            with self._lock:
+                targets = len(self.streams.get(stream_id, {}).get('destination_status', []))
+            self.update_stream(stream_id, {'destination_status': ['error'] * targets})
+        elif INPUT_LINE_RE.search(line):
+            if 'Will reconnect' in line:
+                self._set_input_status(stream_id, 'reconnecting')
+            elif 'rror' in line:
+                self._set_input_status(stream_id, 'error')
+
+    def _set_input_status(self, stream_id: str, status: str):
+        """Kesehatan input relay, terpisah dari status tujuan (destination_status)"""
+        with self._lock:
+            stream = self.streams.get(stream_id)
+            if stream is None or not is_relay(stream) or stream.get('input_status') == status:
+                return
+            stream['input_status'] = status
+        self._add_log(stream_id, {
+            'ok': "📥 Input relay mengalir",
+            'reconnecting': "📥 Input relay terputus, ffmpeg menyambung ulang",
+            'stalled': "📥 Input relay diam, tidak ada frame baru",
+            'error': "📥 Input relay error",
+        }.get(status, f"📥 Input relay: {status}"))
+
+    def _on_progress(self, stream_id: str, parser: ProgressParser, line: str):
+        """Satu baris -progress; setiap blok lengkap menjadi sampel metrik"""
+        sample = parser.feed(line)
+        if sample is None:
+            return
+
+        with self._lock:
+            ring = self.metrics.setdefault(stream_id, MetricsRing())
+            ring.append(sample)
+            stream = self.streams.get(stream_id)
+            if stream is None or stream['status'] not in ACTIVE_STATUSES:
+                return
+
+            status = 'degraded' if ring.below_realtime() else 'live'
+            health = self.health.get(stream_id)
+            input_status = None
+            if is_relay(stream) and health is not None:
+                if sample.out_time > health.last_out_time:
+                    input_status = 'ok'
+                else:
+                    # Relay tanpa frame baru: input live yang diam, bukan encoder yang lambat
+                    status = stream['status']
+                    if stream.get('input_status') == 'ok':
+                        input_status = 'stalled'
+                if input_status == stream.get('input_status'):
+                    input_status = None
+            if health is not None:
+                health.observe(sample, status == 'degraded')
+            if status != stream['status']:
+                self._add_log(stream_id, "🐢 Speed di bawah realtime!" if status == 'degraded' else "✅ Speed kembali realtime")
+            stream.update({
+                'status': status,
+                'current_time': format_time(sample.out_time),
+                'speed': ring.average_speed(),
+            })
+            save_position = sample.timestamp - self._position_saved.get(stream_id, 0) >= POSITION_SAVE_INTERVAL
+
+        if input_status:
+            self._set_input_status(stream_id, input_status)
+
+        # Posisi berkala untuk pemulihan setelah crash (tidak ada kesempatan _save_position)
+        if save_position:
+            self._position_saved[stream_id] = sample.timestamp
+            self.store.update_runtime(stream_id, out_time=sample.out_time)
+
+    def get_metrics(self, stream_id: str, limit: int = 60) -> List[Dict]:
+        """Sampel progress terakhir sebuah stream"""
+        with self._lock:
+            ring = self.metrics.get(stream_id)
+            return [sample.to_dict() for sample in ring.recent(limit)] if ring else []
+
+    def _check_tee_failure(self, stream_id: str, line: str):
+        """Tandai tujuan yang dilepas tee muxer tanpa mengganggu tujuan lain"""
+        match = TEE_FAILURE_RE.search(line)
+        if not match:
+            return
+
+        with self._lock:
+            status = list(self.streams[stream_id].get('destination_status', []))
+            index = int(match.group(1))
+            if index >= len(status):
+                return
+            status[index] = 'error'
+            self.update_stream(stream_id, {'destination_status': status})
+        self._add_log(stream_id, f"⚠️ Tujuan #{index + 1} gagal, tujuan lain tetap berjalan")
+
+    def stop_stream(self, stream_id: str):
+        """Menghentikan streaming"""
+        self.store.update_runtime(stream_id, desired='stopped', pid=None)
+        if self.engine.is_running(stream_id):
+            # Membatalkan task: SIGTERM, tunggu ffmpeg keluar, SIGKILL bila macet
+            self.engine.stop(stream_id, timeout=STOP_WAIT)
+        else:
+            self._add_log(stream_id, "🛑 Streaming dihentikan oleh pengguna")
+        self.update_stream(stream_id, {'status': 'stopped'})
+
+    def delete_stream(self, stream_id: str):
+        """Menghapus stream"""
+        if self.engine.is_running(stream_id):
+            self.stop_stream(stream_id)
+
+        with self._lock:
+            self.streams.pop(stream_id, None)
+            self.stream_logs.pop(stream_id, None)
+            self.log_writer.close_stream(stream_id)
+            self.metrics.pop(stream_id, None)
+            self.health.pop(stream_id, None)
+            self._position_saved.pop(stream_id, None)
+        self.store.delete_stream(stream_id)
+
+    def _add_log(self, stream_id: str, message: str):
+        """Menambahkan log untuk stream: ring buffer di memori (tanpa lock) dan file di disk"""
+        logs = self.stream_logs.get(stream_id)
+        if logs is None:
+            logs = self.stream_logs.setdefault(stream_id, LogRing())
+        now = time.time()
+        # File di disk adalah catatan lengkap; dedup dan pembatasan statistik hanya untuk ring UI
+        self.log_writer.write(stream_id, message, now)
+        logs.append(message, now)
+
+    def get_logs(self, stream_id: str, limit: int = 20) -> List[str]:
+        """Log terakhir sebuah stream (maksimal RING_SIZE baris)"""
+        logs = self.stream_logs.get(stream_id)
+        return logs.tail(limit) if logs is not None else []
+
+    def snapshot(self, stream_ids: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Salinan stream (semua atau yang diminta) plus info turunan (probe, mezzanine) untuk UI"""
+        with self._lock:
+            streams = {stream_id: dict(stream) for stream_id, stream in self.streams.items()
+                       if stream_ids is None or stream_id in stream_ids}
+            for stream_id, stream in streams.items():
+                latest = self.metrics[stream_id].latest() if stream_id in self.metrics else None
+                stream['progress'] = latest.to_dict() if latest else None
+
+        for stream in streams.values():
+            stream['abr_rung'] = list(current_rung(stream))
+            if is_relay(stream):
+                # Probe input live terlalu lambat untuk setiap refresh UI; pakai mode yang sedang jalan
+                stream.update({'probe': None, 'can_passthrough': stream['passthrough'],
+                               'passthrough_reason': "relay input live", 'source': None, 'mezzanine_status': None})
+                continue
+            if is_ambient(stream):
+                stream.update({'probe': None, 'can_passthrough': True, 'passthrough_reason': "ambient", 'source': None,
+                               'mezzanine_status': self.mezzanine.status(stream['ambient_image'],
+                                                                         stream_profile(stream), LOOP)})
+                continue
+            probe = self.library.probe(stream['video_path'])
+            can_copy, reason = check_passthrough(probe, stream)
+            stream['probe'] = probe
+            if probe and probe['duration']:
+                stream['duration'] = format_time(probe['duration'])
+            stream['can_passthrough'] = can_copy
+            stream['passthrough_reason'] = reason
+            stream['source'] = self.sources.status(stream['source_url']) if stream.get('source_url') else None
+            stream['mezzanine_status'] = (
+                self.mezzanine.status(stream['video_path'], stream_profile(stream))
+                if stream['video_path'] else None
+            )
+        return streams
+
+
+class SupervisorHandler(BaseHTTPRequestHandler):
+    """HTTP API JSON untuk supervisor (hanya untuk localhost)"""
+
+    supervisor: StreamSupervisor = None
+    routes = [
+        ('GET', r'/health', 'health'),
+        ('GET', r'/metrics', 'prometheus'),
+        ('GET', r'/streams', 'list_streams'),
+        ('POST', r'/streams', 'create_stream'),
+        ('GET', r'/streams/(?P<stream_id>[^/]+)', 'get_stream'),
+        ('PATCH', r'/streams/(?P<stream_id>[^/]+)', 'patch_stream'),
+        ('DELETE', r'/streams/(?P<stream_id>[^/]+)', 'remove_stream'),
+        ('POST', r'/streams/(?P<stream_id>[^/]+)/start', 'start'),
+        ('POST', r'/streams/(?P<stream_id>[^/]+)/arm', 'arm'),
+        ('POST', r'/streams/(?P<stream_id>[^/]+)/stop', 'stop'),
+        ('GET', r'/streams/(?P<stream_id>[^/]+)/logs', 'logs'),
+        ('GET', r'/streams/(?P<stream_id>[^/]+)/metrics', 'stream_metrics'),
+        ('GET', r'/streams/(?P<stream_id>[^/]+)/preview\.jpg', 'preview'),
+        ('POST', r'/streams/(?P<stream_id>[^/]+)/source', 'fetch_source'),
+        ('DELETE', r'/streams/(?P<stream_id>[^/]+)/video', 'remove_video'),
+        ('POST', r'/mezzanine', 'mezzanine'),
+        ('GET', r'/media', 'list_media'),
+        ('GET', r'/sources', 'list_sources'),
+        ('POST', r'/media/rescan', 'rescan_media'),
+        ('GET', r'/bulk', 'list_bulk'),
+        ('POST', r'/bulk', 'create_bulk'),
+        ('GET', r'/bulk/(?P<job_id>\d+)', 'get_bulk'),
+        ('DELETE', r'/bulk/(?P<job_id>\d+)', 'cancel_bulk'),
+    ]
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _dispatch(self, method: str):
+        url = urlparse(self.path)
+        for route_method, pattern, name in self.routes:
+            match = re.fullmatch(pattern, url.path)
+            if route_method == method and match:
+                headers = {}
+                try:
+                    status, body, *extra = getattr(self, name)(query=parse_qs(url.query), **match.groupdict())
+                    headers = extra[0] if extra else {}
+                except (ValueError, KeyError) as e:
+                    status, body = 400, {'error': str(e)}
+                except concurrent.futures.TimeoutError:
+                    status, body = 504, {'error': "Waktu habis menunggu ffmpeg; operasi tetap berjalan di background"}
+                if isinstance(body, str):
+                    return self._send(status, body, metrics.CONTENT_TYPE)
+                return self._send(status, body, headers.pop('Content-Type', 'application/json'), headers)
+        self._send(404, {'error': f"{method} {url.path} tidak dikenal"})
+
+    def _send(self, status: int, body, content_type: str = 'application/json', headers: Optional[Dict] = None):
+        if isinstance(body, bytes):
+            data = body
+        elif isinstance(body, str):
+            data = body.encode()
+        else:
+            data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def health(self, query):
+        return 200, {'ok': True, 'pid': os.getpid(), 'streams': len(self.supervisor.streams),
+                     **self.supervisor.capacity()}
+
+    def prometheus(self, query):
+        return 200, metrics.render_metrics(self.supervisor)
+
+    def list_streams(self, query):
+        return 200, self.supervisor.snapshot()
+
+    def create_stream(self, query):
+        body = self._body()
+        stream = self.supervisor.add_stream(body['id'], body['title'], body.get('video_path'))
+        if body.get('updates'):
+            self.supervisor.update_stream(body['id'], body['updates'])
+        return 201, stream
+
+    def get_stream(self, query, stream_id):
+        streams = self.supervisor.snapshot([stream_id])
+        if stream_id not in streams:
+            return 404, {'error': f"Stream {stream_id} tidak ada"}
+        return 200, streams[stream_id]
+
+    def patch_stream(self, query, stream_id):
+        if stream_id not in self.supervisor.streams:
+            return 404, {'error': f"Stream {stream_id} tidak ada"}
+        self.supervisor.update_stream(stream_id, self._body())
+        return 200, {'ok': True}
+
+    def remove_stream(self, query, stream_id):
+        self.supervisor.delete_stream(stream_id)
+        return 200, {'ok': True}
+
+    def start(self, query, stream_id):
+        ok, message = self.supervisor.start_stream(stream_id, resume=bool(self._body().get('resume')))
+        return (200, {'ok': True, 'message': message}) if ok else (400, {'error': message})
+
+    def arm(self, query, stream_id):
+        ok, message = self.supervisor.start_stream(stream_id, warm=True, go_live_at=self._body().get('go_live_at'))
+        return (200, {'ok': True, 'message': message}) if ok else (400, {'error': message})
+
+    def stop(self, query, stream_id):
+        self.supervisor.stop_stream(stream_id)
+        return 200, {'ok': True}
+
+    def logs(self, query, stream_id):
+        limit = int(query.get('limit', ['20'])[0])
+        return 200, {'logs': self.supervisor.get_logs(stream_id, limit)}
+
+    def stream_metrics(self, query, stream_id):
+        limit = int(query.get('limit', ['60'])[0])
+        return 200, {'samples': self.supervisor.get_metrics(stream_id, limit)}
+
+    def preview(self, query, stream_id):
+        preview = self.supervisor.get_preview(stream_id)
+        if preview is None:
+            return 404, {'error': f"Belum ada preview untuk {stream_id}"}
+        data, stat = preview
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        # Frame berganti setiap 1/PREVIEW_FPS detik; klien boleh memakai cache selama itu
+        headers = {
+            'ETag': etag,
+            'Last-Modified': formatdate(stat.st_mtime, usegmt=True),
+            'Cache-Control': f"private, max-age={max(int(1 / PREVIEW_FPS), 1)}",
+        }
+        if self.headers.get('If-None-Match') == etag:
+            return 304, b'', headers
+        return 200, data, {'Content-Type': 'image/jpeg', **headers}
+
+    def fetch_source(self, query, stream_id):
+        stream = self.supervisor.streams.get(stream_id)
+        if stream is None:
+            return 404, {'error': f"Stream {stream_id} tidak ada"}
+        if not stream.get('source_url'):
+            return 400, {'error': f"Stream {stream_id} tidak punya source_url"}
+        self.supervisor.fetch_source(stream_id)
+        return 202, {'ok': True}
+
+    def remove_video(self, query, stream_id):
+        ok, message = self.supervisor.release_video(stream_id)
+        return (200, {'ok': True, 'message': message}) if ok else (400, {'error': message})
+
+    def mezzanine(self, query):
+        body = self._body()
+        profiles = [tuple(profile) for profile in body['profiles']]
+        if upload_hash_matches(body['path'], body.get('content_hash')):
+            # UI sudah meng-hash file saat upload; hash lain atau file lain dihitung ulang oleh file_hash
+            try:
+                remember_hash(body['path'], body['content_hash'])
+            except OSError:
+                pass
+        self.supervisor.mezzanine.request(body['path'], profiles, priority=body.get('priority', 10))
+        return 202, {'ok': True}
+
+    def list_media(self, query):
+        return 200, {'media': self.supervisor.library.list()}
+
+    def rescan_media(self, query):
+        self.supervisor.library.rescan()
+        return 202, {'ok': True}
+
+    def list_sources(self, query):
+        return 200, {'sources': self.supervisor.sources.list()}
+
+    def _bulk_streams(self) -> Dict[str, Dict]:
+        with self.supervisor._lock:
+            return {stream_id: dict(stream) for stream_id, stream in self.supervisor.streams.items()}
+
+    def _bulk_runner(self) -> bulk.BulkRunner:
+        return self.supervisor.bulk
+
+    def list_bulk(self, query):
+        return 200, {'jobs': self._bulk_runner().list()}
+
+    def create_bulk(self, query):
+        return bulk.submit_request(self._bulk_runner(), self._bulk_streams(), self._body())
+
+    def get_bulk(self, query, job_id):
+        job = self._bulk_runner().get(int(job_id))
+        if job is None:
+            return 404, {'error': f"Job {job_id} tidak ada"}
+        return 200, job.to_dict()
+
+    def cancel_bulk(self, query, job_id):
+        if not self._bulk_runner().cancel(int(job_id)):
+            return 404, {'error': f"Job {job_id} tidak ada"}
+        return 200, {'ok': True}
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          supervisor: Optional[StreamSupervisor] = None) -> ThreadingHTTPServer:
+    """Buat HTTP server supervisor (panggil serve_forever() untuk menjalankan)"""
+    handler = type('Handler', (SupervisorHandler,), {'supervisor': supervisor or StreamSupervisor()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supervisor proses ffmpeg StreamFlow")
+    parser.add_argument('--host', default=os.environ.get('STREAMFLOW_HOST', DEFAULT_HOST))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('STREAMFLOW_PORT', DEFAULT_PORT)))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    server = serve(args.host, args.port)
+    logger.info("Supervisor berjalan di http://%s:%d", args.host, args.port)
+    # Pemulihan stream di background agar API sudah bisa dipakai selama admission berjalan
+    threading.Thread(target=server.RequestHandlerClass.supervisor.recover, name='recover', daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.RequestHandlerClass.supervisor.library.stop()
+        server.RequestHandlerClass.supervisor.log_writer.stop()
+        server.RequestHandlerClass.supervisor.engine.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+from abr import (
+    CHANGE_COOLDOWN,
+    DOWN_AFTER,
+    UP_AFTER,
+    BitrateController,
+    StreamLoad,
+    current_rung,
+    effective_stream,
+    ladder,
+)
+
+T0 = 1000.0  # decide() memakai time.monotonic() bila now falsy, jadi jangan mulai dari 0
+BACKLOG = 10 ** 6  # jauh di atas satu detik bitrate target
+
+
+def load(stream_id='a', level=0, max_level=5, target=3000, up=None, throughput=3000.0,
+         backlog=0, below=False, priority=0, enabled=True):
+    return StreamLoad(stream_id=stream_id, enabled=enabled, priority=priority, level=level,
+                      max_level=max_level, target_kbps=target, up_kbps=up, throughput_kbps=throughput,
+                      backlog_bytes=backlog, below_realtime=below)
+
+
+def test_ladder_steps_down_bitrate_and_resolution():
+    assert ladder({'bitrate': 5000, 'resolution': '1080p', 'abr_min_bitrate': 1000}) == [
+        (5000, '1080p'), (3700, '1080p'), (2700, '720p'), (2000, '720p'), (1500, '720p'), (1100, '480p')]
+
+
+def test_ladder_respects_resolution_floor():
+    rungs = ladder({'bitrate': 3000, 'resolution': '1080p', 'abr_min_resolution': '720p'})
+    assert rungs[0] == (3000, '1080p')
+    assert all(resolution in ('1080p', '720p') for _, resolution in rungs)
+
+
+def test_effective_stream_uses_active_rung():
+    stream = {'bitrate': 5000, 'resolution': '1080p', 'abr_min_bitrate': 1000, 'abr_level': 2}
+    assert current_rung(stream) == (2700, '720p')
+    assert effective_stream(stream)['bitrate'] == 2700
+    plain = {**stream, 'abr_level': 0}
+    assert effective_stream(plain) is plain
+    assert effective_stream({**stream, 'abr_level': 99})['bitrate'] == 1100
+
+
+def test_congestion_must_persist_before_stepping_down():
+    controller = BitrateController(uplink_kbps=0)
+    congested = [load(backlog=BACKLOG)]
+    assert controller.decide(congested, now=T0) is None
+    assert controller.decide(congested, now=T0 + DOWN_AFTER - 1) is None
+    assert controller.decide(congested, now=T0 + DOWN_AFTER) == ('a', 1, "antrean kirim menumpuk")
+
+
+def test_short_congestion_resets_hysteresis():
+    controller = BitrateController(uplink_kbps=0)
+    assert controller.decide([load(backlog=BACKLOG)], now=T0) is None
+    assert controller.decide([load()], now=T0 + DOWN_AFTER / 2) is None
+    assert controller.decide([load(backlog=BACKLOG)], now=T0 + DOWN_AFTER) is None
+
+
+def test_cooldown_blocks_consecutive_changes():
+    controller = BitrateController(uplink_kbps=0)
+    controller.decide([load(backlog=BACKLOG)], now=T0)
+    assert controller.decide([load(backlog=BACKLOG)], now=T0 + DOWN_AFTER)[1] == 1
+
+    still_congested = [load(level=1, backlog=BACKLOG)]
+    # DOWN_AFTER sudah lewat lagi, tetapi stream masih dalam cooldown
+    assert controller.decide(still_congested, now=T0 + 2 * DOWN_AFTER) is None
+    assert controller.decide(still_congested, now=T0 + DOWN_AFTER + CHANGE_COOLDOWN) == (
+        'a', 2, "antrean kirim menumpuk")
+
+
+def test_clear_uplink_steps_up_after_up_after():
+    controller = BitrateController(uplink_kbps=0)
+    clear = [load(level=1, up=4000)]
+    assert controller.decide(clear, now=T0) is None
+    assert controller.decide(clear, now=T0 + UP_AFTER - 1) is None
+    assert controller.decide(clear, now=T0 + UP_AFTER) == ('a', 0, "uplink lega")
+
+
+def test_step_up_only_when_it_fits_known_uplink():
+    controller = BitrateController(uplink_kbps=10000)
+    # 7500 + (4000 - 3000) > 80% dari 10000
+    tight = [load(level=1, up=4000, throughput=7500.0)]
+    controller.decide(tight, now=T0)
+    assert controller.decide(tight, now=T0 + UP_AFTER) is None
+
+    roomy = [load(level=1, up=4000, throughput=7000.0)]
+    assert controller.decide(roomy, now=T0 + UP_AFTER + 1) == ('a', 0, "uplink lega")
+
+
+def test_failed_step_up_doubles_wait_before_next_try():
+    controller = BitrateController(uplink_kbps=0)
+    controller.decide([load(level=1, up=4000)], now=T0)
+    assert controller.decide([load(level=1, up=4000)], now=T0 + UP_AFTER) == ('a', 0, "uplink lega")
+
+    # Tingkat 0 langsung padat lagi: turun, dan jeda naik berikutnya digandakan
+    raised = T0 + UP_AFTER
+    controller.decide([load(backlog=BACKLOG)], now=raised + CHANGE_COOLDOWN)
+    assert controller.decide([load(backlog=BACKLOG)], now=raised + CHANGE_COOLDOWN + DOWN_AFTER)[1] == 1
+    assert controller.up_after['a'] == UP_AFTER * 2
+
+    clear_from = raised + CHANGE_COOLDOWN + DOWN_AFTER + 1
+    clear = [load(level=1, up=4000)]
+    controller.decide(clear, now=clear_from)
+    assert controller.decide(clear, now=clear_from + UP_AFTER) is None
+    assert controller.decide(clear, now=clear_from + UP_AFTER * 2) == ('a', 0, "uplink lega")
+
+
+def test_saturated_uplink_sacrifices_lowest_priority_first():
+    controller = BitrateController(uplink_kbps=10000)
+    loads = [load('hi', priority=1, throughput=5000.0), load('lo', priority=0, throughput=5000.0)]
+    controller.decide(loads, now=T0)
+    stream_id, level, reason = controller.decide(loads, now=T0 + DOWN_AFTER)
+    assert (stream_id, level) == ('lo', 1)
+    assert reason.startswith("uplink")
+
+
+def test_recovery_restores_highest_priority_first():
+    controller = BitrateController(uplink_kbps=0)
+    loads = [load('hi', level=1, up=4000, priority=1), load('lo', level=1, up=4000, priority=0)]
+    controller.decide(loads, now=T0)
+    assert controller.decide(loads, now=T0 + UP_AFTER)[0] == 'hi'
+
+
+def test_disabled_or_bottom_rung_streams_are_not_touched():
+    controller = BitrateController(uplink_kbps=0)
+    loads = [load('off', backlog=BACKLOG, enabled=False), load('floor', level=5, max_level=5, backlog=BACKLOG)]
+    controller.decide(loads, now=T0)
+    assert controller.decide(loads, now=T0 + DOWN_AFTER) is None
@@ -0,0 +1,48 @@
+import time
+
+import bulk
+from bulk import BulkRunner, select
+
+STREAMS = {
+    'n1': {'title': 'News 1', 'tags': ['news']},
+    'n2': {'title': 'News 2', 'tags': ['news', 'hd']},
+    's1': {'title': 'Sport', 'tags': ['sport']},
+    'x1': {'title': 'Archive', 'tags': []},
+}
+
+
+def test_select_requires_a_filter():
+    assert select(STREAMS) == []
+    assert select(STREAMS, everything=True) == ['x1', 'n1', 'n2', 's1']
+
+
+def test_select_by_tag_and_pattern():
+    assert select(STREAMS, tags=['news']) == ['n1', 'n2']
+    assert select(STREAMS, tags=['hd', 'sport']) == ['n2', 's1']
+    assert select(STREAMS, pattern='News*') == ['n1', 'n2']  # judul
+    assert select(STREAMS, pattern='s*') == ['s1']  # id
+    assert select(STREAMS, tags=['news'], pattern='*2') == ['n2']  # keduanya harus cocok
+
+
+def test_select_ids_are_added_and_unknown_ids_dropped():
+    assert select(STREAMS, ids=['s1', 'nope'], tags=['hd']) == ['n2', 's1']
+
+
+def test_launch_waits_for_first_progress_sample(monkeypatch):
+    monkeypatch.setattr(bulk, 'POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(bulk, 'RAMP_SECONDS', 0.0)
+    polls = []
+
+    def state(stream_id):
+        polls.append(stream_id)
+        # 'live' dipasang sebelum ffmpeg jalan; speed baru terisi dari -progress
+        return {'status': 'live', 'speed': 1.0 if len(polls) > 5 else None}
+
+    runner = BulkRunner(start=lambda stream_id, resume: (True, "ok"), stop=lambda stream_id: None, state=state)
+    job = runner.submit('restart', ['n1'], concurrency=1, stagger=0)
+    for _ in range(500):
+        if job.done:
+            break
+        time.sleep(0.01)
+    assert job.to_dict()['results']['n1']['state'] == 'live'
+    assert len(polls) > 5
@@ -0,0 +1,27 @@
+from logbuffer import StreamLogWriter
+
+
+def read_log(tmp_path, stream_id='s1'):
+    return [line.split(' ', 2)[2] for line in (tmp_path / f"{stream_id}.log").read_text().splitlines()]
+
+
+def test_full_queue_drops_lines_and_records_count(tmp_path):
+    writer = StreamLogWriter(str(tmp_path), queue_size=2)
+    for line in ('a', 'b', 'c', 'd'):
+        writer.write('s1', line)  # listener belum jalan: 'c' dan 'd' tidak muat
+    writer.start()
+    writer.stop()
+
+    writer.write('s1', 'e')
+    writer.start()
+    writer.stop()
+    assert read_log(tmp_path) == ['a', 'b', "↳ 2 baris log dibuang (disk tertinggal)", 'e']
+
+
+def test_stop_with_full_queue_still_flushes(tmp_path):
+    writer = StreamLogWriter(str(tmp_path), queue_size=1)
+    writer.start()
+    for index in range(200):
+        writer.write('s1', f"baris {index}")
+    writer.stop()
+    assert read_log(tmp_path)[0] == "baris 0"
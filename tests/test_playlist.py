@@ -0,0 +1,60 @@
+from datetime import datetime, time as dtime
+
+import pytest
+
+from playlist import PlaylistCursor, format_schedule, parse_schedule, playlist_items, slot_active
+
+
+def test_parse_schedule_slots():
+    text = """
+    # pagi
+    07:00-12:00 a.mp4, b.mp4
+    22:00-02:00 c.mp4
+    """
+    assert parse_schedule(text) == [
+        {'start': '07:00', 'end': '12:00', 'items': ['a.mp4', 'b.mp4']},
+        {'start': '22:00', 'end': '02:00', 'items': ['c.mp4']},
+    ]
+
+
+def test_format_schedule_round_trips():
+    slots = parse_schedule("07:00-12:00 a.mp4, b.mp4\n22:00-02:00 c.mp4")
+    assert parse_schedule(format_schedule(slots)) == slots
+
+
+@pytest.mark.parametrize('text', [
+    "07:00-12:00",  # slot tanpa file
+    "07:00-12:00 , ,",
+    "07:00 a.mp4",  # tanpa jam akhir
+    "07:00-25:00 a.mp4",
+    "pagi-siang a.mp4",
+])
+def test_parse_schedule_rejects_invalid_lines(text):
+    with pytest.raises(ValueError):
+        parse_schedule(text)
+
+
+def test_slot_active_handles_midnight():
+    slot = {'start': '22:00', 'end': '02:00', 'items': []}
+    assert slot_active(slot, dtime(23, 30))
+    assert slot_active(slot, dtime(1, 59))
+    assert not slot_active(slot, dtime(2, 0))
+    assert not slot_active(slot, dtime(12, 0))
+
+
+def test_playlist_items_deduplicates_slots():
+    stream = {'playlist': ['a.mp4'], 'schedule': parse_schedule("07:00-12:00 a.mp4, b.mp4\n13:00-14:00 b.mp4")}
+    assert playlist_items(stream) == ['a.mp4', 'b.mp4']
+
+
+def test_schedule_only_cursor_idles_until_next_slot():
+    cursor = PlaylistCursor({'schedule': parse_schedule("07:00-12:00 a.mp4\n22:00-02:00 c.mp4")})
+    assert cursor.idle_until(datetime(2024, 1, 1, 9, 0)) is None
+    assert cursor.next_item(datetime(2024, 1, 1, 13, 0)) is None
+    assert cursor.idle_until(datetime(2024, 1, 1, 13, 0)) == datetime(2024, 1, 1, 22, 0)
+    assert cursor.idle_until(datetime(2024, 1, 1, 2, 30)) == datetime(2024, 1, 1, 7, 0)
+
+
+def test_cursor_with_main_playlist_never_idles():
+    cursor = PlaylistCursor({'playlist': ['b.mp4'], 'schedule': parse_schedule("07:00-12:00 a.mp4")})
+    assert cursor.idle_until(datetime(2024, 1, 1, 13, 0)) is None
@@ -0,0 +1,54 @@
+from progress import ProgressParser
+
+BLOCK = """frame=100
+fps=30.00
+bitrate=2500.1kbits/s
+total_size=123456
+out_time_us=3333333
+out_time=00:00:03.333333
+dup_frames=1
+drop_frames=2
+speed=1.01x
+progress=continue"""
+
+
+def feed(parser, text):
+    samples = [parser.feed(line) for line in text.splitlines()]
+    assert all(sample is None for sample in samples[:-1])
+    return samples[-1]
+
+
+def test_block_becomes_sample():
+    sample = feed(ProgressParser(), BLOCK)
+    assert sample.frame == 100
+    assert sample.fps == 30.0
+    assert sample.bitrate_kbps == 2500.1
+    assert sample.total_size == 123456
+    assert abs(sample.out_time - 3.333333) < 1e-9
+    assert sample.speed == 1.01
+    assert (sample.dup_frames, sample.drop_frames) == (1, 2)
+    assert not sample.ended
+
+
+def test_unknown_values_and_end_block():
+    sample = feed(ProgressParser(), "bitrate=N/A\nspeed=N/A\nout_time_us=-9223372036854775807\nprogress=end")
+    assert sample.bitrate_kbps is None
+    assert sample.speed is None
+    assert sample.out_time == 0.0
+    assert sample.ended
+
+
+def test_fields_do_not_leak_between_blocks():
+    parser = ProgressParser()
+    feed(parser, BLOCK)
+    sample = feed(parser, "frame=5\nprogress=continue")
+    assert sample.frame == 5
+    assert sample.speed is None
+    assert sample.total_size == 0
+
+
+def test_ignores_lines_without_key_value():
+    parser = ProgressParser()
+    assert parser.feed("") is None
+    assert parser.feed("Press [q] to stop") is None
+    assert feed(parser, BLOCK).frame == 100